@@ -29,6 +29,38 @@ class ArmConfig:
         "server_host_port": "8000",
         "remote_hal_ip": "127.0.0.1",
         "remote_hal_port": "8000",
+        "remote_hal_timeout": 2.0,
+        "remote_hal_retries": 2,
+        "remote_hal_command_queue": True,
+        "remote_hal_use_websocket": False,
+        "remote_hal_telemetry_hz": 60,
+        "use_frame_grabber": False,
+        "frame_grabber_max_fps": 30,
+        "use_joint_cache": False,
+        "joint_cache_max_age": 0.05,
+        "joint_cache_refresh_hz": 0,
+        "record_hal": False,
+        "record_hal_file": "arm_recording.armrec",
+        "use_replay_hal": False,
+        "replay_hal_file": "arm_recording.armrec",
+        "replay_hal_speed": 1.0,
+        "use_synthetic_hal": False,
+        "synthetic_hal_width": 640,
+        "synthetic_hal_height": 480,
+        "synthetic_hal_fps": 30,
+        "synthetic_hal_seed": 0,
+        "synthetic_hal_object_count": 6,
+        "use_process_hal": False,
+        "process_hal_slot_count": 4,
+        "process_hal_max_frame_bytes": 6220800,
+        "process_hal_capture_fps": 0,
+        "color_identifier_single_pass": False,
+        "color_identifier_min_area": 20,
+        "color_identifier_max_objects": 32,
+        "color_identifier_max_per_label": 0,
+        "vision_tracking": False,
+        "vision_tracking_reacquire_interval": 10,
+        "vision_tracking_margin": 0.5,
     }
     
     def load_config(self, config_file_path: str = 'config.json') -> Dict[str, Any]:
@@ -75,6 +107,11 @@ class ArmConfig:
         parser.add_argument('--twitch_chat', nargs='?', const="ucscarm", type=twitch_channel_name_type, help='If passed in, will connect to provided twitch channel (default is ucscarm).')
         parser.add_argument("--write_logs", help = "Will write console messages to a file.")
         parser.add_argument("--use_speech_to_text", help = "Enable the speech to text system.")
+        parser.add_argument("--record", metavar="FILE", help = "Record the HAL's frames, joint states and commands to FILE.")
+        parser.add_argument("--replay", metavar="FILE", help = "Play back a recording made with --record instead of using the arm.")
+        parser.add_argument("--synthetic", action='store_true', help = "Use the synthetic arm that renders a generated scene, no simulator or hardware needed.")
+        parser.add_argument("--process_hal", action='store_true', help = "Run the HAL in its own process, frames come back through shared memory.")
+        parser.add_argument("--replay_speed", type=float, help = "Replay speed, 1 is real time, 0 is as fast as possible.")
         
         # Read arguments from command line
         args = parser.parse_args()
@@ -93,4 +130,16 @@ class ArmConfig:
             config["write_logs"] = True
         if args.use_speech_to_text:
             config["use_stt"] = True
+        if args.record:
+            config["record_hal"] = True
+            config["record_hal_file"] = args.record
+        if args.replay:
+            config["use_replay_hal"] = True
+            config["replay_hal_file"] = args.replay
+        if args.synthetic:
+            config["use_synthetic_hal"] = True
+        if args.process_hal:
+            config["use_process_hal"] = True
+        if args.replay_speed is not None:
+            config["replay_hal_speed"] = args.replay_speed
             
\ No newline at end of file
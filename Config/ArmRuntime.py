@@ -15,7 +15,7 @@ from Modules.Commands.Commands import Commands
 from Modules.HotkeyManager import HotkeyManager
 from Modules.ConsoleInput import ConsoleInput
 
-from Modules.Commands.DefaultCommands import register_default_commands, register_controler_commands
+from Modules.Commands.DefaultCommands import register_default_commands, register_controler_commands, register_hal_commands, register_vision_commands
 from Modules.Language.LanguageTools import register_default_tools, register_controler_tools
 
 class ArmRuntime:
@@ -55,6 +55,8 @@ class ArmRuntime:
         self.console_input = ConsoleInput(console_input_handeler, ">> ")
         register_default_commands(self.commands)
         register_controler_commands(self.commands, lambda: self.selected_controller)
+        register_hal_commands(self.commands, lambda: self.selected_HAL)
+        register_vision_commands(self.commands, lambda: self.selected_object_identifier)
         
         # Language stuff
         if config["use_language_model"]:
@@ -66,12 +68,18 @@ class ArmRuntime:
             self.commands.add_command("llm", lambda args: self.selected_voice.write_line(self.selected_language_interpreter.run(args)),
                                 "Runs the provided input on the language model")
         # HAL stuff
-        if config["use_simulator_hal"]:
-            from HALs.sim_HAL import sim_HAL
-            self.selected_HAL = sim_HAL(config["sim_host"])
+        # HALs are named by module and class so use_process_hal can construct them in their own process instead
+        if config["use_replay_hal"]:
+            self.selected_HAL = self.create_hal(config, "HALs.replay_HAL", "ReplayHAL", config["replay_hal_file"], float(config["replay_hal_speed"]))
+        elif config["use_synthetic_hal"]:
+            self.selected_HAL = self.create_hal(config, "HALs.synthetic_HAL", "SyntheticHAL",
+                                                (int(config["synthetic_hal_width"]), int(config["synthetic_hal_height"])),
+                                                float(config["synthetic_hal_fps"]), int(config["synthetic_hal_seed"]),
+                                                int(config["synthetic_hal_object_count"]))
+        elif config["use_simulator_hal"]:
+            self.selected_HAL = self.create_hal(config, "HALs.sim_HAL", "sim_HAL", config["sim_host"])
         elif config["use_physical_hal"]:
-            from HALs.physical_HAL import physical_HAL
-            self.selected_HAL = physical_HAL()
+            self.selected_HAL = self.create_hal(config, "HALs.physical_HAL", "physical_HAL")
         elif config["use_remote_hal"]:
             if "remote_hal_ip" not in config or not config["remote_hal_ip"]:
                 print("ERROR: 'remote_hal_ip' is missing or invalid in the configuration.")
@@ -81,17 +89,25 @@ class ArmRuntime:
                 try:
                     remote_ip = config["remote_hal_ip"]
                     remote_port = int(config["remote_hal_port"])
-                    from HALs.remote_HAL import RemoteHAL
-                    self.selected_HAL = RemoteHAL(remote_ip, remote_port)
+                    self.selected_HAL = self.create_hal(config, "HALs.remote_HAL", "RemoteHAL", remote_ip, remote_port,
+                                                        float(config["remote_hal_timeout"]), int(config["remote_hal_retries"]),
+                                                        bool(config["remote_hal_command_queue"]), bool(config["remote_hal_use_websocket"]),
+                                                        int(config["remote_hal_telemetry_hz"]))
                     print(f"Remote HAL initialized with IP: {remote_ip}, Port: {remote_port}")
                 except ValueError:
                     print(f"ERROR: 'remote_hal_port' must be a valid integer. Provided value: {config['remote_hal_port']}")
         else:
             print("SERIOUS ERROR - No HAL selected. Please select a HAL to use.")        
             
+        if config["record_hal"] and self.selected_HAL is not None:
+            from HALs.recording_HAL import RecordingHAL
+            self.selected_HAL = RecordingHAL(self.selected_HAL, config["record_hal_file"])
+            
         # vision stuff
         from Vision.ColorObjectIdentifier import ColorObjectIdentifier
-        self.selected_object_identifier: VisualObjectIdentifier = ColorObjectIdentifier()
+        color_identifier_args = (bool(config["color_identifier_single_pass"]), float(config["color_identifier_min_area"]),
+                                 int(config["color_identifier_max_objects"]), int(config["color_identifier_max_per_label"]))
+        self.selected_object_identifier: VisualObjectIdentifier = ColorObjectIdentifier(*color_identifier_args)
         
         # controler stuff
         from Controllers.FollowLargestObjectControler import FollowLargestObjectControler
@@ -102,10 +118,14 @@ class ArmRuntime:
             # Kivy opens the window if this is imported, thus why it is here.
             from Modules.App.App import App
             from Controllers.FollowClaw import FollowClawController
-            self.selected_object_identifier: ColorObjectIdentifier = ColorObjectIdentifier()
+            self.selected_object_identifier: ColorObjectIdentifier = ColorObjectIdentifier(*color_identifier_args)
             self.selected_controller = FollowClawController(self.selected_HAL, self.selected_object_identifier)    
             self.selected_app = App(self.selected_controller, self.selected_HAL, self.selected_object_identifier)
             
+        # only process the area around the controller's target between full frame passes
+        if config["vision_tracking"]:
+            self.selected_object_identifier.enable_tracking(int(config["vision_tracking_reacquire_interval"]), float(config["vision_tracking_margin"]))
+            
         # Server setup
         if config["use_server"]:
             from Modules.server.http_server import HTTPServer
@@ -153,6 +173,16 @@ class ArmRuntime:
             else:
                 self.selected_twitch = TwitchChat(config["twitch_id"], config["twitch_secret"])
 
+    def create_hal(self, config: Dict[str, Any], hal_module: str, hal_class: str, *hal_args) -> HAL_base:
+        """Imports and constructs hal_module.hal_class(*hal_args), or with use_process_hal runs it in a child process behind a ProcessHAL."""
+        if config["use_process_hal"]:
+            from HALs.process_HAL import ProcessHAL
+            print(f"Running {hal_class} in its own process")
+            return ProcessHAL(hal_module, hal_class, hal_args, int(config["process_hal_slot_count"]),
+                              int(config["process_hal_max_frame_bytes"]), float(config["process_hal_capture_fps"]))
+        import importlib
+        return getattr(importlib.import_module(hal_module), hal_class)(*hal_args)
+
     def start(self, config: Dict[str, Any]) -> None:
         # Connect to twitch
         if config["use_twitch"]:
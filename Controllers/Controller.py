@@ -17,6 +17,9 @@ class Controller:
     def get_visible_object_labels_detailed(self) -> list[str]: ...
     """Returns a list of objects that are visible to the arm, including metadata"""
     
+    def get_visible_objects(self) -> list: ...
+    """Returns the VisionObjects detected in the last processed frame, a new list each frame so don't modify it."""
+    
     def get_all_posible_labels(self) -> list[str]: ...
     """Returns a list of all possible labels that this controller can see, even if they are not currently visible."""
     
\ No newline at end of file
@@ -10,6 +10,7 @@ import sympy as sym
 import time
 
 from HALs.HAL_base import HAL_base
+from HALs.frame_pyramid import PYRAMID_QUARTER
 from Vision.VisionObject import VisionObject
 from Vision.VisualObjectIdentifier import VisualObjectIdentifier
 from Modules.Base.ImageProducer import ImageProducer
@@ -46,14 +47,7 @@ def coordinate_input(x, y, z,hal,vision=False):
             else:
                 theta1 = sym.atan(opp / dist)
             t1deg = 90 - (float(sym.deg(theta1).evalf()))
-            t0n = hal.get_joint(0)
-
-            t1n = hal.get_joint(1)
-            t0n = t0n + (t0deg - t0n) * .1
-            t1n = t1n + (t1deg - t1n) * .1
-            hal.set_joint(0, t0deg)
-            hal.set_joint(1, t1deg)
-            hal.set_joint(2, 0)
+            hal.set_joints([t0deg, t1deg, 0])
 
 
         else:
@@ -83,14 +77,14 @@ def coordinate_input(x, y, z,hal,vision=False):
 
             print("--------- Moving ARM ---------")
             if vision:
-                print(f"joint:{hal.get_joint(0)}, new: {angle_base}, mid: {hal.get_joint(0)+0.1*(angle_base-hal.get_joint(0))}")
-                hal.set_joint(0,angle_base)
-                hal.set_joint(1, hal.get_joint(1)+0.1*(angle_1-hal.get_joint(1)))
-                hal.set_joint(2, hal.get_joint(2)+0.1*(angle_2-hal.get_joint(2)))
+                # one batched read and write instead of a round-trip per joint
+                current_angles = hal.get_joint_state().angles
+                print(f"joint:{current_angles[0]}, new: {angle_base}, mid: {current_angles[0]+0.1*(angle_base-current_angles[0])}")
+                hal.set_joints([angle_base,
+                                current_angles[1]+0.1*(angle_1-current_angles[1]),
+                                current_angles[2]+0.1*(angle_2-current_angles[2])])
             else:
-                hal.set_joint(0, angle_base)
-                hal.set_joint(1, angle_1)
-                hal.set_joint(2, angle_2)
+                hal.set_joints([angle_base, angle_1, angle_2])
 
     except Exception as err:
         print(f"Exeption in moving the arm (coordinate_input): {err=}, {type(err)=}")
@@ -181,6 +175,11 @@ class Three_Degree_Arm:
         else:
             print('This point is not feasible')
 
+# joints the claw controller drives
+BASE_JOINT = 0
+SERVO_2_JOINT = 2
+CONTROLLED_JOINT_COUNT = 3
+
 class FollowClawController(Controller):
     def __init__(self, selected_HAL: HAL_base, vision: VisualObjectIdentifier, target_label: str = None):
         self.selected_HAL: HAL_base = selected_HAL
@@ -211,6 +210,7 @@ class FollowClawController(Controller):
         self.servo_2 = 0
         self.movement_speed = 1       # 1/10 seconds
         self.servo1_constraint = 45
+        self.current_joint_angles = np.zeros(CONTROLLED_JOINT_COUNT)
         self.init = False
         self.frame=False
         self.mask=False
@@ -260,9 +260,16 @@ class FollowClawController(Controller):
             if self.last_frame_objects is None:
                 return []
             # return a series of string that represent the object, starting withe object's label, then radius, then metadata
-            return [f"{obj.label} radius: {obj.radius} {obj.metadata}" for obj in self.last_frame_objects]
+            return [f"{obj.label} radius: {obj.radius} {obj.get_all_key_value_pairs()}" for obj in self.last_frame_objects]
             #return [f"{obj.label}_object" for obj in self.last_frame_objects]
     
+    def get_visible_objects(self) -> List[VisionObject]:
+        """Returns the VisionObjects detected in the last processed frame, a new list each frame so don't modify it."""
+        with self.last_frame_objects_lock:
+            if self.last_frame_objects is None:
+                return []
+            return self.last_frame_objects
+    
     def get_all_posible_labels(self) -> list[str]:
         """Returns a list of all possible labels that this controller can see, even if they are not currently visible."""
         return self.vision.get_all_potential_labels()
@@ -309,11 +316,11 @@ class FollowClawController(Controller):
             print (f"x_off: {x_off}, y_off: {y_off}, depth: {math.pow(distance, 2) - math.pow(x_off, 2) - math.pow(y_off, 2)}")
             depth = math.sqrt(math.pow(distance, 2) - math.pow(x_off, 2) - math.pow(y_off, 2))
         # around y
-            b = -np.deg2rad(self.selected_HAL.get_joint(1)) - np.deg2rad(self.selected_HAL.get_joint(2))
+            b = -np.deg2rad(self.selected_HAL.get_joint_cached(1)) - np.deg2rad(self.selected_HAL.get_joint_cached(2))
             # around x
             a = -math.radians(22.5)
             # around z
-            c = np.deg2rad(self.selected_HAL.get_joint(0))
+            c = np.deg2rad(self.selected_HAL.get_joint_cached(0))
             print(f"Around Y = {b}, Around Z = {c}")
             R_x = np.array([
                 [1, 0, 0],
@@ -360,9 +367,9 @@ class FollowClawController(Controller):
             a4 = 3.25
             a5 = 5.8
             a6 = .0001
-            theta1 = round(np.deg2rad(self.selected_HAL.get_joint(0)), 5) if np.abs(np.deg2rad(self.selected_HAL.get_joint(0))) > .001 else 0
-            theta2 = round(np.deg2rad(self.selected_HAL.get_joint(1)), 5) + math.radians(90) if np.abs(np.deg2rad(self.selected_HAL.get_joint(1))) > .001 else math.radians(90)
-            theta3 = round(np.deg2rad(self.selected_HAL.get_joint(2)), 5) + math.radians(90) if np.abs(np.deg2rad(self.selected_HAL.get_joint(2))) > .001 else math.radians(90)
+            theta1 = round(np.deg2rad(self.selected_HAL.get_joint_cached(0)), 5) if np.abs(np.deg2rad(self.selected_HAL.get_joint_cached(0))) > .001 else 0
+            theta2 = round(np.deg2rad(self.selected_HAL.get_joint_cached(1)), 5) + math.radians(90) if np.abs(np.deg2rad(self.selected_HAL.get_joint_cached(1))) > .001 else math.radians(90)
+            theta3 = round(np.deg2rad(self.selected_HAL.get_joint_cached(2)), 5) + math.radians(90) if np.abs(np.deg2rad(self.selected_HAL.get_joint_cached(2))) > .001 else math.radians(90)
             theta4 = 0
             H0_1 = self.DH(theta1, np.pi / 2, 0, a1)
             H1_2 = self.DH(theta2, 0, a3, -a2)
@@ -430,10 +437,26 @@ class FollowClawController(Controller):
     
 
     def get_frame_mask(self):
-        return cv2.resize(self.imageGetter.capture_image(), (0,0), fx=0.25, fy=0.25) , self.mask
+        return self.selected_HAL.capture_image_level(PYRAMID_QUARTER) , self.mask
+    
+    def read_joint_angles(self) -> None:
+        """Reads every joint with one batched call (or from the HAL's joint cache), HALs without an arm report no joints so those read as 0."""
+        joint_angles = self.selected_HAL.get_joint_state().angles
+        self.current_joint_angles = np.zeros(max(len(joint_angles), CONTROLLED_JOINT_COUNT))
+        self.current_joint_angles[:len(joint_angles)] = joint_angles
+
+    def write_joint_angles(self) -> None:
+        """Sends theta_base and servo_2 to the arm with one batched call."""
+        target_angles = self.current_joint_angles.copy()
+        target_angles[BASE_JOINT] = self.theta_base
+        target_angles[SERVO_2_JOINT] = self.servo_2
+        mask = np.zeros(len(target_angles), dtype=bool)
+        mask[[BASE_JOINT, SERVO_2_JOINT]] = True
+        self.selected_HAL.set_joints(target_angles, mask)
     
     def calculate_sam_theta(self): 
         if self.object_found:
+            self.read_joint_angles()
             self.calculate_base_theta()
             self.calculate_servo_1_theta()
             self.calculate_servo_2_theta()
@@ -447,9 +470,8 @@ class FollowClawController(Controller):
             print('servo_2: ' + str(self.servo_2))
             print('------------------------------------------------------')
 
-            self.selected_HAL.set_joint(0, self.theta_base)
             # set_joint(1, self.servo_1)
-            self.selected_HAL.set_joint(2, self.servo_2)
+            self.write_joint_angles()
 
     async def update_controller(self) -> bool:
         # CLOCK = 12
@@ -486,7 +508,9 @@ class FollowClawController(Controller):
 
     async def update_frame(self) -> bool:
         print("x")
-        frame = cv2.resize(self.imageGetter.capture_image(), (0,0), fx=0.25, fy=0.25) 
+        pyramid = self.selected_HAL.capture_pyramid()
+        # the pyramid levels are shared with the other consumers, copy since we draw on this one
+        frame = pyramid.get_level(PYRAMID_QUARTER).copy()
         # pframe = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
         # # For Sam Code ON physical****
         # pframe = cv2.flip(pframe, -1)
@@ -509,7 +533,7 @@ class FollowClawController(Controller):
             self.mask = cv2.flip(amask,-1)
             print('Object Found!')
         else: 
-            self.mask = cv2.resize(self.imageGetter.capture_image(), (0,0), fx=0.25, fy=0.25) 
+            self.mask = pyramid.get_level(PYRAMID_QUARTER)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             await asyncio.sleep(0.03)  #run detection every 1/30 seconds
             return False
@@ -520,7 +544,7 @@ class FollowClawController(Controller):
         await asyncio.sleep(0.03)  #run detection every 1/30 seconds
     def calculate_base_theta(self):
         if abs(self.error_x_distance) > self.error_tolerance_coord:
-            self.theta_base = self.selected_HAL.get_joint(0) - self.K * self.error_x_distance * math.exp(-self.lambda_)
+            self.theta_base = self.current_joint_angles[BASE_JOINT] - self.K * self.error_x_distance * math.exp(-self.lambda_)
 
             #move without slow decient
             # self.theta_base = self.theta_base - self.K * (1 - math.exp(-self.lambda_ * self.error_x_distance))
@@ -539,7 +563,7 @@ class FollowClawController(Controller):
 
     def calculate_servo_2_theta(self):
         if abs(self.error_y_distance) > self.error_tolerance_coord:
-            self.servo_2 = self.selected_HAL.get_joint(2) - self.K * self.error_y_distance * math.exp(-self.lambda_)
+            self.servo_2 = self.current_joint_angles[SERVO_2_JOINT] - self.K * self.error_y_distance * math.exp(-self.lambda_)
     
     async def start_async(self):
         await asyncio.gather(
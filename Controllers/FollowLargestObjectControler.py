@@ -4,6 +4,7 @@ from typing import List
 import cv2
 import asyncio
 from threading import Lock
+import numpy as np
 
 from HALs.HAL_base import HAL_base
 from Vision.VisionObject import VisionObject
@@ -11,6 +12,11 @@ from Vision.VisualObjectIdentifier import VisualObjectIdentifier
 from Modules.Base.ImageProducer import ImageProducer
 from Controllers.Controller import Controller
 
+# joints this controller drives
+BASE_JOINT = 0
+SERVO_2_JOINT = 2
+CONTROLLED_JOINT_COUNT = 3
+
 class FollowLargestObjectControler(Controller):
     def __init__(self, selected_HAL: HAL_base, vision: VisualObjectIdentifier, target_label: str = None):
         self.selected_HAL: HAL_base = selected_HAL
@@ -43,6 +49,7 @@ class FollowLargestObjectControler(Controller):
         self.servo_2 = 0
         self.movement_speed = 1       # 1/10 seconds
         self.servo1_constraint = 45
+        self.current_joint_angles = np.zeros(CONTROLLED_JOINT_COUNT)
         selected_HAL.set_joint_min(0, 0)   # set_base_min_degree(0)
         selected_HAL.set_joint_max(0, 270) # set_base_max_degree(270)
         selected_HAL.set_joint_max(2, 75)  # set_joint_2_max(75)
@@ -85,9 +92,16 @@ class FollowLargestObjectControler(Controller):
             if self.last_frame_objects is None:
                 return []
             # return a series of string that represent the object, starting withe object's label, then radius, then metadata
-            return [f"{obj.label} radius: {obj.radius} {obj.metadata}" for obj in self.last_frame_objects]
+            return [f"{obj.label} radius: {obj.radius} {obj.get_all_key_value_pairs()}" for obj in self.last_frame_objects]
             #return [f"{obj.label}_object" for obj in self.last_frame_objects]
     
+    def get_visible_objects(self) -> List[VisionObject]:
+        """Returns the VisionObjects detected in the last processed frame, a new list each frame so don't modify it."""
+        with self.last_frame_objects_lock:
+            if self.last_frame_objects is None:
+                return []
+            return self.last_frame_objects
+    
     def get_all_posible_labels(self) -> list[str]:
         """Returns a list of all possible labels that this controller can see, even if they are not currently visible."""
         return self.vision.get_all_potential_labels()
@@ -95,9 +109,24 @@ class FollowLargestObjectControler(Controller):
     def get_error(self, frame_center, center):
         return center - frame_center
 
+    def read_joint_angles(self) -> None:
+        """Reads every joint with one batched call (or from the HAL's joint cache), HALs without an arm report no joints so those read as 0."""
+        joint_angles = self.selected_HAL.get_joint_state().angles
+        self.current_joint_angles = np.zeros(max(len(joint_angles), CONTROLLED_JOINT_COUNT))
+        self.current_joint_angles[:len(joint_angles)] = joint_angles
+
+    def write_joint_angles(self) -> None:
+        """Sends theta_base and servo_2 to the arm with one batched call."""
+        target_angles = self.current_joint_angles.copy()
+        target_angles[BASE_JOINT] = self.theta_base
+        target_angles[SERVO_2_JOINT] = self.servo_2
+        mask = np.zeros(len(target_angles), dtype=bool)
+        mask[[BASE_JOINT, SERVO_2_JOINT]] = True
+        self.selected_HAL.set_joints(target_angles, mask)
+
     def calculate_base_theta(self):
         if abs(self.error_x_distance) > self.error_tolerance_coord:
-            self.theta_base = self.selected_HAL.get_joint(0) - self.K * self.error_x_distance * math.exp(-self.lambda_)
+            self.theta_base = self.current_joint_angles[BASE_JOINT] - self.K * self.error_x_distance * math.exp(-self.lambda_)
 
             #move without slow decient
             # self.theta_base = self.theta_base - self.K * (1 - math.exp(-self.lambda_ * self.error_x_distance))
@@ -116,12 +145,13 @@ class FollowLargestObjectControler(Controller):
 
     def calculate_servo_2_theta(self):
         if abs(self.error_y_distance) > self.error_tolerance_coord:
-            self.servo_2 = self.selected_HAL.get_joint(2) - self.K * self.error_y_distance * math.exp(-self.lambda_)
+            self.servo_2 = self.current_joint_angles[SERVO_2_JOINT] - self.K * self.error_y_distance * math.exp(-self.lambda_)
         
     async def calculate_theta(self):
         while self.keep_running:
             # if there is an object found
             if self.object_found:
+                self.read_joint_angles()
                 self.calculate_base_theta()
                 self.calculate_servo_1_theta()
                 self.calculate_servo_2_theta()
@@ -154,9 +184,8 @@ class FollowLargestObjectControler(Controller):
                     print('servo_2: ' + str(self.servo_2))
                     print('------------------------------------------------------')
 
-                self.selected_HAL.set_joint(0, self.theta_base)
                 #self.selected_HAL.set_joint(1, self.servo_1)
-                self.selected_HAL.set_joint(2, self.servo_2)
+                self.write_joint_angles()
                 
             await asyncio.sleep(0.03)  #run detection every 1/30 seconds
         
@@ -206,15 +235,18 @@ class FollowLargestObjectControler(Controller):
     async def update_frame(self) -> bool:
         frame = self.imageGetter.capture_image()
             
-        detected_objects: List[VisionObject] = self.vision.process_frame(frame) 
+        # with the identifier's tracking mode on, only the area around the target is processed
+        detected_objects: List[VisionObject] = self.vision.detect(frame, self.target_label)
         
         target_object: VisionObject = self.select_largest_target_object(detected_objects)   
         
         self.object_found = (target_object is not None)
         if(self.object_found):
-            await self.move_towards_object(target_object, frame)
+            # HAL frames can be read-only views, only pay for a copy when we draw on it
+            draw_frame = frame if frame.flags.writeable else frame.copy()
+            await self.move_towards_object(target_object, draw_frame)
 
-            flipped_source_frame_rgb = cv2.flip(target_object.source_frame_rgb, 0)
+            flipped_source_frame_rgb = cv2.flip(draw_frame, 0)
             bgr_image = cv2.cvtColor(flipped_source_frame_rgb, cv2.COLOR_RGB2BGR)
             cv2.imshow('Frame', bgr_image)
             if target_object.mask is not None:
@@ -226,7 +258,8 @@ class FollowLargestObjectControler(Controller):
             return False
         
         with self.last_frame_objects_lock:
-            self.last_frame_objects = detected_objects
+            # with tracking on detected_objects can be just the ROI's, publish everything still in view
+            self.last_frame_objects = self.vision.get_visible_objects()
         
         await asyncio.sleep(0.03)  #run detection every 1/30 seconds
         
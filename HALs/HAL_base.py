@@ -1,14 +1,35 @@
+import time
 import cv2
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
+from typing import Optional, Tuple
 from Modules.Base.ImageProducer import ImageProducer
+from HALs.frame_grabber import FrameGrabber
+from HALs.frame_pyramid import FramePyramid
+from HALs.joint_state_cache import JointState, JointStateCache
+from Vision.CameraIntrinsics import CameraIntrinsics
 
 DEFAULT_MIN_JOINT_ANGLE = 0
 DEFAULT_MAX_JOINT_ANGLE = 360
 
+# how long capture_image waits for the frame grabber's first frame before giving up
+FIRST_FRAME_TIMEOUT_SECONDS = 1.0
+
 # All joint angles are in degrees
 class HAL_base(ImageProducer):  
     
     joint_limits: list[(int, int)] = []
+    
+    frame_grabber: FrameGrabber = None
+    
+    # the pyramid of the last directly captured frame, reused while the HAL keeps handing back the same frame
+    last_frame_pyramid: FramePyramid = None
+    
+    joint_cache: JointStateCache = None
+    
+    camera_intrinsics: CameraIntrinsics = None
+    
+    gripper_executor: ThreadPoolExecutor = None
 
     def start_arm(self) -> bool: ...
         #return False
@@ -27,14 +48,166 @@ class HAL_base(ImageProducer):
     def joint_count(self) -> int: ...
         #return 0
     
+    # Batch joint access - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # HALs where each joint call is a lock + round-trip (sim, remote) should override these to do the whole batch at once
+    
+    def get_joints(self) -> np.ndarray:
+        """Returns every joint angle in degrees as a float array of length joint_count()."""
+        return np.array([self.get_joint(i) for i in range(self.joint_count())], dtype=float)
+    
+    def set_joints(self, joint_angles, mask = None) -> bool:
+        """Sets joint i to joint_angles[i] degrees for every i where mask[i] is True (every joint if mask is None)."""
+        success = True
+        for joint_index in self._masked_joint_indices(joint_angles, mask):
+            if not self.set_joint(joint_index, float(joint_angles[joint_index])):
+                success = False
+        self.invalidate_joint_cache()
+        return success
+    
+    def _masked_joint_indices(self, joint_angles, mask = None) -> list[int]:
+        """Returns the joint indices set_joints should move, raises a ValueError if the arrays don't line up."""
+        if mask is None:
+            return list(range(len(joint_angles)))
+        if len(mask) != len(joint_angles):
+            raise ValueError(f"mask has {len(mask)} entries but joint_angles has {len(joint_angles)}")
+        return [joint_index for joint_index in range(len(joint_angles)) if mask[joint_index]]
+    
+    # joint state cache - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # opt-in, serves joint reads from the last batch read so a controller tick doesn't cost a round-trip per get_joint
+    
+    def enable_joint_cache(self, max_age: float = 0.05, refresh_hz: float = 0) -> None:
+        """
+        Args:
+            max_age: Reads older than this many seconds are refreshed on access.
+            refresh_hz: If above 0 a background thread also refreshes every joint at this rate.
+        """
+        self.disable_joint_cache()
+        self.joint_cache = JointStateCache(self.get_joints, max_age, refresh_hz)
+        self.joint_cache.start()
+    
+    def disable_joint_cache(self) -> None:
+        if self.joint_cache is not None:
+            self.joint_cache.stop()
+        self.joint_cache = None
+    
+    def invalidate_joint_cache(self) -> None:
+        """Called after batch commands so the next cached read sees the arm moving."""
+        if self.joint_cache is not None:
+            self.joint_cache.invalidate()
+    
+    def get_joint_state(self, max_age: float = None, force_refresh: bool = False) -> JointState:
+        """Returns every joint angle with the time it was read, from the cache if it is newer than max_age seconds."""
+        if self.joint_cache is None:
+            return JointState(self.get_joints(), time.monotonic())
+        return self.joint_cache.get_state(max_age, force_refresh)
+    
+    def get_joint_cached(self, joint_index: int, max_age: float = None, force_refresh: bool = False) -> float:
+        """Like get_joint but served from the joint state cache when it is enabled, pass force_refresh for a fresh read."""
+        if self.joint_cache is None:
+            return self.get_joint(joint_index)
+        return float(self.joint_cache.get_state(max_age, force_refresh).angles[joint_index])
+    
     def get_arm_cam_img_rgb(self) -> cv2.typing.MatLike: ...
         #return None   
     
     def capture_image(self) -> cv2.typing.MatLike:
+        """Returns the newest frame from the frame grabber if it is running, otherwise captures one directly."""
+        if self.is_frame_grabber_running():
+            # only blocks until the very first frame exists
+            _, frame = self.frame_grabber.wait_for_frame(0, FIRST_FRAME_TIMEOUT_SECONDS)
+            return frame
         return self.get_arm_cam_img_rgb()
     
+    # shared frame source - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # opt-in, one thread reads the camera and every consumer shares the newest frame
+    
+    def start_frame_grabber(self, max_fps: float = 0) -> bool:
+        if self.frame_grabber is None:
+            self.frame_grabber = FrameGrabber(self.get_arm_cam_img_rgb, max_fps)
+        return self.frame_grabber.start()
+    
+    def stop_frame_grabber(self) -> bool:
+        if self.frame_grabber is None:
+            return False
+        return self.frame_grabber.stop()
+    
+    def is_frame_grabber_running(self) -> bool:
+        return self.frame_grabber is not None and self.frame_grabber.is_running()
+    
+    def get_latest_frame(self) -> Tuple[int, Optional[cv2.typing.MatLike]]:
+        """Returns (sequence, frame) without blocking. Without the frame grabber this captures directly and the sequence is 0."""
+        if self.is_frame_grabber_running():
+            return self.frame_grabber.get_latest_frame()
+        return 0, self.get_arm_cam_img_rgb()
+    
+    def wait_for_next_frame(self, last_sequence: int = None, timeout: float = None) -> Tuple[int, Optional[cv2.typing.MatLike]]:
+        """Blocks until a frame newer than last_sequence is captured and returns (sequence, frame)."""
+        if self.is_frame_grabber_running():
+            return self.frame_grabber.wait_for_frame(last_sequence, timeout)
+        return 0, self.get_arm_cam_img_rgb()
+    
+    # frame pyramid - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # the captured frame at full, 1/2 and 1/4 resolution, each level resized once and shared by every consumer
+    
+    def _pyramid_for_frame(self, frame: cv2.typing.MatLike) -> Optional[FramePyramid]:
+        if frame is None:
+            return None
+        pyramid = self.last_frame_pyramid
+        if pyramid is None or pyramid.frame is not frame:
+            pyramid = FramePyramid(frame)
+            self.last_frame_pyramid = pyramid
+        return pyramid
+    
+    def capture_pyramid(self) -> Optional[FramePyramid]:
+        """Like capture_image but returns the frame's pyramid, ask it for the resolution you need instead of resizing."""
+        if self.is_frame_grabber_running():
+            sequence, pyramid = self.frame_grabber.get_latest_pyramid()
+            if sequence == 0:
+                _, pyramid = self.frame_grabber.wait_for_pyramid(0, FIRST_FRAME_TIMEOUT_SECONDS)
+            return pyramid
+        return self._pyramid_for_frame(self.get_arm_cam_img_rgb())
+    
+    def capture_image_level(self, level: int) -> Optional[cv2.typing.MatLike]:
+        """capture_image shrunk by 2^level in each direction, ex: frame_pyramid.PYRAMID_QUARTER."""
+        pyramid = self.capture_pyramid()
+        if pyramid is None:
+            return None
+        return pyramid.get_level(level)
+    
+    def wait_for_next_pyramid(self, last_sequence: int = None, timeout: float = None) -> Tuple[int, Optional[FramePyramid]]:
+        """Like wait_for_next_frame but returns the frame's pyramid."""
+        if self.is_frame_grabber_running():
+            return self.frame_grabber.wait_for_pyramid(last_sequence, timeout)
+        return 0, self._pyramid_for_frame(self.get_arm_cam_img_rgb())
+    
+    # camera intrinsics - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # computed once (at start_arm) and cached, only recomputed when the camera resolution changes
+    
+    def compute_camera_intrinsics(self) -> Optional[CameraIntrinsics]:
+        """Override to ask the hardware for the camera's intrinsics, this is only called when the cache is empty."""
+        return None
+    
+    def get_camera_intrinsics(self) -> Optional[CameraIntrinsics]:
+        """Returns the cached camera intrinsics, computing them if needed. None if the HAL can't provide them."""
+        if self.camera_intrinsics is None:
+            self.camera_intrinsics = self.compute_camera_intrinsics()
+        return self.camera_intrinsics
+    
+    def invalidate_camera_intrinsics(self) -> None:
+        self.camera_intrinsics = None
+    
+    def _check_camera_resolution(self, width: int, height: int) -> None:
+        """HALs call this with each captured frame's size, the cached intrinsics are dropped if the resolution changed."""
+        camera_intrinsics = self.camera_intrinsics
+        if camera_intrinsics is not None and not camera_intrinsics.matches_resolution(width, height):
+            self.invalidate_camera_intrinsics()
+    
     """This function will give the focal length of the camera in pixels, this is required for distance calculation"""
-    def get_camera_focal_length(self) -> float: ...        
+    def get_camera_focal_length(self) -> float:
+        camera_intrinsics = self.get_camera_intrinsics()
+        if camera_intrinsics is None:
+            return -1
+        return camera_intrinsics.fx
     
     def gripper_open(self) -> bool: ...
         #return False
@@ -42,8 +215,40 @@ class HAL_base(ImageProducer):
     def gripper_close(self) -> bool: ...
         #return False
     
+    # non-blocking gripper - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # gripper moves run one at a time on their own worker so arm commands can overlap them
+    
+    def _get_gripper_executor(self) -> ThreadPoolExecutor:
+        if self.gripper_executor is None:
+            self.gripper_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gripper")
+        return self.gripper_executor
+    
+    def gripper_open_async(self) -> "Future[bool]":
+        """Starts opening the gripper and returns right away, the future resolves to gripper_open's result once it is done."""
+        return self._get_gripper_executor().submit(self.gripper_open)
+    
+    def gripper_close_async(self) -> "Future[bool]":
+        """Starts closing the gripper and returns right away, the future resolves to gripper_close's result once it is done."""
+        return self._get_gripper_executor().submit(self.gripper_close)
+    
+    def stop_gripper_worker(self, wait: bool = True) -> None:
+        """Finishes (wait=True) or cancels the queued gripper moves and stops the worker, call before releasing the gripper's pins."""
+        if self.gripper_executor is not None:
+            self.gripper_executor.shutdown(wait=wait, cancel_futures=not wait)
+        self.gripper_executor = None
+    
+    # diagnostics - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    
+    def get_lock_wait_stats(self) -> dict:
+        """Returns {lock name: wait/hold time stats} for HALs that instrument their locks, empty otherwise."""
+        return {}
+    
     # angle limit things - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     
+    def clamp_joint_angle(self, joint_index: int, joint_angle: float) -> float:
+        """Returns joint_angle limited to the joint's min and max."""
+        return min(max(float(joint_angle), self.get_joint_min(joint_index)), self.get_joint_max(joint_index))
+    
     def get_joint_min(self, joint_index: int) -> float:
         if 0 <= joint_index < len(self.joint_limits):
             return self.joint_limits[joint_index][0]
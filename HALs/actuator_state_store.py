@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class ActuatorStateStore:
+    """
+    Remembers the last known pose of the actuators (joint angles, gripper state, ...) across restarts.
+
+    set() only updates memory and returns, a background thread appends the changes to a journal file,
+    one json line per key, batching everything set within flush_interval seconds into one write and one fsync.
+    Setting the same key several times between flushes writes it once.
+    At startup the journal is replayed, the last line for each key wins and a line cut short by a crash is ignored.
+    Once the journal holds compact_after lines it is rewritten as one line per key.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5, compact_after: int = 1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_after = compact_after
+
+        self.state: Dict[str, Any] = {}
+        self.pending: Dict[str, Any] = {}
+        self.journal_lines = 0
+        self.fsync_count = 0
+
+        # guards state, pending and the file, the writer waits on it for changes
+        self.condition = threading.Condition()
+        self.file = None
+        self.keep_running = False
+        self.thread: Optional[threading.Thread] = None
+
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line of a journal cut short by a crash or power loss
+                        continue
+                    self.state[entry["k"]] = entry["v"]
+                    self.journal_lines += 1
+        except FileNotFoundError:
+            pass
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+        with self.condition:
+            if self.journal_lines >= self.compact_after:
+                self._compact()
+            self.file = open(self.path, "a")
+        self.keep_running = True
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        """ Writes everything pending, compacts the journal and stops the writer. """
+        if self.thread is None:
+            return
+        with self.condition:
+            self.keep_running = False
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
+        with self.condition:
+            self.file.close()
+            self.file = None
+            self._compact()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.condition:
+            return self.state.get(key, default)
+
+    def contains(self, key: str) -> bool:
+        with self.condition:
+            return key in self.state
+
+    def set(self, key: str, value: Any) -> None:
+        """ Records a new value, returns right away. The value must be json serializable. """
+        with self.condition:
+            if key in self.state and self.state[key] == value:
+                return
+            self.state[key] = value
+            self.pending[key] = value
+            self.condition.notify_all()
+
+    def flush(self) -> None:
+        """ Writes and fsyncs everything set so far before returning. """
+        with self.condition:
+            self._write_pending()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self.condition:
+                while self.keep_running and len(self.pending) == 0:
+                    self.condition.wait()
+                if not self.keep_running:
+                    self._write_pending()
+                    return
+            # let more changes pile up so they share one write and fsync
+            time.sleep(self.flush_interval)
+            with self.condition:
+                try:
+                    self._write_pending()
+                    if self.journal_lines >= self.compact_after:
+                        self.file.close()
+                        self._compact()
+                        self.file = open(self.path, "a")
+                except Exception as err:
+                    print(f"Exception writing the actuator state journal: {err=}, {type(err)=}")
+
+    def _write_pending(self) -> None:
+        """ INTERNAL, the caller must hold self.condition. """
+        if len(self.pending) == 0 or self.file is None:
+            return
+        self.file.write("".join(json.dumps({"k": key, "v": value}) + "\n" for key, value in self.pending.items()))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.fsync_count += 1
+        self.journal_lines += len(self.pending)
+        self.pending = {}
+
+    def _compact(self) -> None:
+        """ INTERNAL, the caller must hold self.condition and have closed self.file. Rewrites the journal as one line per key. """
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write("".join(json.dumps({"k": key, "v": value}) + "\n" for key, value in self.state.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        # atomic, a crash leaves either the old journal or the compacted one
+        os.replace(temp_path, self.path)
+        self.journal_lines = len(self.state)
+        self.pending = {}
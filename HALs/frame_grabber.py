@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import cv2
+
+from HALs.frame_pyramid import FramePyramid
+
+# how long to back off when the camera has no frame for us or throws
+CAPTURE_RETRY_DELAY_SECONDS = 0.01
+
+class FrameGrabber:
+    """
+    Reads the camera on one background thread and keeps the newest frame in a sequence numbered slot.
+    Any number of consumers can read the slot without blocking or wait for the next frame,
+    so the camera is read once per frame no matter how many consumers there are.
+    Each frame comes with a FramePyramid so consumers that want a smaller copy share the resize too.
+    Frames are published read-only since every consumer gets the same array, copy one before drawing on it.
+    """
+
+    def __init__(self, capture_fnc: Callable[[], cv2.typing.MatLike], max_fps: float = 0):
+        """
+        Args:
+            capture_fnc: Grabs a new frame from the hardware, ex: HAL_base.get_arm_cam_img_rgb.
+            max_fps: Upper bound on captures per second, 0 captures as fast as capture_fnc returns.
+        """
+        self.capture_fnc = capture_fnc
+        self.min_frame_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+
+        self.condition = threading.Condition()
+        self.latest_frame: Optional[cv2.typing.MatLike] = None
+        # the array capture_fnc handed back for latest_frame, which is a read-only view of it
+        self.latest_captured_frame: Optional[cv2.typing.MatLike] = None
+        self.latest_pyramid: Optional[FramePyramid] = None
+        self.latest_sequence: int = 0
+        self.latest_timestamp: float = 0.0
+
+        self.keep_running = False
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        if self.is_running():
+            return False
+        self.keep_running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self) -> bool:
+        if not self.is_running():
+            return False
+        self.keep_running = False
+        with self.condition:
+            # wake anyone waiting so they can notice we stopped
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
+        return True
+
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def get_latest_frame(self) -> Tuple[int, Optional[cv2.typing.MatLike]]:
+        """ Returns (sequence, frame) for the newest frame without blocking, (0, None) before the first capture. """
+        with self.condition:
+            return self.latest_sequence, self.latest_frame
+
+    def wait_for_frame(self, after_sequence: int = None, timeout: float = None) -> Tuple[int, Optional[cv2.typing.MatLike]]:
+        """
+        Blocks until a frame newer than after_sequence exists and returns (sequence, frame).
+        If after_sequence is None this waits for the next frame to be captured.
+        On timeout, or if the grabber stops, the newest frame available is returned.
+        """
+        with self.condition:
+            if after_sequence is None:
+                after_sequence = self.latest_sequence
+            self.condition.wait_for(lambda: self.latest_sequence > after_sequence or not self.keep_running, timeout)
+            return self.latest_sequence, self.latest_frame
+
+    def get_latest_pyramid(self) -> Tuple[int, Optional[FramePyramid]]:
+        """ Like get_latest_frame but returns the newest frame's pyramid. """
+        with self.condition:
+            return self.latest_sequence, self.latest_pyramid
+
+    def wait_for_pyramid(self, after_sequence: int = None, timeout: float = None) -> Tuple[int, Optional[FramePyramid]]:
+        """ Like wait_for_frame but returns the frame's pyramid. """
+        with self.condition:
+            if after_sequence is None:
+                after_sequence = self.latest_sequence
+            self.condition.wait_for(lambda: self.latest_sequence > after_sequence or not self.keep_running, timeout)
+            return self.latest_sequence, self.latest_pyramid
+
+    def _capture_loop(self) -> None:
+        while self.keep_running:
+            capture_start = time.monotonic()
+            try:
+                frame = self.capture_fnc()
+            except Exception as err:
+                print(f"Exception in the frame grabber: {err=}, {type(err)=}")
+                frame = None
+
+            # some HALs hand back the same cached frame until a new one arrives, don't count those twice
+            if frame is None or frame is self.latest_captured_frame:
+                time.sleep(CAPTURE_RETRY_DELAY_SECONDS)
+                continue
+            self.latest_captured_frame = frame
+            # a read-only view, the HAL's own array stays writeable
+            frame = frame.view()
+            frame.flags.writeable = False
+
+            with self.condition:
+                self.latest_frame = frame
+                # nothing is resized until a consumer asks for a smaller level
+                self.latest_pyramid = FramePyramid(frame)
+                self.latest_sequence += 1
+                self.latest_timestamp = time.monotonic()
+                self.condition.notify_all()
+
+            sleep_time = self.min_frame_interval - (time.monotonic() - capture_start)
+            if sleep_time > 0:
+                time.sleep(sleep_time)
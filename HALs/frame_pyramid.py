@@ -0,0 +1,57 @@
+import threading
+from typing import List, Optional
+
+import cv2
+
+# pyramid levels, each one is half the width and height of the one before
+PYRAMID_FULL = 0
+PYRAMID_HALF = 1
+PYRAMID_QUARTER = 2
+PYRAMID_LEVEL_COUNT = 3
+
+class FramePyramid:
+    """
+    One captured frame at full, 1/2 and 1/4 resolution.
+    Levels are only computed the first time someone asks for them, each from the level above it, then kept,
+    so every consumer of the same frame shares one resize per level.
+    The levels are shared: don't draw on them, copy first.
+    """
+
+    def __init__(self, frame: cv2.typing.MatLike):
+        self.levels: List[Optional[cv2.typing.MatLike]] = [None] * PYRAMID_LEVEL_COUNT
+        self.levels[PYRAMID_FULL] = frame
+        # consumers on different threads asking for the same level at once share one resize
+        self.lock = threading.Lock()
+
+    @property
+    def frame(self) -> cv2.typing.MatLike:
+        """ The full resolution frame. """
+        return self.levels[PYRAMID_FULL]
+
+    def get_level(self, level: int) -> cv2.typing.MatLike:
+        """ The frame shrunk by 2^level in each direction, ex: PYRAMID_QUARTER. """
+        if level < 0 or level >= PYRAMID_LEVEL_COUNT:
+            raise ValueError(f"pyramid level {level} is not between 0 and {PYRAMID_LEVEL_COUNT - 1}")
+        image = self.levels[level]
+        if image is not None:
+            return image
+        with self.lock:
+            for index in range(1, level + 1):
+                if self.levels[index] is None:
+                    # an exact 2x INTER_AREA shrink averages each 2x2 block, fast and without aliasing
+                    self.levels[index] = cv2.resize(self.levels[index - 1], (0, 0), fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+            return self.levels[level]
+
+    def get_scale(self, scale: float) -> cv2.typing.MatLike:
+        """ The level for scale 1, 0.5 or 0.25. """
+        return self.get_level(level_for_scale(scale))
+
+    def is_computed(self, level: int) -> bool:
+        return self.levels[level] is not None
+
+def level_for_scale(scale: float) -> int:
+    """ The pyramid level that is scale times the full resolution, raises a ValueError if there isn't one. """
+    for level in range(PYRAMID_LEVEL_COUNT):
+        if abs(scale - 0.5 ** level) < 1e-9:
+            return level
+    raise ValueError(f"no pyramid level for scale {scale}, use 1, 0.5 or 0.25")
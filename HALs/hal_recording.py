@@ -0,0 +1,165 @@
+import json
+import queue
+import struct
+import threading
+import time
+from typing import BinaryIO, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+# File layout: MAGIC, then records back to back. Every record is a RECORD_HEADER followed by its payload.
+MAGIC = b"ARMREC\x00\x01"
+
+# record type (uint8), seconds since the recording started (float64), payload length in bytes (uint32)
+RECORD_HEADER = struct.Struct("<BdI")
+
+RECORD_META = 0      # json: joint count, camera intrinsics, ...
+RECORD_FRAME = 1     # JPEG bytes of one camera frame
+RECORD_JOINTS = 2    # float64 joint angles in degrees
+RECORD_COMMAND = 3   # json: {"command": name, "args": [...]}
+
+DEFAULT_JPEG_QUALITY = 90
+
+class HALRecord:
+    """ One record read back from a recording. """
+
+    def __init__(self, record_type: int, timestamp: float, payload: bytes):
+        self.record_type = record_type
+        self.timestamp = timestamp
+        self.payload = payload
+
+    def json(self) -> dict:
+        return json.loads(self.payload.decode("utf-8"))
+
+    def joint_angles(self) -> np.ndarray:
+        return np.frombuffer(self.payload, dtype="<f8")
+
+    def frame(self) -> cv2.typing.MatLike:
+        return decode_frame(self.payload)
+
+def encode_frame(frame_rgb: cv2.typing.MatLike, jpeg_quality: int = DEFAULT_JPEG_QUALITY) -> bytes:
+    # the channels are stored in the order they are given and decode_frame returns them in that same order,
+    # so there is no need to convert to BGR and back
+    ok, jpeg = cv2.imencode(".jpg", frame_rgb, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    if not ok:
+        raise ValueError("Failed to JPEG encode the frame")
+    return jpeg.tobytes()
+
+def decode_frame(jpeg: bytes) -> cv2.typing.MatLike:
+    return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def read_records(file: BinaryIO) -> Iterator[HALRecord]:
+    """ Yields every record in a recording, a record cut short (ex: the recorder was killed) ends the iteration. """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not an arm recording, the file header does not match")
+    while True:
+        header = file.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return
+        record_type, timestamp, length = RECORD_HEADER.unpack(header)
+        payload = file.read(length)
+        if len(payload) < length:
+            return
+        yield HALRecord(record_type, timestamp, payload)
+
+def load_recording(path: str) -> List[HALRecord]:
+    with open(path, "rb") as file:
+        return list(read_records(file))
+
+class HALRecorder:
+    """
+    Writes timestamped frames, joint states and commands to a recording file.
+    Callers only timestamp and queue, JPEG encoding and disk writes happen on a background thread
+    so recording barely changes the timing of the code being recorded.
+    If the writer falls behind, frames are dropped (and counted) rather than blocking the caller, other records are never dropped.
+    """
+
+    def __init__(self, path: str, jpeg_quality: int = DEFAULT_JPEG_QUALITY, max_queued_frames: int = 8):
+        self.path = path
+        self.jpeg_quality = jpeg_quality
+        self.max_queued_frames = max_queued_frames
+
+        self.queue: "queue.Queue" = queue.Queue()
+        self.queued_frames = 0
+        self.queued_frames_lock = threading.Lock()
+        self.dropped_frames = 0
+        self.written_records = 0
+
+        self.start_time = 0.0
+        self.file: Optional[BinaryIO] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.file = open(self.path, "wb")
+        self.file.write(MAGIC)
+        self.start_time = time.monotonic()
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """ Writes everything still queued and closes the file. """
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
+        self.file = None
+
+    def is_recording(self) -> bool:
+        return self.thread is not None
+
+    def _timestamp(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def record_meta(self, meta: dict) -> None:
+        self.queue.put((RECORD_META, self._timestamp(), json.dumps(meta).encode("utf-8")))
+
+    def record_frame(self, frame_rgb: cv2.typing.MatLike) -> None:
+        if frame_rgb is None:
+            return
+        timestamp = self._timestamp()
+        with self.queued_frames_lock:
+            if self.queued_frames >= self.max_queued_frames:
+                self.dropped_frames += 1
+                return
+            self.queued_frames += 1
+        # the HAL may reuse or hand out read-only views of its buffer, the writer thread needs its own
+        self.queue.put((RECORD_FRAME, timestamp, np.array(frame_rgb, copy=True)))
+
+    def record_joints(self, joint_angles) -> None:
+        self.queue.put((RECORD_JOINTS, self._timestamp(), np.asarray(joint_angles, dtype="<f8").tobytes()))
+
+    def record_command(self, command: str, *args) -> None:
+        payload = json.dumps({"command": command, "args": [_to_json(arg) for arg in args]}).encode("utf-8")
+        self.queue.put((RECORD_COMMAND, self._timestamp(), payload))
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            record_type, timestamp, payload = item
+            if record_type == RECORD_FRAME:
+                with self.queued_frames_lock:
+                    self.queued_frames -= 1
+                try:
+                    payload = encode_frame(payload, self.jpeg_quality)
+                except Exception as err:
+                    print(f"Exception encoding a recorded frame: {err=}, {type(err)=}")
+                    continue
+            self.file.write(RECORD_HEADER.pack(record_type, timestamp, len(payload)))
+            self.file.write(payload)
+            self.written_records += 1
+        self.file.flush()
+
+def _to_json(value):
+    """ Numpy arrays and scalars from the controllers aren't json serializable, convert them to plain lists and floats. """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    return value
@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+# how many batches can be waiting on the server at once, each uses one kept-alive connection from the session's pool
+DEFAULT_MAX_IN_FLIGHT = 2
+# how many recent command latencies the metrics are computed over
+LATENCY_HISTORY = 500
+
+class _Ack:
+    """ One set_joints call's future, resolved once every joint it set has been answered. """
+
+    def __init__(self, future: Future, remaining: int):
+        self.future = future
+        self.remaining = remaining
+        self.success = True
+        self.error: Optional[Exception] = None
+
+class _PendingTarget:
+    """ The newest target for one joint, and every call waiting to hear it was applied. """
+
+    def __init__(self, angle: float, queued_at: float):
+        self.angle = angle
+        # when the oldest update this target replaced was queued, latency is measured from there
+        self.queued_at = queued_at
+        self.acks: List[_Ack] = []
+
+class RemoteCommandQueue:
+    """
+    Sends joint targets to the remote arm in the background so the caller never waits on HTTP.
+    Targets are coalesced per joint: until a joint's target is sent, a newer target for it replaces the old one.
+    Everything pending goes out as one set_joints request, up to max_in_flight requests are on the wire at once.
+    A joint is never in two requests at the same time, so targets for one joint are applied in the order they were set.
+    Each call's future resolves to True once the server accepted every target it set (or the newer targets that replaced them),
+    to False if the server refused one, or to the exception if a request failed.
+    """
+
+    def __init__(self, send_fnc: Callable[[List[float], List[bool]], bool], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 on_error: Callable[[Dict[int, float], Optional[Exception]], None] = None):
+        """
+        Args:
+            send_fnc: Sends one batch, called with (joint_angles, mask) like RemoteArmInterface.set_joints.
+            max_in_flight: How many batches can be waiting on a reply at once.
+            on_error: Called from a sender thread with the failed targets and the exception (None if the server said no).
+        """
+        self.send_fnc = send_fnc
+        self.max_in_flight = max_in_flight
+        self.on_error = on_error
+
+        # guards everything below, the senders wait on it for work
+        self.condition = threading.Condition()
+        self.pending: Dict[int, _PendingTarget] = {}
+        self.in_flight_joints = set()
+        self.in_flight_batches = 0
+
+        # metrics
+        self.queued_count = 0
+        self.coalesced_count = 0
+        self.sent_batches = 0
+        self.acked_count = 0
+        self.failed_count = 0
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+        self.keep_running = False
+        self.threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        if len(self.threads) > 0:
+            return
+        self.keep_running = True
+        # one thread per in flight batch, each blocks on its own request
+        for i in range(self.max_in_flight):
+            thread = threading.Thread(target=self._send_loop, name=f"remote-commands-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, flush_timeout: float = 1.0) -> bool:
+        """ Waits up to flush_timeout seconds for queued targets to be sent, then stops. Returns False if some never were. """
+        flushed = self.flush(flush_timeout)
+        with self.condition:
+            self.keep_running = False
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        # whatever is left was never sent
+        with self.condition:
+            unsent = self.pending
+            self.pending = {}
+        self._resolve(unsent, False, None)
+        return flushed
+
+    def set_joint(self, joint_index: int, joint_angle: float) -> "Future[bool]":
+        """ Queues a target and returns right away. """
+        return self.set_joints({joint_index: joint_angle})
+
+    def set_joints(self, targets: Dict[int, float]) -> "Future[bool]":
+        """ Queues several targets, the future resolves once all of them were applied. """
+        now = time.perf_counter()
+        future = Future()
+        future.set_running_or_notify_cancel()
+        if len(targets) == 0:
+            future.set_result(True)
+            return future
+        ack = _Ack(future, len(targets))
+        with self.condition:
+            for joint_index, joint_angle in targets.items():
+                target = self.pending.get(joint_index)
+                if target is None:
+                    target = _PendingTarget(float(joint_angle), now)
+                    self.pending[joint_index] = target
+                else:
+                    # not sent yet, the newest target wins
+                    target.angle = float(joint_angle)
+                    self.coalesced_count += 1
+                target.acks.append(ack)
+            self.queued_count += len(targets)
+            self.condition.notify()
+        return future
+
+    def flush(self, timeout: float = None) -> bool:
+        """ Blocks until every queued target has been sent and answered, returns False on timeout. """
+        with self.condition:
+            return self.condition.wait_for(lambda: len(self.pending) == 0 and self.in_flight_batches == 0, timeout)
+
+    def queue_depth(self) -> int:
+        """ Joints with a target waiting to be sent. """
+        with self.condition:
+            return len(self.pending)
+
+    def get_metrics(self) -> Dict[str, float]:
+        with self.condition:
+            latencies = sorted(self.latencies)
+            metrics = {
+                "queue_depth": len(self.pending),
+                "in_flight_batches": self.in_flight_batches,
+                "queued": self.queued_count,
+                "coalesced": self.coalesced_count,
+                "sent_batches": self.sent_batches,
+                "acked": self.acked_count,
+                "failed": self.failed_count,
+            }
+        # end to end, from set_joint to the server's reply
+        metrics["latency_p50_ms"] = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+        metrics["latency_p99_ms"] = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000 if latencies else 0.0
+        return metrics
+
+    def _take_batch(self) -> Dict[int, _PendingTarget]:
+        """ INTERNAL, the caller must hold self.condition. Removes every pending target whose joint isn't already in flight. """
+        batch = {joint_index: target for joint_index, target in self.pending.items() if joint_index not in self.in_flight_joints}
+        for joint_index in batch:
+            del self.pending[joint_index]
+        return batch
+
+    def _send_loop(self) -> None:
+        while True:
+            with self.condition:
+                batch = {}
+                while self.keep_running:
+                    batch = self._take_batch()
+                    if len(batch) > 0:
+                        break
+                    self.condition.wait()
+                if len(batch) == 0:
+                    return
+                self.in_flight_joints.update(batch.keys())
+                self.in_flight_batches += 1
+                self.sent_batches += 1
+
+            error = None
+            try:
+                success = self._send(batch)
+            except Exception as err:
+                success = False
+                error = err
+
+            done_at = time.perf_counter()
+            try:
+                if not success:
+                    self._report_error(batch, error)
+            finally:
+                # whatever the error callback did, the futures resolve and the joints are freed or they'd never be sent again
+                self._resolve(batch, success, error)
+
+                with self.condition:
+                    self.in_flight_joints.difference_update(batch.keys())
+                    self.in_flight_batches -= 1
+                    if success:
+                        self.acked_count += len(batch)
+                        self.latencies.extend(done_at - target.queued_at for target in batch.values())
+                    else:
+                        self.failed_count += len(batch)
+                    # the joints are free again, pending targets for them can go now, and flush may be done
+                    self.condition.notify_all()
+
+    def _report_error(self, batch: Dict[int, _PendingTarget], error: Optional[Exception]) -> None:
+        if self.on_error is None:
+            print(f"Exception sending remote joint targets {sorted(batch.keys())}: {error=}, {type(error)=}")
+            return
+        try:
+            self.on_error({joint_index: target.angle for joint_index, target in batch.items()}, error)
+        except Exception as err:
+            # the callback must not take the sender thread down with it
+            print(f"Exception in the remote joint target error callback: {err=}, {type(err)=}")
+
+    def _send(self, batch: Dict[int, _PendingTarget]) -> bool:
+        joint_angles = [0.0] * (max(batch.keys()) + 1)
+        mask = [False] * len(joint_angles)
+        for joint_index, target in batch.items():
+            joint_angles[joint_index] = target.angle
+            mask[joint_index] = True
+        return self.send_fnc(joint_angles, mask)
+
+    def _resolve(self, batch: Dict[int, _PendingTarget], success: bool, error: Optional[Exception]) -> None:
+        finished: List[_Ack] = []
+        with self.condition:
+            for target in batch.values():
+                for ack in target.acks:
+                    ack.remaining -= 1
+                    if not success:
+                        ack.success = False
+                        ack.error = ack.error or error
+                    if ack.remaining == 0:
+                        finished.append(ack)
+        # outside the lock, a future's callbacks may queue more targets
+        for ack in finished:
+            if ack.future.done():
+                # cancelled by its caller
+                continue
+            if ack.error is not None:
+                ack.future.set_exception(ack.error)
+            else:
+                ack.future.set_result(ack.success)
@@ -0,0 +1,152 @@
+"""
+Binary messages for the /ws/control WebSocket, shared by the server and the clients.
+
+Every message is one binary WebSocket frame, little-endian, starting with a 1 byte message type.
+Client to server:
+    SET_JOINTS      type u8, seq u32, count u16, then count x (joint_index u8, angle_degrees f32)
+    GET_JOINTS      type u8, seq u32
+    SUBSCRIBE       type u8, rate_hz u16 (0 stops the telemetry), flags u8 (TELEMETRY_JOINTS | TELEMETRY_DETECTIONS)
+Server to client:
+    ACK             type u8, seq u32, success u8
+    JOINT_STATE     type u8, seq u32 (0 for telemetry), timestamp f64 (server time.time()), count u16, then count x angle f32
+    DETECTIONS      type u8, timestamp f64, frame_width u16, frame_height u16, count u16, then per object
+                    top_left_x i16, top_left_y i16, width i16, height i16, radius f32, label_length u8, label utf-8
+    ERROR           type u8, seq u32 (0 if the message had none), message_length u16, message utf-8
+"""
+import struct
+from typing import Dict, List, Tuple
+
+MSG_SET_JOINTS = 1
+MSG_GET_JOINTS = 2
+MSG_SUBSCRIBE = 3
+MSG_ACK = 16
+MSG_JOINT_STATE = 17
+MSG_DETECTIONS = 18
+MSG_ERROR = 19
+
+TELEMETRY_JOINTS = 1
+TELEMETRY_DETECTIONS = 2
+
+_TYPE = struct.Struct("<B")
+_SEQ_HEADER = struct.Struct("<BI")
+_SET_JOINTS_HEADER = struct.Struct("<BIH")
+_JOINT_TARGET = struct.Struct("<Bf")
+_SUBSCRIBE = struct.Struct("<BHB")
+_ACK = struct.Struct("<BIB")
+_JOINT_STATE_HEADER = struct.Struct("<BIdH")
+_DETECTIONS_HEADER = struct.Struct("<BdHHH")
+_DETECTION = struct.Struct("<hhhhfB")
+_ERROR_HEADER = struct.Struct("<BIH")
+
+class ProtocolError(ValueError):
+    """ A message that is too short, has an unknown type or doesn't match its declared sizes. """
+
+class Detection:
+    """ One detected object as sent in a DETECTIONS message, in pixels of a frame_width x frame_height frame. """
+
+    def __init__(self, label: str, top_left_x: int, top_left_y: int, width: int, height: int, radius: float):
+        self.label = label
+        self.top_left_x = top_left_x
+        self.top_left_y = top_left_y
+        self.width = width
+        self.height = height
+        self.radius = radius
+
+    def __repr__(self) -> str:
+        return f"Detection({self.label!r}, {self.top_left_x}, {self.top_left_y}, {self.width}, {self.height}, {self.radius:.1f})"
+
+def message_type(message: bytes) -> int:
+    if len(message) < _TYPE.size:
+        raise ProtocolError("empty message")
+    return message[0]
+
+# client to server - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def encode_set_joints(seq: int, targets: Dict[int, float]) -> bytes:
+    parts = [_SET_JOINTS_HEADER.pack(MSG_SET_JOINTS, seq, len(targets))]
+    parts += [_JOINT_TARGET.pack(joint_index, joint_angle) for joint_index, joint_angle in targets.items()]
+    return b"".join(parts)
+
+def decode_set_joints(message: bytes) -> Tuple[int, Dict[int, float]]:
+    _, seq, count = _unpack_header(_SET_JOINTS_HEADER, message)
+    _check_size(message, _SET_JOINTS_HEADER.size + count * _JOINT_TARGET.size)
+    targets = {}
+    for joint_index, joint_angle in _JOINT_TARGET.iter_unpack(message[_SET_JOINTS_HEADER.size:_SET_JOINTS_HEADER.size + count * _JOINT_TARGET.size]):
+        targets[joint_index] = joint_angle
+    return seq, targets
+
+def encode_get_joints(seq: int) -> bytes:
+    return _SEQ_HEADER.pack(MSG_GET_JOINTS, seq)
+
+def decode_get_joints(message: bytes) -> int:
+    return _unpack_header(_SEQ_HEADER, message)[1]
+
+def encode_subscribe(rate_hz: int, flags: int) -> bytes:
+    return _SUBSCRIBE.pack(MSG_SUBSCRIBE, rate_hz, flags)
+
+def decode_subscribe(message: bytes) -> Tuple[int, int]:
+    _, rate_hz, flags = _unpack_header(_SUBSCRIBE, message)
+    return rate_hz, flags
+
+# server to client - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def encode_ack(seq: int, success: bool) -> bytes:
+    return _ACK.pack(MSG_ACK, seq, 1 if success else 0)
+
+def decode_ack(message: bytes) -> Tuple[int, bool]:
+    _, seq, success = _unpack_header(_ACK, message)
+    return seq, success != 0
+
+def encode_joint_state(seq: int, timestamp: float, joint_angles) -> bytes:
+    return _JOINT_STATE_HEADER.pack(MSG_JOINT_STATE, seq, timestamp, len(joint_angles)) + struct.pack(f"<{len(joint_angles)}f", *joint_angles)
+
+def decode_joint_state(message: bytes) -> Tuple[int, float, List[float]]:
+    _, seq, timestamp, count = _unpack_header(_JOINT_STATE_HEADER, message)
+    _check_size(message, _JOINT_STATE_HEADER.size + count * 4)
+    return seq, timestamp, list(struct.unpack_from(f"<{count}f", message, _JOINT_STATE_HEADER.size))
+
+def encode_detections(timestamp: float, frame_width: int, frame_height: int, vision_objects) -> bytes:
+    """ vision_objects are VisionObjects (or anything with the same fields), labels are cut to 255 bytes. """
+    parts = [_DETECTIONS_HEADER.pack(MSG_DETECTIONS, timestamp, frame_width, frame_height, len(vision_objects))]
+    for obj in vision_objects:
+        label = str(obj.label).encode("utf-8")[:255]
+        parts.append(_DETECTION.pack(_clamp_i16(obj.top_left_x), _clamp_i16(obj.top_left_y), _clamp_i16(obj.width), _clamp_i16(obj.height),
+                                     float(obj.radius), len(label)))
+        parts.append(label)
+    return b"".join(parts)
+
+def decode_detections(message: bytes) -> Tuple[float, int, int, List[Detection]]:
+    _, timestamp, frame_width, frame_height, count = _unpack_header(_DETECTIONS_HEADER, message)
+    offset = _DETECTIONS_HEADER.size
+    detections = []
+    for _ in range(count):
+        _check_size(message, offset + _DETECTION.size)
+        top_left_x, top_left_y, width, height, radius, label_length = _DETECTION.unpack_from(message, offset)
+        offset += _DETECTION.size
+        _check_size(message, offset + label_length)
+        label = bytes(message[offset:offset + label_length]).decode("utf-8", errors="replace")
+        offset += label_length
+        detections.append(Detection(label, top_left_x, top_left_y, width, height, radius))
+    return timestamp, frame_width, frame_height, detections
+
+def encode_error(seq: int, text: str) -> bytes:
+    encoded = text.encode("utf-8")[:0xFFFF]
+    return _ERROR_HEADER.pack(MSG_ERROR, seq, len(encoded)) + encoded
+
+def decode_error(message: bytes) -> Tuple[int, str]:
+    _, seq, length = _unpack_header(_ERROR_HEADER, message)
+    _check_size(message, _ERROR_HEADER.size + length)
+    return seq, bytes(message[_ERROR_HEADER.size:_ERROR_HEADER.size + length]).decode("utf-8", errors="replace")
+
+# helpers - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def _unpack_header(header: struct.Struct, message: bytes) -> tuple:
+    _check_size(message, header.size)
+    return header.unpack_from(message, 0)
+
+def _check_size(message: bytes, size: int) -> None:
+    if len(message) < size:
+        raise ProtocolError(f"message type {message[0] if len(message) else '?'} is {len(message)} bytes, expected at least {size}")
+
+def _clamp_i16(value) -> int:
+    return max(-32768, min(32767, int(value)))
@@ -0,0 +1,187 @@
+import threading
+from typing import Callable, List, Optional
+
+import cv2
+import numpy as np
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+HEADER_END = b'\r\n\r\n'
+
+# parser states
+_STATE_HEADERS = 0      # between parts, waiting for the part headers (or a bare JPEG)
+_STATE_BODY_LENGTH = 1  # reading a body whose size the Content-Length header gave us
+_STATE_BODY_SCAN = 2    # reading a body without a Content-Length, looking for the JPEG end marker
+
+class MJPEGParser:
+    """
+    Splits a multipart/x-mixed-replace MJPEG stream into JPEGs as the bytes arrive.
+    Every byte is scanned once: searches resume where the last chunk's search stopped, and consumed bytes are dropped from
+    the front of the buffer once per feed. When a part has a Content-Length header the body is sliced out without scanning it
+    at all, otherwise the body ends at the JPEG end marker. Streams of bare concatenated JPEGs work too.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.state = _STATE_HEADERS
+        # where the next search in the buffer starts, so bytes already searched aren't searched again
+        self.scan_position = 0
+        self.body_start = 0
+        self.body_length = 0
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """ Adds the next bytes of the stream and returns the JPEGs they completed, oldest first. """
+        self.buffer += chunk
+        jpegs = []
+        while True:
+            if self.state == _STATE_HEADERS:
+                if not self._parse_headers():
+                    break
+            elif self.state == _STATE_BODY_LENGTH:
+                body_end = self.body_start + self.body_length
+                if len(self.buffer) < body_end:
+                    break
+                jpegs.append(bytes(self.buffer[self.body_start:body_end]))
+                self._end_part(body_end)
+            else:
+                eoi = self.buffer.find(JPEG_EOI, self.scan_position)
+                if eoi == -1:
+                    # the marker could be split across chunks, search its first byte again next time
+                    self.scan_position = max(self.body_start, len(self.buffer) - 1)
+                    break
+                jpegs.append(bytes(self.buffer[self.body_start:eoi + 2]))
+                self._end_part(eoi + 2)
+        self._discard_consumed()
+        return jpegs
+
+    def _parse_headers(self) -> bool:
+        """ Returns True once the next part's body has been found. """
+        # skip the CRLF that ends the previous part
+        start = self.scan_position
+        while start < len(self.buffer) and self.buffer[start] in b'\r\n':
+            start += 1
+        self.scan_position = start
+        if len(self.buffer) - start < 2:
+            return False
+
+        if self.buffer.startswith(JPEG_SOI, start):
+            # no part headers, a bare JPEG
+            self._start_scan_body(start)
+            return True
+
+        if self.buffer.startswith(b'--', start):
+            header_end = self.buffer.find(HEADER_END, start)
+            if header_end == -1:
+                # keep the start, headers are short so searching them again is cheap
+                return False
+            content_length = self._content_length(self.buffer[start:header_end])
+            body_start = header_end + len(HEADER_END)
+            if content_length is not None:
+                self.state = _STATE_BODY_LENGTH
+                self.body_start = body_start
+                self.body_length = content_length
+            else:
+                self._start_scan_body(body_start)
+            return True
+
+        # out of sync (ex: joined the stream mid part), skip to the next JPEG
+        soi = self.buffer.find(JPEG_SOI, start)
+        if soi == -1:
+            self.scan_position = max(start, len(self.buffer) - 1)
+            return False
+        self._start_scan_body(soi)
+        return True
+
+    @staticmethod
+    def _content_length(headers: bytearray) -> Optional[int]:
+        for line in bytes(headers).split(b'\r\n'):
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                try:
+                    return int(value.strip())
+                except ValueError:
+                    return None
+        return None
+
+    def _start_scan_body(self, body_start: int) -> None:
+        self.state = _STATE_BODY_SCAN
+        self.body_start = body_start
+        self.scan_position = body_start + len(JPEG_SOI)
+
+    def _end_part(self, end: int) -> None:
+        self.state = _STATE_HEADERS
+        self.scan_position = end
+
+    def _discard_consumed(self) -> None:
+        # everything before the current part (or before the search position between parts) has been used
+        consumed = self.scan_position if self.state == _STATE_HEADERS else self.body_start
+        if consumed == 0:
+            return
+        del self.buffer[:consumed]
+        self.scan_position -= consumed
+        if self.state != _STATE_HEADERS:
+            self.body_start -= consumed
+
+class LatestFrameDecoder:
+    """
+    Decodes JPEGs on its own thread so the network thread only receives.
+    Holds at most one JPEG waiting to be decoded: a newer one replaces it, so a slow consumer
+    only ever sees the newest frame instead of falling further behind.
+    """
+
+    def __init__(self, on_frame_callback: Callable[[cv2.typing.MatLike], None]):
+        """
+        Args:
+            on_frame_callback: Called on the decode thread with each decoded BGR frame.
+        """
+        self.on_frame_callback = on_frame_callback
+        self.condition = threading.Condition()
+        self.pending_jpeg: Optional[bytes] = None
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+
+        self.keep_running = False
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+        self.keep_running = True
+        self.thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.thread is None:
+            return
+        with self.condition:
+            self.keep_running = False
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
+
+    def submit(self, jpeg: bytes) -> None:
+        """ Returns right away, replaces the JPEG waiting to be decoded if there is one. """
+        with self.condition:
+            if self.pending_jpeg is not None:
+                self.frames_dropped += 1
+            self.pending_jpeg = jpeg
+            self.frames_received += 1
+            self.condition.notify()
+
+    def _decode_loop(self) -> None:
+        while True:
+            with self.condition:
+                while self.keep_running and self.pending_jpeg is None:
+                    self.condition.wait()
+                if not self.keep_running:
+                    return
+                jpeg = self.pending_jpeg
+                self.pending_jpeg = None
+            try:
+                img = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if img is not None:
+                    self.frames_decoded += 1
+                    self.on_frame_callback(img)
+            except Exception as err:
+                print(f"Exception decoding the camera stream: {err=}, {type(err)=}")
@@ -1,73 +1,148 @@
 # remote_arm_interface.py
 import requests
 import threading
-import cv2
-import numpy as np
 from io import BytesIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from HALs.http_remote.mjpeg_stream import MJPEGParser, LatestFrameDecoder
+
+# seconds to wait for the connection and for each response
+DEFAULT_CONNECT_TIMEOUT = 1.0
+DEFAULT_READ_TIMEOUT = 2.0
+# the server sends a frame at least every second, a stream this quiet is dead and gets reopened
+STREAM_READ_TIMEOUT = 5.0
+# a dropped or stalled stream is reopened after this long, doubling on each failed attempt up to the max
+STREAM_RECONNECT_DELAY_SECONDS = 0.5
+STREAM_RECONNECT_MAX_DELAY_SECONDS = 10.0
+# kept-alive connections to the server, enough for a controller, a joint cache refresh and a UI calling at once
+DEFAULT_POOL_SIZE = 4
+DEFAULT_RETRIES = 2
+# the first retry waits this long, then it doubles
+RETRY_BACKOFF_SECONDS = 0.05
 
 class RemoteArmInterface:
-    """Handles all direct interaction with the robotic arm over HTTP."""
+    """
+    Handles all direct interaction with the robotic arm over HTTP.
+    Every call goes through one requests.Session so connections are kept alive and reused instead of opening one per call.
+    Calls time out instead of hanging, and failed connections and gateway errors are retried a few times.
+    """
 
-    def __init__(self, base_url="http://127.0.0.1:8000"):
+    def __init__(self, base_url="http://127.0.0.1:8000", timeout: float = DEFAULT_READ_TIMEOUT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, retries: int = DEFAULT_RETRIES, pool_size: int = DEFAULT_POOL_SIZE):
         self.base_url = base_url
+        self.timeout = (connect_timeout, timeout)
+        self.session = self._make_session(retries, pool_size)
         self._streaming_thread = None
         self._streaming_event = threading.Event()
+        self._frame_decoder: LatestFrameDecoder = None
+
+    @staticmethod
+    def _make_session(retries: int, pool_size: int) -> requests.Session:
+        # every POST sets an absolute state (a joint angle, gripper open), sending one twice is harmless so they can be retried too
+        retry = Retry(total=retries, backoff_factor=RETRY_BACKOFF_SECONDS, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET", "POST"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _get(self, path: str, **kwargs) -> requests.Response:
+        return self.session.get(f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+
+    def _post(self, path: str, **kwargs) -> requests.Response:
+        return self.session.post(f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+
+    def close(self):
+        """Stops the camera stream and closes the kept-alive connections."""
+        self.stop_camera_stream()
+        self.session.close()
 
     def get_joint(self, joint_index: int) -> float:
         """Get the current angle of the specified joint."""
-        response = requests.get(f"{self.base_url}/get_joint", params={"joint_index": joint_index})
+        response = self._get("/get_joint", params={"joint_index": joint_index})
         return response.json().get("joint_angle", 0.0)
 
     def set_joint(self, joint_index: int, joint_angle: float) -> bool:
         """Set the angle of the specified joint."""
-        response = requests.post(f"{self.base_url}/set_joint", json={
+        response = self._post("/set_joint", json={
             "joint_index": joint_index,
             "joint_angle": joint_angle
         })
         return response.ok and response.json().get("success", False)
 
+    def get_joints(self) -> list[float]:
+        """Get the current angle of every joint in one request."""
+        response = self._get("/get_joints")
+        return response.json().get("joint_angles", [])
+
+    def set_joints(self, joint_angles: list[float], mask: list[bool] = None) -> bool:
+        """Set the angle of every joint where mask is True (all joints if mask is None) in one request."""
+        response = self._post("/set_joints", json={
+            "joint_angles": [float(angle) for angle in joint_angles],
+            "mask": None if mask is None else [bool(m) for m in mask]
+        })
+        return response.ok and response.json().get("success", False)
+
     def get_joint_count(self) -> int:
         """Return how many joints the robot arm has."""
-        response = requests.get(f"{self.base_url}/joint_count")
+        response = self._get("/joint_count")
         return response.json().get("joint_count", 0)
 
     def gripper_open(self) -> bool:
         """Open the gripper."""
-        response = requests.post(f"{self.base_url}/gripper_open")
+        response = self._post("/gripper_open")
         return response.ok and response.json().get("success", False)
 
     def gripper_close(self) -> bool:
         """Close the gripper."""
-        response = requests.post(f"{self.base_url}/gripper_close")
+        response = self._post("/gripper_close")
         return response.ok and response.json().get("success", False)
 
     def get_status_string(self) -> str:
         """Get the current status string from the arm."""
-        response = requests.get(f"{self.base_url}/status_string")
+        response = self._get("/status_string")
         return response.json().get("status_string", "Unknown")
 
+    def get_camera_intrinsics(self) -> dict | None:
+        """Get the camera intrinsics (fx, fy, cx, cy in pixels, resolution and distortion), None if the arm can't provide them."""
+        response = self._get("/get_camera_intrinsics")
+        return response.json().get("camera_intrinsics")
+
     def stream_camera(self, on_frame_callback):
         """
         Start streaming MJPEG camera feed and call the given function on each frame.
-        This runs in a background thread. Call stop_camera_stream() to stop it.
+        Frames are received on one background thread and decoded on another, if decoding or the callback can't keep up
+        the frames in between are skipped so the callback always gets the newest one. A dropped or stalled stream is reopened
+        with backoff until stop_camera_stream() is called.
         """
         self._streaming_event.clear()
+        self._frame_decoder = LatestFrameDecoder(on_frame_callback)
+        self._frame_decoder.start()
 
         def stream_thread():
-            response = requests.get(f"{self.base_url}/get_arm_cam_stream", stream=True)
-            bytes_data = b''
-            for chunk in response.iter_content(chunk_size=1024):
-                if self._streaming_event.is_set():
-                    break  # Exit the loop when stop signal is set
-                bytes_data += chunk
-                a = bytes_data.find(b'\xff\xd8')
-                b = bytes_data.find(b'\xff\xd9')
-                if a != -1 and b != -1:
-                    jpg = bytes_data[a:b+2]
-                    bytes_data = bytes_data[b+2:]
-                    img = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
-                    if img is not None:
-                        on_frame_callback(img)
+            reconnect_delay = STREAM_RECONNECT_DELAY_SECONDS
+            while not self._streaming_event.is_set():
+                try:
+                    # a one-off connection outside the session's pool, so the long lived stream never holds up a joint call
+                    with requests.get(f"{self.base_url}/get_arm_cam_stream", stream=True, timeout=(self.timeout[0], STREAM_READ_TIMEOUT)) as response:
+                        response.raise_for_status()
+                        parser = MJPEGParser()
+                        # chunk_size None hands over the bytes as they arrive instead of waiting to fill a chunk
+                        for chunk in response.iter_content(chunk_size=None):
+                            if self._streaming_event.is_set():
+                                return  # Exit the loop when stop signal is set
+                            for jpeg in parser.feed(chunk):
+                                self._frame_decoder.submit(jpeg)
+                                reconnect_delay = STREAM_RECONNECT_DELAY_SECONDS
+                    print("Camera stream ended, reconnecting")
+                except requests.RequestException as err:
+                    print(f"Camera stream lost, reconnecting in {reconnect_delay:.1f} s: {err=}, {type(err)=}")
+                # wakes right away if the stream is stopped meanwhile
+                if self._streaming_event.wait(reconnect_delay):
+                    return
+                reconnect_delay = min(reconnect_delay * 2, STREAM_RECONNECT_MAX_DELAY_SECONDS)
 
         self._streaming_thread = threading.Thread(target=stream_thread, daemon=True)
         self._streaming_thread.start()
@@ -79,4 +154,7 @@ class RemoteArmInterface:
         self._streaming_event.set()
         if self._streaming_thread and self._streaming_thread.is_alive():
             self._streaming_thread.join()
-        self._streaming_thread = None
\ No newline at end of file
+        self._streaming_thread = None
+        if self._frame_decoder is not None:
+            self._frame_decoder.stop()
+        self._frame_decoder = None
\ No newline at end of file
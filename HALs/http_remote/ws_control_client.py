@@ -0,0 +1,192 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+from websockets.sync.client import connect
+
+from HALs.http_remote import control_protocol
+from HALs.http_remote.control_protocol import Detection
+
+DEFAULT_ACK_TIMEOUT = 2.0
+
+class WebSocketControlClient:
+    """
+    Talks to the server's /ws/control WebSocket: joint targets and joint reads go out as small binary messages on one
+    connection, any number can be in flight at once, and replies are matched to requests by sequence number.
+    Telemetry the server pushes (joint state, detections) is kept as the latest value and handed to optional callbacks.
+    """
+
+    def __init__(self, base_url: str = "http://127.0.0.1:8000", ack_timeout: float = DEFAULT_ACK_TIMEOUT,
+                 on_joint_state: Callable[[float, List[float]], None] = None,
+                 on_detections: Callable[[float, int, int, List[Detection]], None] = None):
+        """
+        Args:
+            base_url: The server's http url, the ws url is made from it.
+            ack_timeout: Seconds the blocking calls wait for the server's reply.
+            on_joint_state: Called from the receive thread with (timestamp, joint_angles) for each telemetry update.
+            on_detections: Called from the receive thread with (timestamp, frame_width, frame_height, detections).
+        """
+        self.url = base_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1).rstrip("/") + "/ws/control"
+        self.ack_timeout = ack_timeout
+        self.on_joint_state = on_joint_state
+        self.on_detections = on_detections
+
+        self.websocket = None
+        self.receive_thread: Optional[threading.Thread] = None
+        self.sequence = itertools.count(1)
+        # guards the pending futures and the latest telemetry
+        self.lock = threading.Lock()
+        self.pending: Dict[int, Future] = {}
+        self.latest_joint_state: Optional[Tuple[float, List[float]]] = None
+        # local time.monotonic() the last joint telemetry arrived, the server's clock may not match ours
+        self.latest_joint_state_received_at = 0.0
+        self.latest_detections: Optional[Tuple[float, int, int, List[Detection]]] = None
+
+    def connect(self) -> None:
+        if self.websocket is not None:
+            return
+        self.websocket = connect(self.url, open_timeout=self.ack_timeout, compression=None)
+        self.receive_thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.receive_thread.start()
+
+    def close(self) -> None:
+        if self.websocket is None:
+            return
+        self.websocket.close()
+        self.receive_thread.join()
+        self.websocket = None
+        self.receive_thread = None
+
+    def is_connected(self) -> bool:
+        return self.websocket is not None and self.receive_thread is not None and self.receive_thread.is_alive()
+
+    # requests - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def set_joints_async(self, targets: Dict[int, float]) -> "Future[bool]":
+        """ Sends {joint_index: angle} targets and returns right away, the future resolves to the server's ack. """
+        seq, future = self._new_request()
+        self._send(seq, control_protocol.encode_set_joints(seq, targets))
+        return future
+
+    def set_joints(self, joint_angles: List[float], mask: List[bool] = None) -> bool:
+        """ Same arguments as RemoteArmInterface.set_joints, blocks for the ack. """
+        targets = {joint_index: float(joint_angle) for joint_index, joint_angle in enumerate(joint_angles) if mask is None or mask[joint_index]}
+        return self._wait(self.set_joints_async(targets))
+
+    def set_joint(self, joint_index: int, joint_angle: float) -> bool:
+        return self._wait(self.set_joints_async({joint_index: joint_angle}))
+
+    def get_joints(self) -> List[float]:
+        """ Asks the server for every joint angle and blocks for the reply. """
+        seq, future = self._new_request()
+        self._send(seq, control_protocol.encode_get_joints(seq))
+        return self._wait(future)
+
+    def subscribe(self, rate_hz: int, joints: bool = True, detections: bool = False) -> None:
+        """ Asks the server to push telemetry rate_hz times a second, 0 stops it. """
+        flags = (control_protocol.TELEMETRY_JOINTS if joints else 0) | (control_protocol.TELEMETRY_DETECTIONS if detections else 0)
+        self.websocket.send(control_protocol.encode_subscribe(int(rate_hz), flags))
+
+    def get_latest_joint_state(self) -> Optional[Tuple[float, List[float]]]:
+        """ (server timestamp, joint angles) of the last joint telemetry, None before the first one. """
+        with self.lock:
+            return self.latest_joint_state
+
+    def get_joint_state_age(self) -> float:
+        """ Seconds since the last joint telemetry arrived, infinite before the first one. """
+        with self.lock:
+            if self.latest_joint_state is None:
+                return float("inf")
+            return time.monotonic() - self.latest_joint_state_received_at
+
+    def get_latest_detections(self) -> Optional[Tuple[float, int, int, List[Detection]]]:
+        """ (server timestamp, frame width, frame height, detections) of the last detection telemetry. """
+        with self.lock:
+            return self.latest_detections
+
+    def _new_request(self) -> Tuple[int, Future]:
+        seq = next(self.sequence) & 0xFFFFFFFF
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self.lock:
+            self.pending[seq] = future
+        return seq, future
+
+    def _wait(self, future: Future):
+        try:
+            return future.result(self.ack_timeout)
+        except TimeoutError:
+            # the reply may never come, stop waiting for it
+            with self.lock:
+                for seq, pending_future in list(self.pending.items()):
+                    if pending_future is future:
+                        del self.pending[seq]
+            raise
+
+    def _send(self, seq: int, message: bytes) -> None:
+        try:
+            self.websocket.send(message)
+        except Exception as err:
+            with self.lock:
+                future = self.pending.pop(seq, None)
+            if future is not None:
+                future.set_exception(err)
+
+    # receiving - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _receive_loop(self) -> None:
+        error: Exception = ConnectionError("the control WebSocket closed")
+        try:
+            for message in self.websocket:
+                if isinstance(message, str):
+                    continue
+                try:
+                    self._handle_message(message)
+                except control_protocol.ProtocolError as err:
+                    print(f"Exception decoding a control message: {err=}, {type(err)=}")
+        except Exception as err:
+            error = err
+        # nothing more is coming, fail everyone still waiting
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def _handle_message(self, message: bytes) -> None:
+        message_type = control_protocol.message_type(message)
+        if message_type == control_protocol.MSG_ACK:
+            seq, success = control_protocol.decode_ack(message)
+            self._resolve(seq, success)
+        elif message_type == control_protocol.MSG_JOINT_STATE:
+            seq, timestamp, joint_angles = control_protocol.decode_joint_state(message)
+            if seq != 0:
+                self._resolve(seq, joint_angles)
+                return
+            with self.lock:
+                self.latest_joint_state = (timestamp, joint_angles)
+                self.latest_joint_state_received_at = time.monotonic()
+            if self.on_joint_state is not None:
+                self.on_joint_state(timestamp, joint_angles)
+        elif message_type == control_protocol.MSG_DETECTIONS:
+            detections = control_protocol.decode_detections(message)
+            with self.lock:
+                self.latest_detections = detections
+            if self.on_detections is not None:
+                self.on_detections(*detections)
+        elif message_type == control_protocol.MSG_ERROR:
+            seq, text = control_protocol.decode_error(message)
+            with self.lock:
+                future = self.pending.pop(seq, None)
+            if future is not None:
+                future.set_exception(RuntimeError(text))
+            else:
+                print(f"Control WebSocket error: {text}")
+
+    def _resolve(self, seq: int, result) -> None:
+        with self.lock:
+            future = self.pending.pop(seq, None)
+        if future is not None:
+            future.set_result(result)
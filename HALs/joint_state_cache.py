@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+class JointState:
+    """ Every joint angle in degrees, and the time.monotonic() timestamp they were read at. """
+
+    def __init__(self, angles: np.ndarray, timestamp: float):
+        self.angles = angles
+        self.timestamp = timestamp
+
+    def age(self) -> float:
+        """ Seconds since the angles were read. """
+        return time.monotonic() - self.timestamp
+
+class JointStateCache:
+    """
+    Keeps the last batch read of every joint so repeated get_joint calls are served from memory.
+    The cache is refreshed when a read finds it older than max_age, after invalidate() (called after batch commands),
+    and optionally at a fixed rate by a background thread.
+    """
+
+    def __init__(self, read_fnc: Callable[[], np.ndarray], max_age: float = 0.05, refresh_hz: float = 0):
+        """
+        Args:
+            read_fnc: Reads every joint in one batch, ex: HAL_base.get_joints.
+            max_age: Default staleness bound in seconds, older states are re-read on access.
+            refresh_hz: If above 0 a background thread re-reads the joints at this rate.
+        """
+        self.read_fnc = read_fnc
+        self.max_age = max_age
+        self.refresh_hz = refresh_hz
+
+        self.state: Optional[JointState] = None
+        # held while reading so callers that find the cache stale at the same time share one read
+        self.refresh_lock = threading.Lock()
+        self.invalidated_at = 0.0
+
+        self.keep_running = False
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        if self.refresh_hz <= 0 or (self.thread is not None and self.thread.is_alive()):
+            return False
+        self.keep_running = True
+        self.thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self) -> bool:
+        if self.thread is None:
+            return False
+        self.keep_running = False
+        self.thread.join()
+        self.thread = None
+        return True
+
+    def invalidate(self) -> None:
+        """ Marks the cached state as stale, the next read will go to the hardware. """
+        self.invalidated_at = time.monotonic()
+
+    def refresh(self) -> JointState:
+        """ Reads every joint from the hardware now. """
+        with self.refresh_lock:
+            return self._read()
+
+    def get_state(self, max_age: float = None, force_refresh: bool = False) -> JointState:
+        """
+        Returns the cached joint state if it is newer than max_age seconds (the cache default if None),
+        otherwise reads the joints. force_refresh always reads.
+        """
+        if max_age is None:
+            max_age = self.max_age
+
+        state = self.state
+        if not force_refresh and self._is_fresh(state, max_age):
+            return state
+
+        request_time = time.monotonic()
+        with self.refresh_lock:
+            # a read that started after we asked may have finished while we waited for the lock
+            state = self.state
+            if state is not None and state.timestamp >= request_time:
+                return state
+            if not force_refresh and self._is_fresh(state, max_age):
+                return state
+            return self._read()
+
+    def _is_fresh(self, state: Optional[JointState], max_age: float) -> bool:
+        return state is not None and state.timestamp > self.invalidated_at and state.age() <= max_age
+
+    def _read(self) -> JointState:
+        """ INTERNAL, the caller must hold refresh_lock. """
+        # stamp with the time the read started, a command issued mid-read must still make it stale
+        read_start = time.monotonic()
+        angles = np.array(self.read_fnc(), dtype=float)
+        self.state = JointState(angles, read_start)
+        return self.state
+
+    def _refresh_loop(self) -> None:
+        interval = 1.0 / self.refresh_hz
+        while self.keep_running:
+            read_start = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as err:
+                print(f"Exception refreshing the joint state cache: {err=}, {type(err)=}")
+            sleep_time = interval - (time.monotonic() - read_start)
+            if sleep_time > 0:
+                time.sleep(sleep_time)
@@ -1,27 +1,32 @@
 import cv2
 import threading
-import math
 import numpy as np
 import struct
 
-from scripts.vision_tests.camera_ports_list import open_camera
+from scripts.vision_tests.camera_ports_list import open_camera, DEFAULT_CAMERA_CACHE_FILE
 
 from HALs.HAL_base import HAL_base
+from Vision.CameraIntrinsics import CameraIntrinsics
 
 class laptop_HAL(HAL_base):
 
     default_camera_port = 0
+    # the camera that opened last time is tried first, so startup only probes every device when it is gone
+    camera_cache_file = DEFAULT_CAMERA_CACHE_FILE
+    
+    HORIZONTAL_FOV_DEGREES = 62.2
         
     def __init__(self):
         super().__init__()
         self.lock = threading.Lock()
         self.motorCount = 0
-        self.capture = open_camera(laptop_HAL.default_camera_port)
-        self.last_frame_width = -1
+        self.capture = open_camera(laptop_HAL.default_camera_port, laptop_HAL.camera_cache_file)
 
     def start_arm(self) -> bool:
         with self.lock:
             print("--------- Started LAPTOP_SIM ---------")
+        self.invalidate_camera_intrinsics()
+        print("Camera intrinsics: " + str(self.get_camera_intrinsics()))
         return True
         
 
@@ -45,33 +50,26 @@ class laptop_HAL(HAL_base):
         with self.lock:
             _,frame = self.capture.read()
 
-        self.last_frame_width = frame.shape[1]
+        self._check_camera_resolution(frame.shape[1], frame.shape[0])
         # Convert the image from BGR to RGB color space
         flipped_image = cv2.flip(frame, 0)
         rgb_image = cv2.cvtColor(flipped_image, cv2.COLOR_BGR2RGB)
 
         return rgb_image
     
-    def get_focal_length_from_fov(frame_width, horizontal_fov_degrees=62.2):
+    def compute_camera_intrinsics(self) -> CameraIntrinsics:
         """
-        Calculate focal length using frame width and known horizontal FoV.
-
-        Args:
-            frame_width: The width of the camera frame in pixels.
-            horizontal_fov_degrees: The horizontal field of view in degrees.
-
-        Returns:
-            The calculated focal length in pixels.
+        Intrinsics from the capture's frame size and the known horizontal FoV.
         """
-        horizontal_fov_radians = math.radians(horizontal_fov_degrees)
-        focal_length = frame_width / (2 * math.tan(horizontal_fov_radians / 2))
-        return focal_length
-    
-    def get_camera_focal_length(self) -> float: 
-        if self.last_frame_width == -1:
-            return -1
-        
-        return self.get_focal_length_from_fov(self.last_frame_width)
+        with self.lock:
+            # start_arm found no camera to open
+            if self.capture is None or not self.capture.isOpened():
+                return None
+            frame_width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            frame_height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if frame_width <= 0 or frame_height <= 0:
+            return None
+        return CameraIntrinsics.from_horizontal_fov(frame_width, frame_height, laptop_HAL.HORIZONTAL_FOV_DEGREES)
     
     def gripper_open(self) -> bool:
         return False
@@ -4,14 +4,20 @@ import pickle
 
 from RpiMotorLib import RpiMotorLib
 
-# EEPROM simulation using a file
+from HALs.actuator_state_store import ActuatorStateStore
+
+# EEPROM simulation using a file, only read to carry the value over into the state store
 motor_move_file_name = 'last_motor_position.temp'
+# key in the actuator state store
+MOTOR_STATE_KEY = "gripper_motor"
 
 MOTOR_OPEN_VALUE = 0
 MOTOR_CLOSE_VALUE = 1
 
 class gripper_stepper_28BYJ:
-    def __init__(self, motor_pins = None):
+    def __init__(self, motor_pins = None, state_store: ActuatorStateStore = None):
+        # persists the motor position, pass the HAL's store so every actuator shares one journal
+        self.state_store = state_store
         
         # Declare an named instance of class pass your custom name and type of motor
         self.gripper_motor = RpiMotorLib.BYJMotor("GripperMotorOne", "28BYJ")        
@@ -33,15 +39,20 @@ class gripper_stepper_28BYJ:
     def cleanup(self):
         GPIO.cleanup()
         
-    # Writes to a temp file for persistent memory
+    # reads the persisted motor position
     def read_eeprom(self):
+        if self.state_store is not None and self.state_store.contains(MOTOR_STATE_KEY):
+            return self.state_store.get(MOTOR_STATE_KEY)
         try:
             with open(motor_move_file_name, 'rb') as f:
                 return pickle.load(f)
         except (FileNotFoundError, EOFError):
             return 0  # Default value if EEPROM is empty
 
-    # read from a temp file for persistent memory
+    # persists the motor position, journaled in the background when there is a state store
     def write_eeprom(self, value):
+        if self.state_store is not None:
+            self.state_store.set(MOTOR_STATE_KEY, value)
+            return
         with open(motor_move_file_name, 'wb') as f:
             pickle.dump(value, f)
\ No newline at end of file
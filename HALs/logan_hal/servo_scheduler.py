@@ -0,0 +1,190 @@
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# PCA9685 registers, each channel has 4 bytes starting at LED0_ON_L: ON_L, ON_H, OFF_L, OFF_H
+PCA9685_LED0_ON_L = 0x06
+PCA9685_CHANNEL_REGISTER_BYTES = 4
+
+# servos only read a new pulse every 20 ms, ticking faster than this doesn't move them any smoother
+DEFAULT_RATE_HZ = 50
+
+class ServoScheduler:
+    """
+    Moves a set of ServoKit servos toward their targets from one thread at a fixed rate.
+    Each tick every servo steps toward its target at speed degrees per second, then every channel that changed is written
+    in one I2C burst per run of adjacent channels (the PCA9685 auto-increments the register address, adafruit_pca9685 turns that on).
+    If the kit has no PCA9685 I2C device to write to (ex: a different driver) it falls back to setting servo.angle per channel.
+    """
+
+    def __init__(self, kit, channels: List[int], start_angles: List[float], speed: float, rate_hz: float = DEFAULT_RATE_HZ,
+                 pulse_min: int = 1000, pulse_max: int = 2000, actuation_range: float = 180,
+                 on_written: Callable[[Dict[int, float]], None] = None):
+        """
+        Args:
+            kit: The ServoKit driving the servos.
+            channels: PCA9685 channel of each servo.
+            start_angles: Where each servo is now, in degrees.
+            speed: Degrees per second the servos move toward their targets, 0 or less jumps straight to the target.
+            pulse_min, pulse_max: Pulse width range in microseconds, must match the servos' set_pulse_width_range.
+            on_written: Called from the scheduler thread with {channel: angle} of the servos each tick wrote, ex: to save the pose.
+        """
+        self.kit = kit
+        self.channels = list(channels)
+        self.speed = speed
+        self.rate_hz = rate_hz
+        self.pulse_min = pulse_min
+        self.pulse_max = pulse_max
+        self.actuation_range = actuation_range
+        self.on_written = on_written
+
+        self.angles: Dict[int, float] = {channel: float(angle) for channel, angle in zip(self.channels, start_angles)}
+        self.targets: Dict[int, float] = dict(self.angles)
+
+        self.i2c_device = self._find_i2c_device(kit)
+        self.write_count = 0    # I2C transactions (or servo.angle writes in fallback mode)
+        self.tick_count = 0
+
+        # guards angles and targets, the thread waits on it while every servo is on its target
+        self.condition = threading.Condition()
+        self.keep_running = False
+        self.thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _find_i2c_device(kit):
+        pca = getattr(kit, "_pca", None)
+        return getattr(pca, "i2c_device", None)
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+        self.keep_running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.thread is None:
+            return
+        with self.condition:
+            self.keep_running = False
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
+
+    def set_target(self, channel: int, angle: float) -> None:
+        """ Returns right away, the servo moves there over the next ticks. """
+        with self.condition:
+            self.targets[channel] = float(angle)
+            self.condition.notify_all()
+
+    def set_targets(self, targets: Dict[int, float]) -> None:
+        with self.condition:
+            for channel, angle in targets.items():
+                self.targets[channel] = float(angle)
+            self.condition.notify_all()
+
+    def get_angle(self, channel: int) -> float:
+        """ The angle last written to the servo, no I2C read. """
+        with self.condition:
+            return self.angles[channel]
+
+    def get_target(self, channel: int) -> float:
+        with self.condition:
+            return self.targets[channel]
+
+    def is_settled(self) -> bool:
+        with self.condition:
+            return self._is_settled()
+
+    def _is_settled(self) -> bool:
+        return all(self.angles[channel] == self.targets[channel] for channel in self.channels)
+
+    def wait_until_settled(self, timeout: float = None) -> bool:
+        """ Blocks until every servo is on its target, returns False on timeout. """
+        with self.condition:
+            return self.condition.wait_for(self._is_settled, timeout)
+
+    def _step_angles(self, dt: float) -> Dict[int, float]:
+        """ INTERNAL, the caller must hold self.condition. Moves every angle toward its target, returns the ones that changed. """
+        max_move = self.speed * dt
+        changed = {}
+        for channel in self.channels:
+            angle = self.angles[channel]
+            target = self.targets[channel]
+            if angle == target:
+                continue
+            if self.speed <= 0 or abs(target - angle) <= max_move:
+                angle = target
+            else:
+                angle += max_move if target > angle else -max_move
+            self.angles[channel] = angle
+            changed[channel] = angle
+        return changed
+
+    def _run(self) -> None:
+        interval = 1.0 / self.rate_hz
+        while True:
+            with self.condition:
+                while self.keep_running and self._is_settled():
+                    self.condition.notify_all()  # wake wait_until_settled
+                    self.condition.wait()
+                if not self.keep_running:
+                    break
+                tick_start = time.perf_counter()
+                changed = self._step_angles(interval)
+            try:
+                self._write(changed)
+                if self.on_written is not None and len(changed) > 0:
+                    self.on_written(changed)
+            except Exception as err:
+                print(f"Exception writing the servos: {err=}, {type(err)=}")
+            self.tick_count += 1
+            sleep_time = tick_start + interval - time.perf_counter()
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+
+    # writing - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _duty_cycle(self, angle: float) -> int:
+        """ The 16 bit PCA9685 duty cycle for angle, the same math as adafruit_motor.servo. """
+        frequency = self.kit._pca.frequency
+        min_duty = int((self.pulse_min * frequency) / 1000000 * 0xFFFF)
+        max_duty = (self.pulse_max * frequency) / 1000000 * 0xFFFF
+        fraction = min(max(angle / self.actuation_range, 0.0), 1.0)
+        return min_duty + int(fraction * (max_duty - min_duty))
+
+    @staticmethod
+    def _channel_registers(duty_cycle: int) -> bytes:
+        """ ON and OFF counts for a channel, the same conversion as adafruit_pca9685's duty_cycle setter. """
+        if duty_cycle == 0xFFFF:
+            return struct.pack("<HH", 0x1000, 0)
+        return struct.pack("<HH", 0, (duty_cycle + 1) >> 4)
+
+    def _write(self, changed: Dict[int, float]) -> None:
+        if len(changed) == 0:
+            return
+        if self.i2c_device is None:
+            for channel, angle in changed.items():
+                self.kit.servo[channel].angle = angle
+                self.write_count += 1
+            return
+
+        # one write per run of adjacent channels, starting at the first channel's register
+        for run in self._adjacent_runs(sorted(changed.keys())):
+            buffer = bytearray([PCA9685_LED0_ON_L + PCA9685_CHANNEL_REGISTER_BYTES * run[0]])
+            for channel in run:
+                buffer += self._channel_registers(self._duty_cycle(changed[channel]))
+            with self.i2c_device:
+                self.i2c_device.write(buffer)
+            self.write_count += 1
+
+    @staticmethod
+    def _adjacent_runs(channels: List[int]) -> List[List[int]]:
+        runs = []
+        for channel in channels:
+            if runs and runs[-1][-1] == channel - 1:
+                runs[-1].append(channel)
+            else:
+                runs.append([channel])
+        return runs
@@ -1,7 +1,7 @@
 from gpiozero import OutputDevice
-from time import sleep
+import math
 import threading
-import numpy as np
+import time
 
 # Constants
 STEPPER_CW = 1
@@ -9,65 +9,158 @@ STEPPER_CCW = 0
 # STEPPER_steps2deg = 400/90 #320/90
 STEPPER_steps2deg = 6400/360
 
-
-class Stepper:    
-    def __init__(self, dir_pin, step_pin):
+# the old fixed 1 ms high + 1 ms low per step, now the top speed of the profile
+DEFAULT_MAX_SPEED = 500             # steps per second
+DEFAULT_ACCELERATION = 1000         # steps per second per second
+
+
+class Stepper:
+    '''
+    Drives a step/dir stepper driver from one long-lived motion thread.
+    setPosition only records the new target and returns, the motion thread re-plans on every step with a trapezoidal
+    profile (accelerate, cruise at max_speed, decelerate to stop on the target), so targets can change mid move without jerks.
+    Position is tracked in whole steps.
+    Pass pin_factory=gpiozero.pins.mock.MockFactory() to run without a Pi.
+    on_started is called from the motion thread with the rotation in degrees right before the first step away from rest,
+    on_stopped every time the stepper comes to rest. Each start is followed by a stop.
+    '''
+    def __init__(self, dir_pin, step_pin, max_speed=DEFAULT_MAX_SPEED, acceleration=DEFAULT_ACCELERATION, pin_factory=None, on_started=None, on_stopped=None):
         # Initialize pins using gpiozero
-        self.dir_pin = OutputDevice(dir_pin)
-        self.step_pin = OutputDevice(step_pin)
-        self.current_rot = 0
-        self.thread = None
-        self.running = False
-        self.current_target_degrees = 0
-
-    def setPosition(self, deg):
-        ''' Updates the rotation of the stepper with degrees being the new rotation '''
-        # Check if a thread is already running
-        if self.thread is not None and self.thread.is_alive():
-            # Wait for the current thread to finish (blocks execution)
-            self.running = False
-            self.thread.join()
-            self.step_pin.off()
-            
-        self.current_target_degrees = deg
-
-        delta = deg - self.current_rot
-        # Create a new thread for the update function
-        self.thread = threading.Thread(target=self.updateStepper, args=(delta,))
-        # Start the thread
+        self.dir_pin = OutputDevice(dir_pin, pin_factory=pin_factory)
+        self.step_pin = OutputDevice(step_pin, pin_factory=pin_factory)
+        self.max_speed = float(max_speed)
+        self.acceleration = float(acceleration)
+        self.on_started = on_started
+        self.on_stopped = on_stopped
+        # slowest speed we step at, the speed reached after one step of acceleration from standstill
+        self.min_speed = math.sqrt(2 * self.acceleration)
+
+        self.current_step = 0
+        self.target_step = 0
+        # signed, steps per second
+        self.speed = 0.0
+        self.direction = STEPPER_CW
+        self.dir_pin.value = self.direction
+
+        # guards the fields above, the motion thread waits on it while idle
+        self.condition = threading.Condition()
+        self.keep_running = True
+        self.thread = threading.Thread(target=self._motion_loop, daemon=True)
         self.thread.start()
 
-    def updateStepper(self, deg):
-        '''INTERNAL rotates the stepper by deg, don't use as it doesn't follow the rotation. '''
-        dir = STEPPER_CW if deg >= 0 else STEPPER_CCW
-        self.dir_pin.value = dir
-        self.running = True
-        # Run for a number of steps based on the degree change
-        steps = abs(int(deg * STEPPER_steps2deg))
-        for _ in range(steps):
-            if not self.running:
-                break
-            # Set one coil winding to high
+    def setPosition(self, deg):
+        ''' Updates the target rotation of the stepper in degrees, returns right away. '''
+        with self.condition:
+            self.target_step = round(deg * STEPPER_steps2deg)
+            self.condition.notify()
+
+    def set_current_position(self, deg):
+        ''' Declares where the stepper is now without moving it, ex: the last position saved before a restart. '''
+        with self.condition:
+            if self.speed != 0:
+                raise RuntimeError("Can't set the position of a moving stepper")
+            self.current_step = round(deg * STEPPER_steps2deg)
+            self.target_step = self.current_step
+
+    def is_moving(self) -> bool:
+        with self.condition:
+            return self.speed != 0 or self.current_step != self.target_step
+
+    def wait_until_stopped(self, timeout=None) -> bool:
+        ''' Blocks until the stepper is stopped on its target, returns False on timeout. '''
+        with self.condition:
+            return self.condition.wait_for(lambda: self.speed == 0 and self.current_step == self.target_step, timeout)
+
+    def _next_step(self) -> float:
+        '''
+        INTERNAL, the caller must hold self.condition.
+        Picks the speed for the next step, returns the seconds until the step after it, or 0 when stopped on the target.
+        '''
+        distance = self.target_step - self.current_step
+        speed = abs(self.speed)
+
+        if distance == 0 and speed <= self.min_speed:
+            self.speed = 0.0
+            return 0
+
+        moving_toward_target = self.speed == 0 or (self.speed > 0) == (distance > 0)
+        stopping_steps = speed * speed / (2 * self.acceleration)
+
+        if moving_toward_target and stopping_steps < abs(distance):
+            # accelerate (or cruise) toward the target, v^2 grows by 2a per step
+            speed = min(math.sqrt(speed * speed + 2 * self.acceleration), self.max_speed)
+            direction = 1 if distance > 0 else -1
+        else:
+            # going the wrong way or about to overshoot: slow down, and turn around once slow enough
+            speed_squared = speed * speed - 2 * self.acceleration
+            direction = 1 if self.speed > 0 else -1
+            if speed_squared <= self.min_speed * self.min_speed:
+                if distance == 0:
+                    # slow enough to stop right here on the target
+                    self.speed = 0.0
+                    return 0
+                speed = self.min_speed
+                direction = 1 if distance > 0 else -1
+            else:
+                speed = math.sqrt(speed_squared)
+
+        self.speed = speed * direction
+        self.current_step += direction
+        return 1.0 / speed
+
+    def _motion_loop(self):
+        '''INTERNAL runs for the life of the stepper, steps toward the newest target. '''
+        while True:
+            with self.condition:
+                while self.keep_running and self.speed == 0 and self.current_step == self.target_step:
+                    self.condition.notify_all()  # wake wait_until_stopped
+                    self.condition.wait()
+                if not self.keep_running:
+                    break
+                previous_step = self.current_step
+                starting = self.speed == 0
+                interval = self._next_step()
+                direction = STEPPER_CW if self.current_step > previous_step else STEPPER_CCW
+            if interval == 0:
+                # just came to rest on the target
+                if self.on_stopped is not None:
+                    self.on_stopped(self.current_step / STEPPER_steps2deg)
+                continue
+            if starting and self.on_started is not None:
+                # before the pulse, whoever listens sees the move before the motor does
+                self.on_started(previous_step / STEPPER_steps2deg)
+
+            if direction != self.direction:
+                self.dir_pin.value = direction
+                self.direction = direction
+            step_time = time.perf_counter()
             self.step_pin.on()
-            # Allow it to get there
-            sleep(0.001)  # Dictates how fast the stepper motor will run
-            # Set coil winding to low
             self.step_pin.off()
-            sleep(0.001)  # Dictates how fast the stepper motor will run
-            self.current_rot += (np.sign(deg)) / STEPPER_steps2deg
-        self.running = False
-        print("thread complete: " + str(self.current_rot))
+
+            # time the interval from the pulse so planning and pulsing don't slow the motor down,
+            # a late wake up is never made up with a faster step, that could stall the motor
+            sleep_time = step_time + interval - time.perf_counter()
+            if sleep_time > 0:
+                time.sleep(sleep_time)
 
     def cleanup(self):
-        self.updateStepper(0 - self.current_rot)
+        ''' Returns the stepper to 0 degrees, stops the motion thread and releases the pins. '''
+        self.setPosition(0)
+        self.wait_until_stopped()
+        with self.condition:
+            self.keep_running = False
+            self.condition.notify_all()
+        self.thread.join()
         self.dir_pin.close()
         self.step_pin.close()
         
     def get_current_rotation(self):
-        return self.current_rot
+        with self.condition:
+            return self.current_step / STEPPER_steps2deg
         
     def get_target_degrees(self):
-        return self.current_target_degrees
+        with self.condition:
+            return self.target_step / STEPPER_steps2deg
 
 # Example usage:
 # stepper = Stepper(dir_pin=15, step_pin=14)
@@ -1,7 +1,6 @@
-import time
 import struct
 import threading
-import math
+import atexit
 from math import pi
 # import Simulation.kinematicsPYV1 as kine
 import numpy as np
@@ -14,18 +13,32 @@ from adafruit_servokit import ServoKit
 import HALs.logan_hal.stepperMicrostep as stepperMicrostep
 # import logan_hal.stepperl289n as stepperl289n
 from HALs.logan_hal.gripper_stepper_28BYJ_48 import gripper_stepper_28BYJ
+from HALs.logan_hal.servo_scheduler import ServoScheduler
 
 # import HALs.logan_hal.gripper_stepper_28BYJ_48 as gripper_stepper_28BYJ
 
 from HALs.HAL_base import HAL_base
+from HALs.actuator_state_store import ActuatorStateStore
+from Vision.CameraIntrinsics import CameraIntrinsics
 
+# only read to carry the gripper state over from before the journal existed
 last_gripper_state_file_name = 'last_gripper_position.temp'
+actuator_state_file_name = 'actuator_state.journal'
+
+# actuator state journal keys
+BASE_STEPPER_STATE_KEY = "base_stepper_degrees"
+# True from the moment the base is told to move until it stops, a saved position with this set can't be trusted
+BASE_STEPPER_MOVING_KEY = "base_stepper_moving"
+GRIPPER_STATE_KEY = "gripper"
 
 GRIPPER_OPEN_VALUE = 0
 GRIPPER_CLOSE_VALUE = 1
 
 goto_zero_on_close = False
 
+# joints 0-2 have drivers, the gripper rotator (joint 3) is not implemented
+MOVABLE_JOINT_COUNT = 3
+
 class physical_HAL(HAL_base):
 
     HORIZONTAL_FOV_DEGREES = 62.2
@@ -34,13 +47,18 @@ class physical_HAL(HAL_base):
 
     pulse_min = 500
     pulse_max = 2500
+    # seconds a servo takes to sweep its whole range, 0 snaps straight to the target
     smooth_time = 3
+    servo_rate_hz = 50
 
     servos = [(4,0),(5,0)]
     baseStepper = None
+    servo_scheduler: ServoScheduler = None
 
     lock = threading.Lock()
     camera_lock = threading.Lock()
+    # the gripper motor takes seconds to move, it has its own lock so joint commands never wait on it
+    gripper_lock = threading.Lock()
 
     # Initialize the camera
     picam2 = Picamera2()    
@@ -49,16 +67,31 @@ class physical_HAL(HAL_base):
     
     def __init__(self):
         super().__init__()
-        self.gripper_control = gripper_stepper_28BYJ()
+        # last known pose of every actuator, survives restarts so the arm doesn't need to be homed.
+        # open for the life of the HAL, stop_arm only flushes it so a second start_arm or a later gripper call is still saved
+        self.state_store = ActuatorStateStore(actuator_state_file_name)
+        self.state_store.start()
+        atexit.register(self.state_store.close)
+        self.gripper_control = gripper_stepper_28BYJ(state_store=self.state_store)
         self.gripper_state = self.read_gripper_state()
 
     def start_arm(self) -> bool:
         with self.lock:
-            self.baseStepper = stepperMicrostep.Stepper(15,14)
-            for servo in self.servos:
+            # the base resumes from where it last stopped instead of assuming it is at 0
+            self.baseStepper = stepperMicrostep.Stepper(15,14, on_started=self._on_base_started, on_stopped=self._on_base_stopped)
+            self.baseStepper.set_current_position(self._saved_base_position())
+            # servos have no position feedback, start them where they were left so they don't snap
+            start_angles = [self.state_store.get(self._servo_state_key(servo[0]), servo[1]) for servo in self.servos]
+            for servo, start_angle in zip(self.servos, start_angles):
                 self.kit.servo[servo[0]].set_pulse_width_range(self.pulse_min, self.pulse_max)
                 self.kit.servo[servo[0]].actuation_range = 180
-                self.kit.servo[servo[0]].angle = servo[1]
+                self.kit.servo[servo[0]].angle = start_angle
+            # the servos are moved by the scheduler thread from here on
+            # the angles the servos actually reached are saved, not the targets they were heading for
+            self.servo_scheduler = ServoScheduler(self.kit, [servo[0] for servo in self.servos], start_angles,
+                                                  180 / self.smooth_time if self.smooth_time > 0 else 0, self.servo_rate_hz,
+                                                  self.pulse_min, self.pulse_max, 180, on_written=self._on_servos_written)
+            self.servo_scheduler.start()
             
         with self.camera_lock:
             # Start the camera
@@ -66,6 +99,10 @@ class physical_HAL(HAL_base):
 
         self.is_started = True
         
+        # the sensor mode is fixed once the camera is started, compute the intrinsics once instead of per frame
+        self.invalidate_camera_intrinsics()
+        print("Camera intrinsics: " + str(self.get_camera_intrinsics()))
+        
         # # Create a simple preview configuration
         # preview_config = picam2.create_preview_configuration(main={"size": (640, 480)})
         # # Configure the camera with the preview configuration
@@ -80,14 +117,21 @@ class physical_HAL(HAL_base):
             self.set_joint(1,0)
             self.set_joint(2,0)
             # should redundently do this in the other cleanups.
-            time.sleep(2)
+            self.servo_scheduler.wait_until_settled(self.smooth_time + 1)
         
         with self.lock:
+            self.servo_scheduler.stop()
+            # cleanup drives the base back to 0, _on_base_started marks that move like any other
             self.baseStepper.cleanup()
             # if(show_video_window):
             #     cam.release() 
             #     cv2.destroyWindow("Vid") 
+        # let a gripper move in progress finish before releasing its pins
+        self.stop_gripper_worker()
+        with self.gripper_lock:
             self.gripper_control.cleanup()
+        # on disk before returning, the store stays open (closed at exit)
+        self.state_store.flush()
         self.is_started = False
         #UNDO COMMENT # picam2.stop()
 
@@ -97,15 +141,16 @@ class physical_HAL(HAL_base):
         
         with self.camera_lock:
             frame_rgb = self.picam2.capture_array()
+        self._check_camera_resolution(frame_rgb.shape[1], frame_rgb.shape[0])
         # hsv = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
         # cv2.imshow("Camera", frame_rgb)
         # cv2.waitKey(1)
         return frame_rgb
     
-    def get_camera_focal_length(self) -> float:
+    def compute_camera_intrinsics(self) -> CameraIntrinsics:
         with self.camera_lock:
             camera_metadata = self.picam2.camera_properties
-            print("Fetching the focal length, if this cameras properties include the focal length or horizontal Field of View, make it so this function returns that instead of using a fixed value")
+            print("Computing the camera intrinsics, if this cameras properties include the focal length or horizontal Field of View, use that instead of the fixed HORIZONTAL_FOV_DEGREES")
             print(camera_metadata)
             
             try:             
@@ -113,76 +158,145 @@ class physical_HAL(HAL_base):
                 resolution = self.picam2.capture_configuration()['size']
                 image_width, image_height = resolution
                 
-                # Convert FoV from degrees to radians
-                horizontal_fov_radians = math.radians(physical_HAL.HORIZONTAL_FOV_DEGREES)
-                
-                # Calculate the focal length in pixels
-                focal_length = image_width / (2 * math.tan(horizontal_fov_radians / 2))
-                
-                return focal_length
+                return CameraIntrinsics.from_horizontal_fov(image_width, image_height, physical_HAL.HORIZONTAL_FOV_DEGREES)
             except Exception as err:
-                print(f"Error calculating the focal length: {err=}, {type(err)=}")
+                print(f"Error calculating the camera intrinsics: {err=}, {type(err)=}")
         
-        return -1
+        return None
         
 
     def set_joint(self, joint_index, joint_angle) -> bool:
         
         if not self.is_started:
-            print("Unable to set joint " + joint_index + " because the arm is not started")
-            return
+            print("Unable to set joint " + str(joint_index) + " because the arm is not started")
+            return False
 
         # Check if the joint angle is within the bounds
-        if(joint_angle < self.get_joint_min(joint_index)):
-            joint_angle = self.get_joint_min(joint_index)
-        if(joint_angle > self.get_joint_max(joint_index)):
-            joint_angle = self.get_joint_max(joint_index)
+        joint_angle = self.clamp_joint_angle(joint_index, joint_angle)
         
         # Move the joint
         try:
             with self.lock:
-                if(joint_index == 0):
-                    self.baseStepper.setPosition(joint_angle)
-                elif(joint_index == 1):
-                    self.kit.servo[self.servos[0][0]].angle = joint_angle
-                elif(joint_index == 2):
-                    self.kit.servo[self.servos[1][0]].angle = joint_angle
-                elif(joint_index == 3):
-                    raise Exception("gripper not implemeted")
-                else:
-                    raise Exception("joint index out of bounds")
-                    
+                self._move_joint(joint_index, joint_angle)
+        except Exception as err:
+            print(f"Exeption in moving the arm: {err=}, {type(err)=}")
+            return False
+        finally:
+            self.invalidate_joint_cache()
+        return True
+
+    def set_joints(self, joint_angles, mask = None) -> bool:
+        
+        if not self.is_started:
+            print("Unable to set joints because the arm is not started")
+            return False
+        
+        joint_indices = self._masked_joint_indices(joint_angles, mask)
+        # check every index before anything moves, so a bad one can't leave the arm half way
+        if any(joint_index >= self.joint_count() for joint_index in joint_indices):
+            print(f"Unable to set joints, {len(joint_angles)} angles given for {self.joint_count()} joints")
+            return False
+        # the gripper rotator is skipped rather than failing the whole call, get_joints reports it as 0 so set_joints(get_joints()) works
+        clamped_angles = [(joint_index, self.clamp_joint_angle(joint_index, joint_angles[joint_index]))
+                          for joint_index in joint_indices if joint_index < MOVABLE_JOINT_COUNT]
+        
+        # Move all the joints with a single lock acquisition
+        try:
+            with self.lock:
+                for joint_index, joint_angle in clamped_angles:
+                    self._move_joint(joint_index, joint_angle)
         except Exception as err:
             print(f"Exeption in moving the arm: {err=}, {type(err)=}")
+            return False
+        finally:
+            self.invalidate_joint_cache()
+        return True
+    
+    def _move_joint(self, joint_index, joint_angle) -> None:
+        """INTERNAL sends the angle to the joint's driver, the caller must hold self.lock."""
+        if(joint_index == 0):
+            self.baseStepper.setPosition(joint_angle)
+        elif(joint_index == 1 or joint_index == 2):
+            channel = self.servos[joint_index - 1][0]
+            self.servo_scheduler.set_target(channel, joint_angle)
+        elif(joint_index == 3):
+            raise Exception("gripper not implemeted")
+        else:
+            raise Exception("joint index out of bounds")
 
     def get_joint(self, joint_index) -> float:
         if(joint_index == 0):
             return self.baseStepper.get_current_rotation()
         else:
-            return self.kit.servo[self.servos[joint_index - 1][0]].angle
+            # the angle the scheduler last wrote, no I2C read
+            return self.servo_scheduler.get_angle(self.servos[joint_index - 1][0])
+
+    def get_joints(self) -> np.ndarray:
+        joint_angles = [self.baseStepper.get_current_rotation()]
+        joint_angles += [self.servo_scheduler.get_angle(servo[0]) for servo in self.servos]
+        # the gripper rotator (joint 3) is not implemented, report it as 0
+        joint_angles += [0.0] * (self.joint_count() - len(joint_angles))
+        return np.array([0.0 if angle is None else angle for angle in joint_angles], dtype=float)
             
     def joint_count(self) -> int:
         return 4
     
     def gripper_open(self) -> bool:
-        if self.gripper_state == GRIPPER_OPEN_VALUE:
-            return False
-        
-        with self.lock:
+        """Blocks for the whole move, use gripper_open_async to keep going while the gripper moves."""
+        with self.gripper_lock:
+            if self.gripper_state == GRIPPER_OPEN_VALUE:
+                return False
             self.write_gripper_state(GRIPPER_OPEN_VALUE)
             self.gripper_control.open()
         return True
     
     def gripper_close(self) -> bool:
-        if self.self.gripper_state == GRIPPER_CLOSE_VALUE:
-            return False
-        
-        with self.lock:
+        """Blocks for the whole move, use gripper_close_async to keep going while the gripper moves."""
+        with self.gripper_lock:
+            if self.gripper_state == GRIPPER_CLOSE_VALUE:
+                return False
             self.write_gripper_state(GRIPPER_CLOSE_VALUE)
             self.gripper_control.close()
         return True
     
+    @staticmethod
+    def _servo_state_key(channel) -> str:
+        return "servo_" + str(channel)
+    
+    def _saved_base_position(self) -> float:
+        if self.state_store.get(BASE_STEPPER_MOVING_KEY, False):
+            # stopped mid move (crash, power loss), the saved angle is from before the move
+            print("WARNING - the base stepper was moving when the arm last stopped, its position is unknown. "
+                  "Assuming it is at 0, move the base to its home position by hand.")
+            self.state_store.set(BASE_STEPPER_STATE_KEY, 0)
+            self.state_store.set(BASE_STEPPER_MOVING_KEY, False)
+            self.state_store.flush()
+            return 0
+        return self.state_store.get(BASE_STEPPER_STATE_KEY, 0)
+    
+    def _on_base_started(self, degrees: float) -> None:
+        """INTERNAL called from the stepper's motion thread right before the base takes its first step of a move."""
+        # on disk before the first step, a crash mid move then leaves the saved position marked untrusted.
+        # the fsync delays only the motion thread, set_joint returned as soon as the target was recorded
+        self.state_store.set(BASE_STEPPER_MOVING_KEY, True)
+        self.state_store.flush()
+    
+    def _on_base_stopped(self, degrees: float) -> None:
+        """INTERNAL called from the stepper's motion thread each time the base comes to rest, always after _on_base_started."""
+        # a new target may have arrived since, then the base is moving again and stays marked as moving
+        if self.baseStepper.is_moving():
+            return
+        self.state_store.set(BASE_STEPPER_STATE_KEY, degrees)
+        self.state_store.set(BASE_STEPPER_MOVING_KEY, False)
+    
+    def _on_servos_written(self, angles) -> None:
+        """INTERNAL called from the servo scheduler thread with the angles it just wrote, the store batches them."""
+        for channel, angle in angles.items():
+            self.state_store.set(self._servo_state_key(channel), float(angle))
+    
     def read_gripper_state(self):
+        if self.state_store.contains(GRIPPER_STATE_KEY):
+            return self.state_store.get(GRIPPER_STATE_KEY)
         try:
             with open(last_gripper_state_file_name, 'rb') as f:
                 return pickle.load(f)
@@ -190,5 +304,6 @@ class physical_HAL(HAL_base):
             return 0  # Default value if EEPROM is empty
 
     def write_gripper_state(self, value):
-        with open(last_gripper_state_file_name, 'wb') as f:
-            pickle.dump(value, f)
+        # journaled in the background, no file write on the caller's thread
+        self.gripper_state = value
+        self.state_store.set(GRIPPER_STATE_KEY, value)
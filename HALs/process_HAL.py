@@ -0,0 +1,383 @@
+import importlib
+import itertools
+import multiprocessing
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from HALs.HAL_base import HAL_base
+from HALs.shared_frame_ring import SharedFrameRing, DEFAULT_SLOT_COUNT, DEFAULT_SLOT_BYTES
+from Vision.CameraIntrinsics import CameraIntrinsics
+
+# constructing the HAL in the child imports cv2 and the hardware libraries, slow on a Pi
+STARTUP_TIMEOUT_SECONDS = 30.0
+# how long a forwarded call waits for the child's reply
+DEFAULT_CALL_TIMEOUT = 5.0
+# a gripper open or close runs for seconds, its call waits longer
+GRIPPER_CALL_TIMEOUT_SECONDS = 30.0
+# how long get_arm_cam_img_rgb waits for the child's next frame
+FRAME_TIMEOUT_SECONDS = 1.0
+# how long stop_arm waits for the child to exit before killing it
+SHUTDOWN_TIMEOUT_SECONDS = 5.0
+# how long the child's capture loop backs off when the HAL has no frame or throws
+CAPTURE_RETRY_DELAY_SECONDS = 0.01
+
+# the HAL methods the child runs for the parent, anything else is refused
+FORWARDED_METHODS = {
+    "start_arm", "stop_arm", "joint_count",
+    "set_joint", "get_joint", "set_joints", "get_joints",
+    "gripper_open", "gripper_close",
+    "get_camera_intrinsics", "get_lock_wait_stats",
+    "set_joint_limits", "set_joint_min", "set_joint_max",
+}
+# run by the child on their own thread, a slow gripper move doesn't hold up the joint calls behind it
+GRIPPER_METHODS = {"gripper_open", "gripper_close"}
+
+# messages, the first item says what the rest is
+# parent to child: (_MSG_CALL, request_id, method, args) and (_MSG_EXIT,)
+# child to parent: (_MSG_READY, joint_count or None, error text), (_MSG_REPLY, request_id, ok, result or exception),
+#                  (_MSG_FRAME, sequence)
+_MSG_CALL = "call"
+_MSG_EXIT = "exit"
+_MSG_READY = "ready"
+_MSG_REPLY = "reply"
+_MSG_FRAME = "frame"
+
+class ProcessHAL(HAL_base):
+    """
+    Runs another HAL in a child process so the hardware, camera capture and frame conversion don't share the GIL
+    with vision, the controllers, the server and speech in this process.
+    Frames come back through a SharedFrameRing: get_arm_cam_img_rgb returns a read-only view straight into shared memory,
+    no copy or pickling, and the slot stays reserved for as long as the view is referenced.
+    Joint and gripper calls are sent to the child over a pipe and block for its reply. The child runs joint calls one at a time
+    and gripper calls one at a time on a thread of their own, so a gripper move doesn't delay the joints.
+    The HAL is named by module and class so it is constructed in the child, it never exists in this process.
+    """
+
+    def __init__(self, hal_module: str, hal_class: str, hal_args: tuple = (), slot_count: int = DEFAULT_SLOT_COUNT,
+                 max_frame_bytes: int = DEFAULT_SLOT_BYTES, capture_fps: float = 0, call_timeout: float = DEFAULT_CALL_TIMEOUT):
+        """
+        Args:
+            hal_module: Module the HAL class is in, ex: "HALs.physical_HAL".
+            hal_class: The HAL class, ex: "physical_HAL".
+            hal_args: Passed to the HAL's constructor, must be picklable.
+            slot_count: Frames the shared ring holds, frames are dropped while the reader holds all but one of them.
+            max_frame_bytes: Size of the biggest frame the camera produces.
+            capture_fps: Upper bound on frames the child captures per second, 0 captures as fast as the HAL returns them.
+            call_timeout: Seconds a forwarded call waits for the child.
+        """
+        super().__init__()
+        self.hal_name = hal_class
+        self.call_timeout = call_timeout
+        # filled in from the child's HAL at start_arm, our own list so the class's shared one isn't touched
+        self.joint_limits = []
+
+        # spawn, not fork: forking copies this process's threads' locks mid use, and the child doesn't need anything but the HAL
+        context = multiprocessing.get_context("spawn")
+        self.frame_ring = SharedFrameRing.create(context.Lock(), slot_count, max_frame_bytes)
+        self.connection, child_connection = context.Pipe()
+        self.send_lock = threading.Lock()
+        self.process = context.Process(target=_run_hal_process, name=f"{hal_class}-process", daemon=True,
+                                       args=(hal_module, hal_class, tuple(hal_args), self.frame_ring.name, self.frame_ring.lock,
+                                             child_connection, capture_fps))
+        self.process.start()
+        # the child has its own copy
+        child_connection.close()
+
+        self.request_ids = itertools.count(1)
+        # guards pending and the frame sequence, frame waiters wait on it
+        self.condition = threading.Condition()
+        self.pending: Dict[int, Future] = {}
+        self.child_frame_sequence = 0
+        self.last_read_sequence = 0
+        self.child_alive = True
+
+        self.remote_joint_count = self._wait_for_ready()
+        self.receive_thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.receive_thread.start()
+
+    def _wait_for_ready(self) -> int:
+        if not self.connection.poll(STARTUP_TIMEOUT_SECONDS):
+            self._shutdown()
+            raise RuntimeError(f"{self.hal_name} process didn't start within {STARTUP_TIMEOUT_SECONDS} seconds")
+        _, joint_count, error = self.connection.recv()
+        if joint_count is None:
+            self._shutdown()
+            raise RuntimeError(f"{self.hal_name} failed to start in its process: {error}")
+        return joint_count
+
+    def start_arm(self) -> bool:
+        started = self._call("start_arm", timeout=STARTUP_TIMEOUT_SECONDS)
+        self.joint_limits = list(self._call("get_joint_limits"))
+        self.invalidate_camera_intrinsics()
+        print("Camera intrinsics: " + str(self.get_camera_intrinsics()))
+        return started
+
+    def stop_arm(self) -> bool:
+        stopped = False
+        try:
+            stopped = self._call("stop_arm", timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        except Exception as err:
+            print(f"Exception stopping {self.hal_name} in its process: {err=}, {type(err)=}")
+        self.stop_gripper_worker()
+        self._shutdown()
+        return stopped
+
+    def joint_count(self) -> int:
+        return self.remote_joint_count
+
+    def set_joint(self, joint_index: int, joint_angle: float) -> bool:
+        success = self._call("set_joint", joint_index, float(joint_angle))
+        self.invalidate_joint_cache()
+        return success
+
+    def get_joint(self, joint_index: int) -> float:
+        return self._call("get_joint", joint_index)
+
+    def get_joints(self) -> np.ndarray:
+        return np.asarray(self._call("get_joints"), dtype=float)
+
+    def set_joints(self, joint_angles, mask = None) -> bool:
+        success = self._call("set_joints", [float(joint_angle) for joint_angle in joint_angles], None if mask is None else list(mask))
+        self.invalidate_joint_cache()
+        return success
+
+    def gripper_open(self) -> bool:
+        return self._call("gripper_open", timeout=GRIPPER_CALL_TIMEOUT_SECONDS)
+
+    def gripper_close(self) -> bool:
+        return self._call("gripper_close", timeout=GRIPPER_CALL_TIMEOUT_SECONDS)
+
+    def compute_camera_intrinsics(self) -> Optional[CameraIntrinsics]:
+        return self._call("get_camera_intrinsics")
+
+    def get_lock_wait_stats(self) -> dict:
+        return self._call("get_lock_wait_stats")
+
+    def get_frame_ring_stats(self) -> dict:
+        """ Frames the child wrote into the ring and dropped because every slot was still held here. """
+        return self._call("get_frame_ring_stats")
+
+    # the child's HAL does the clamping, keep its limits and ours the same
+    def set_joint_limits(self, joint_index: int, min_angle: float, max_angle: float) -> None:
+        super().set_joint_limits(joint_index, min_angle, max_angle)
+        self._call("set_joint_limits", joint_index, min_angle, max_angle)
+
+    def set_joint_min(self, joint_index: int, min_angle: float) -> None:
+        super().set_joint_min(joint_index, min_angle)
+        self._call("set_joint_min", joint_index, min_angle)
+
+    def set_joint_max(self, joint_index: int, max_angle: float) -> None:
+        super().set_joint_max(joint_index, max_angle)
+        self._call("set_joint_max", joint_index, max_angle)
+
+    # frames - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def get_arm_cam_img_rgb(self) -> cv2.typing.MatLike:
+        """ Waits for a frame newer than the last one read and returns it as a read-only view of shared memory, None on timeout. """
+        sequence, frame, _ = self.get_next_shared_frame(FRAME_TIMEOUT_SECONDS)
+        return frame
+
+    def get_next_shared_frame(self, timeout: float = None) -> Tuple[int, Optional[cv2.typing.MatLike], float]:
+        """ Returns (sequence, frame, capture time.time()) of the next frame from the child, the frame is None on timeout. """
+        with self.condition:
+            last_sequence = self.last_read_sequence
+            self.condition.wait_for(lambda: self.child_frame_sequence > last_sequence or not self.child_alive, timeout)
+        sequence, frame, timestamp = self.frame_ring.read_latest(last_sequence)
+        if frame is not None:
+            with self.condition:
+                self.last_read_sequence = max(self.last_read_sequence, sequence)
+        return sequence, frame, timestamp
+
+    # calls into the child - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _call(self, method: str, *args, timeout: float = None):
+        """ Runs hal.method(*args) in the child and returns the result, raises what the child raised. """
+        return self._call_async(method, *args).result(self.call_timeout if timeout is None else timeout)
+
+    def _call_async(self, method: str, *args) -> Future:
+        request_id = next(self.request_ids)
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self.condition:
+            if not self.child_alive:
+                raise RuntimeError(f"{self.hal_name} process is not running")
+            self.pending[request_id] = future
+        try:
+            with self.send_lock:
+                self.connection.send((_MSG_CALL, request_id, method, args))
+        except Exception as err:
+            with self.condition:
+                self.pending.pop(request_id, None)
+            future.set_exception(err)
+        return future
+
+    def _receive_loop(self) -> None:
+        try:
+            while True:
+                message = self.connection.recv()
+                if message[0] == _MSG_FRAME:
+                    with self.condition:
+                        self.child_frame_sequence = message[1]
+                        self.condition.notify_all()
+                elif message[0] == _MSG_REPLY:
+                    _, request_id, ok, result = message
+                    with self.condition:
+                        future = self.pending.pop(request_id, None)
+                    if future is None:
+                        continue
+                    if ok:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(result)
+        except (EOFError, OSError):
+            pass
+        # the child is gone, nothing will answer
+        with self.condition:
+            self.child_alive = False
+            pending = self.pending
+            self.pending = {}
+            self.condition.notify_all()
+        for future in pending.values():
+            future.set_exception(RuntimeError(f"{self.hal_name} process exited"))
+
+    def _shutdown(self) -> None:
+        if self.process.is_alive():
+            try:
+                with self.send_lock:
+                    self.connection.send((_MSG_EXIT,))
+            except (OSError, ValueError):
+                pass
+            self.process.join(SHUTDOWN_TIMEOUT_SECONDS)
+            if self.process.is_alive():
+                print(f"{self.hal_name} process didn't exit, killing it")
+                self.process.kill()
+                self.process.join()
+        self.connection.close()
+        self.frame_ring.close()
+
+# child process - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+class _HALProcessServer:
+    """ INTERNAL, runs in the child: serves the parent's calls and, while the arm is started, captures frames into the ring. """
+
+    def __init__(self, hal: HAL_base, frame_ring: SharedFrameRing, connection, capture_fps: float):
+        self.hal = hal
+        self.frame_ring = frame_ring
+        self.connection = connection
+        self.min_frame_interval = 1.0 / capture_fps if capture_fps > 0 else 0.0
+        # replies (main and gripper threads) and frame notices (capture thread) share the pipe
+        self.send_lock = threading.Lock()
+        # one worker keeps gripper calls in the order they were sent
+        self.gripper_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gripper")
+        self.keep_capturing = False
+        self.capture_thread: Optional[threading.Thread] = None
+
+    def serve(self) -> None:
+        try:
+            while True:
+                message = self.connection.recv()
+                if message[0] == _MSG_EXIT:
+                    break
+                _, request_id, method, args = message
+                if method in GRIPPER_METHODS:
+                    # the parent matches replies by request_id, this one can come back after later calls' replies
+                    self.gripper_executor.submit(self._serve_call, request_id, method, args)
+                else:
+                    self._serve_call(request_id, method, args)
+        except (EOFError, OSError):
+            # the parent is gone
+            pass
+        self.gripper_executor.shutdown(wait=True)
+        self._stop_capture()
+
+    def _serve_call(self, request_id: int, method: str, args: tuple) -> None:
+        try:
+            self._send((_MSG_REPLY, request_id) + self._run(method, args))
+        except (EOFError, OSError):
+            # the parent is gone, serve notices on its next recv
+            pass
+
+    def _run(self, method: str, args: tuple) -> Tuple[bool, object]:
+        try:
+            if method == "get_joint_limits":
+                return True, list(self.hal.joint_limits)
+            if method == "get_frame_ring_stats":
+                return True, {"written": self.frame_ring.written_frames, "dropped": self.frame_ring.dropped_frames}
+            if method not in FORWARDED_METHODS:
+                raise AttributeError(f"{method} can't be called on a HAL in another process")
+            if method == "stop_arm":
+                self._stop_capture()
+            result = getattr(self.hal, method)(*args)
+            if method == "start_arm":
+                self._start_capture()
+            if isinstance(result, np.ndarray):
+                result = result.tolist()
+            return True, result
+        except Exception as err:
+            traceback.print_exc()
+            return False, err
+
+    def _send(self, message: tuple) -> None:
+        with self.send_lock:
+            try:
+                self.connection.send(message)
+            except Exception as err:
+                # ex: an exception that doesn't pickle, send its text instead
+                if message[0] != _MSG_REPLY:
+                    raise
+                self.connection.send((_MSG_REPLY, message[1], False, RuntimeError(f"{type(err).__name__}: {err}")))
+
+    def _start_capture(self) -> None:
+        if self.capture_thread is not None:
+            return
+        self.keep_capturing = True
+        self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.capture_thread.start()
+
+    def _stop_capture(self) -> None:
+        if self.capture_thread is None:
+            return
+        self.keep_capturing = False
+        self.capture_thread.join()
+        self.capture_thread = None
+
+    def _capture_loop(self) -> None:
+        last_capture_time = 0.0
+        while self.keep_capturing:
+            if self.min_frame_interval > 0:
+                wait = last_capture_time + self.min_frame_interval - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            last_capture_time = time.perf_counter()
+            try:
+                frame = self.hal.get_arm_cam_img_rgb()
+                if frame is None:
+                    time.sleep(CAPTURE_RETRY_DELAY_SECONDS)
+                    continue
+                sequence = self.frame_ring.write(frame)
+                if sequence > 0:
+                    self._send((_MSG_FRAME, sequence))
+            except (EOFError, OSError):
+                return
+            except Exception as err:
+                print(f"Exception capturing a frame in the HAL process: {err=}, {type(err)=}")
+                time.sleep(CAPTURE_RETRY_DELAY_SECONDS)
+
+def _run_hal_process(hal_module: str, hal_class: str, hal_args: tuple, ring_name: str, ring_lock, connection, capture_fps: float) -> None:
+    """ INTERNAL, the child process's entry point. """
+    try:
+        hal = getattr(importlib.import_module(hal_module), hal_class)(*hal_args)
+        frame_ring = SharedFrameRing.attach(ring_name, ring_lock)
+    except Exception as err:
+        traceback.print_exc()
+        connection.send((_MSG_READY, None, f"{type(err).__name__}: {err}"))
+        return
+    connection.send((_MSG_READY, hal.joint_count(), None))
+    _HALProcessServer(hal, frame_ring, connection, capture_fps).serve()
+    frame_ring.close()
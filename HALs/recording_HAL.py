@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+from typing import Optional
+
+from HALs.HAL_base import HAL_base
+from HALs.hal_recording import HALRecorder, DEFAULT_JPEG_QUALITY
+from Vision.CameraIntrinsics import CameraIntrinsics
+
+class RecordingHAL(HAL_base):
+    """
+    Wraps any HAL and records what passes through it: camera frames, joint reads and the commands sent to the arm.
+    The recording can be played back with ReplayHAL to benchmark the controllers and vision code without the arm or simulator.
+    """
+
+    def __init__(self, hal: HAL_base, path: str, jpeg_quality: int = DEFAULT_JPEG_QUALITY):
+        super().__init__()
+        self.hal = hal
+        self.recorder = HALRecorder(path, jpeg_quality)
+
+    def start_arm(self) -> bool:
+        started = self.hal.start_arm()
+        self.recorder.start()
+        camera_intrinsics = self.get_camera_intrinsics()
+        self.recorder.record_meta({
+            "hal": type(self.hal).__name__,
+            "joint_count": self.hal.joint_count(),
+            "camera_intrinsics": None if camera_intrinsics is None else camera_intrinsics.to_dict(),
+        })
+        print("Recording the HAL to \"" + self.recorder.path + "\"")
+        return started
+
+    def stop_arm(self) -> bool:
+        stopped = self.hal.stop_arm()
+        self.recorder.stop()
+        print(f"Recorded {self.recorder.written_records} records to \"{self.recorder.path}\", dropped {self.recorder.dropped_frames} frames")
+        return stopped
+
+    def joint_count(self) -> int:
+        return self.hal.joint_count()
+
+    def set_joint(self, joint_index: int, joint_angle: float) -> bool:
+        self.recorder.record_command("set_joint", joint_index, joint_angle)
+        success = self.hal.set_joint(joint_index, joint_angle)
+        self.invalidate_joint_cache()
+        return success
+
+    def get_joint(self, joint_index: int) -> float:
+        # single joint reads aren't recorded, replay serves them from the recorded batch reads
+        return self.hal.get_joint(joint_index)
+
+    def get_joints(self) -> np.ndarray:
+        joint_angles = self.hal.get_joints()
+        self.recorder.record_joints(joint_angles)
+        return joint_angles
+
+    def set_joints(self, joint_angles, mask = None) -> bool:
+        self.recorder.record_command("set_joints", joint_angles, mask)
+        success = self.hal.set_joints(joint_angles, mask)
+        self.invalidate_joint_cache()
+        return success
+
+    def get_arm_cam_img_rgb(self) -> cv2.typing.MatLike:
+        frame = self.hal.get_arm_cam_img_rgb()
+        self.recorder.record_frame(frame)
+        return frame
+
+    def compute_camera_intrinsics(self) -> Optional[CameraIntrinsics]:
+        return self.hal.get_camera_intrinsics()
+
+    def gripper_open(self) -> bool:
+        self.recorder.record_command("gripper_open")
+        return self.hal.gripper_open()
+
+    def gripper_close(self) -> bool:
+        self.recorder.record_command("gripper_close")
+        return self.hal.gripper_close()
+
+    def get_lock_wait_stats(self) -> dict:
+        return self.hal.get_lock_wait_stats()
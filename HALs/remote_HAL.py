@@ -1,23 +1,40 @@
 import threading
 import cv2
 import numpy as np
-from typing import Optional
+from concurrent.futures import Future
+from typing import Dict, Optional
 import requests
 from HALs.HAL_base import HAL_base
-from HALs.http_remote.remote_arm_interface import RemoteArmInterface
+from HALs.http_remote.remote_arm_interface import RemoteArmInterface, DEFAULT_READ_TIMEOUT, DEFAULT_RETRIES
+from HALs.http_remote.command_queue import RemoteCommandQueue
+from Vision.CameraIntrinsics import CameraIntrinsics
+
+# joint telemetry older than this is not trusted, get_joints asks the server instead
+WEBSOCKET_JOINT_STATE_MAX_AGE = 0.1
 
 # RemoteHAL inherits from HAL_base and bridges it with RemoteArmInterface
 class RemoteHAL(HAL_base):
     """
     This class connects the robot control layer (HAL_base) with the remote robotic arm
     through the RemoteArmInterface. It handles joint control, gripper actions, and camera streaming.
+    With use_command_queue, joint commands are queued between start_arm and stop_arm: set_joint returns right away and
+    the targets are coalesced per joint and sent in the background, see RemoteCommandQueue.
+    With use_websocket, joint commands and reads go over the server's /ws/control WebSocket instead of one HTTP request each,
+    and joint reads are served from the joint state the server pushes telemetry_hz times a second. HTTP is used if it can't connect.
     """
 
-    def __init__(self, ip_address="127.0.0.1", port=8000):
+    def __init__(self, ip_address="127.0.0.1", port=8000, timeout: float = DEFAULT_READ_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 use_command_queue: bool = True, use_websocket: bool = False, telemetry_hz: int = 60):
         super().__init__()
         self.remote_address = "http://" + ip_address + ":" + str(port)
-        self.remote = RemoteArmInterface(self.remote_address)
+        # requests time out after timeout seconds and failed connections are retried up to retries times
+        self.remote = RemoteArmInterface(self.remote_address, timeout=timeout, retries=retries)
         self.latest_frame: Optional[cv2.typing.MatLike] = None
+        self.command_queue: Optional[RemoteCommandQueue] = RemoteCommandQueue(self._send_joint_batch) if use_command_queue else None
+        self.command_queue_running = False
+        self.use_websocket = use_websocket
+        self.telemetry_hz = telemetry_hz
+        self.control_socket = None  # WebSocketControlClient while connected
         
 
     def _start_camera_thread(self):
@@ -34,31 +51,137 @@ class RemoteHAL(HAL_base):
     def start_arm(self) -> bool:
         """
         This function can be expanded to handle any startup procedures for the arm.
-        Currently just returns True to indicate success.
+        Fetches the camera intrinsics once so the focal length never needs a request per frame.
         """
         self._start_camera_thread()
+        if self.use_websocket:
+            self._connect_control_socket()
+        if self.command_queue is not None:
+            self.command_queue.start()
+            self.command_queue_running = True
+        self.invalidate_camera_intrinsics()
+        print("Camera intrinsics: " + str(self.get_camera_intrinsics()))
         return True
 
     def stop_arm(self) -> bool:
         """
         This function can be expanded to handle any shutdown procedures for the arm.
-        Currently just returns True to indicate success.
-        """
-        self.remote.st
+        Sends the queued joint commands, stops the camera stream and the gripper worker and closes the kept-alive connections.
+        """
+        if self.command_queue_running:
+            self.command_queue_running = False
+            if not self.command_queue.stop():
+                print("Some queued joint commands were not sent before the remote arm stopped")
+        self.stop_gripper_worker()
+        if self.control_socket is not None:
+            self.control_socket.close()
+            self.control_socket = None
+        self.remote.close()
         return True
 
+    def _connect_control_socket(self) -> None:
+        try:
+            # only needed with use_websocket, so the websockets package is only imported then
+            from HALs.http_remote.ws_control_client import WebSocketControlClient
+            control_socket = WebSocketControlClient(self.remote_address, ack_timeout=self.remote.timeout[1])
+            control_socket.connect()
+            control_socket.subscribe(self.telemetry_hz, joints=True)
+            self.control_socket = control_socket
+        except Exception as err:
+            print(f"Exception connecting the control WebSocket, using HTTP: {err=}, {type(err)=}")
+            self.control_socket = None
+
+    def _joint_transport(self):
+        """
+        The control WebSocket while it is connected, the HTTP interface otherwise. Both have set_joint, set_joints and get_joints.
+        """
+        control_socket = self.control_socket
+        if control_socket is not None and control_socket.is_connected():
+            return control_socket
+        return self.remote
+
+    def _send_joint_batch(self, joint_angles, mask) -> bool:
+        return self._joint_transport().set_joints(joint_angles, mask)
+
     def set_joint(self, joint_index: int, joint_angle: float) -> bool:
         """
         Sends a command to set the angle of a specific joint on the robotic arm.
+        With the command queue running this only queues it and returns True, failures are printed (or use set_joint_async).
+        """
+        if self.command_queue_running:
+            self.command_queue.set_joint(joint_index, joint_angle)
+            self.invalidate_joint_cache()
+            return True
+        return self._joint_transport().set_joint(joint_index, joint_angle)
+
+    def set_joint_async(self, joint_index: int, joint_angle: float) -> "Future[bool]":
+        """
+        Like set_joint but returns a future that resolves once the arm accepted the target.
         """
-        return self.remote.set_joint(joint_index, joint_angle)
+        return self.set_joints_async({joint_index: joint_angle})
 
     def get_joint(self, joint_index: int) -> float:
         """
         Returns the current angle of a specific joint from the robotic arm.
         """
+        if self._joint_transport() is not self.remote:
+            return float(self.get_joints()[joint_index])
         return self.remote.get_joint(joint_index)
 
+    def get_joints(self) -> np.ndarray:
+        """
+        Returns every joint angle from the robotic arm using a single request, or from the WebSocket telemetry if it is recent.
+        """
+        transport = self._joint_transport()
+        if transport is not self.remote and transport.get_joint_state_age() < WEBSOCKET_JOINT_STATE_MAX_AGE:
+            return np.array(transport.get_latest_joint_state()[1], dtype=float)
+        return np.array(transport.get_joints(), dtype=float)
+
+    def set_joints(self, joint_angles, mask = None) -> bool:
+        """
+        Sends the angles for every joint where mask is True in a single request.
+        """
+        joint_indices = self._masked_joint_indices(joint_angles, mask) # validate before it goes over the network
+        if self.command_queue_running:
+            self.command_queue.set_joints({joint_index: float(joint_angles[joint_index]) for joint_index in joint_indices})
+            self.invalidate_joint_cache()
+            return True
+        success = self._joint_transport().set_joints(list(joint_angles), None if mask is None else list(mask))
+        self.invalidate_joint_cache()
+        return success
+
+    def set_joints_async(self, targets: Dict[int, float]) -> "Future[bool]":
+        """
+        Queues {joint_index: angle} targets, the future resolves once the arm accepted all of them.
+        Without the command queue running, over HTTP the request is sent before this returns.
+        """
+        transport = self._joint_transport()
+        if self.command_queue_running:
+            future = self.command_queue.set_joints(targets)
+        elif transport is not self.remote:
+            future = transport.set_joints_async(targets)
+        else:
+            future = Future()
+            joint_angles = [0.0] * (max(targets.keys(), default=-1) + 1)
+            mask = [False] * len(joint_angles)
+            for joint_index, joint_angle in targets.items():
+                joint_angles[joint_index] = float(joint_angle)
+                mask[joint_index] = True
+            try:
+                future.set_result(self.remote.set_joints(joint_angles, mask) if len(targets) > 0 else True)
+            except Exception as err:
+                future.set_exception(err)
+        self.invalidate_joint_cache()
+        return future
+
+    def get_command_metrics(self) -> Dict[str, float]:
+        """
+        Queue depth, coalesced and failed counts and end to end command latency, empty without the command queue.
+        """
+        if self.command_queue is None:
+            return {}
+        return self.command_queue.get_metrics()
+
     def joint_count(self) -> int:
         """
         Returns the number of joints in the robotic arm.
@@ -68,12 +191,14 @@ class RemoteHAL(HAL_base):
     def gripper_open(self) -> bool:
         """
         Sends a command to open the robotic gripper.
+        Blocks for the request, gripper_open_async runs it on the gripper worker instead.
         """
         return self.remote.gripper_open()
 
     def gripper_close(self) -> bool:
         """
         Sends a command to close the robotic gripper.
+        Blocks for the request, gripper_close_async runs it on the gripper worker instead.
         """
         return self.remote.gripper_close()
 
@@ -84,11 +209,15 @@ class RemoteHAL(HAL_base):
         """
         return self.latest_frame
 
-    def get_camera_focal_length(self) -> float:
-        """
-        Returns the camera focal length in pixels.
-        You should calibrate your camera and return the actual focal length here.
-        This is used in 3D reconstruction and distance estimation.
-        """
-        # Example placeholder value; replace with actual calibration data
-        return 800.0
+    def compute_camera_intrinsics(self) -> Optional[CameraIntrinsics]:
+        """
+        Asks the remote arm for its camera intrinsics, used in 3D reconstruction and distance estimation.
+        """
+        try:
+            values = self.remote.get_camera_intrinsics()
+        except Exception as err:
+            print(f"Exception fetching the remote camera intrinsics: {err=}, {type(err)=}")
+            return None
+        if values is None:
+            return None
+        return CameraIntrinsics.from_dict(values)
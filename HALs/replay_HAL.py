@@ -0,0 +1,185 @@
+import bisect
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from HALs.HAL_base import HAL_base
+from HALs.hal_recording import load_recording, decode_frame, RECORD_META, RECORD_FRAME, RECORD_JOINTS, RECORD_COMMAND
+from Vision.CameraIntrinsics import CameraIntrinsics
+
+class ReplayHAL(HAL_base):
+    """
+    Plays back a recording made with RecordingHAL so the controllers and vision code can run without the arm or simulator.
+
+    speed 1 plays in real time, speed N plays N times faster, speed 0 plays as fast as possible:
+    every get_arm_cam_img_rgb call returns the next recorded frame and the joint reads follow it.
+    Playback is open loop, commands sent to this HAL are kept in issued_commands (to compare with recorded_commands) but don't move the replayed joints.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.lock = threading.Lock()
+
+        self.meta: Dict[str, Any] = {}
+        self.frame_times: List[float] = []
+        self.frames: List[bytes] = []
+        self.joint_times: List[float] = []
+        self.joint_states: List[np.ndarray] = []
+        self.recorded_commands: List[Tuple[float, str, list]] = []
+        self.issued_commands: List[Tuple[float, str, list]] = []
+
+        self.wall_start = 0.0
+        self.frame_index = -1
+        self.decoded_index = -1
+        self.decoded_frame: Optional[cv2.typing.MatLike] = None
+        self.frames_served = 0
+        self.frames_decoded = 0
+        self.finished = False
+
+    def start_arm(self) -> bool:
+        for record in load_recording(self.path):
+            if record.record_type == RECORD_META:
+                self.meta.update(record.json())
+            elif record.record_type == RECORD_FRAME:
+                self.frame_times.append(record.timestamp)
+                self.frames.append(record.payload)
+            elif record.record_type == RECORD_JOINTS:
+                self.joint_times.append(record.timestamp)
+                self.joint_states.append(record.joint_angles())
+            elif record.record_type == RECORD_COMMAND:
+                command = record.json()
+                self.recorded_commands.append((record.timestamp, command["command"], command["args"]))
+
+        print(f"Replaying \"{self.path}\" recorded from {self.meta.get('hal', 'an unknown HAL')}: "
+              f"{len(self.frames)} frames, {len(self.joint_states)} joint states, {len(self.recorded_commands)} commands, "
+              f"{self.get_duration():.2f} seconds")
+        self.restart()
+        self.invalidate_camera_intrinsics()
+        return True
+
+    def stop_arm(self) -> bool:
+        return True
+
+    def restart(self) -> None:
+        """ Rewinds the playback to the start of the recording. """
+        with self.lock:
+            self.wall_start = time.monotonic()
+            self.frame_index = -1
+            self.finished = False
+            self.issued_commands = []
+
+    def get_duration(self) -> float:
+        """ Seconds between the first and last recorded frame. """
+        if len(self.frame_times) < 2:
+            return 0.0
+        return self.frame_times[-1] - self.frame_times[0]
+
+    def is_finished(self) -> bool:
+        """ True once the last frame has been played (never when looping). """
+        return self.finished
+
+    def get_replay_stats(self) -> Dict[str, Any]:
+        return {
+            "frames": len(self.frames),
+            "frames_served": self.frames_served,
+            "frames_decoded": self.frames_decoded,
+            "recorded_commands": len(self.recorded_commands),
+            "issued_commands": len(self.issued_commands),
+            "finished": self.finished,
+        }
+
+    # playback clock - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _playback_time(self) -> float:
+        """ The recording timestamp we are currently at. INTERNAL, the caller must hold self.lock. """
+        if len(self.frame_times) == 0:
+            return 0.0
+        if self.speed <= 0:
+            # as fast as possible, the frames set the pace
+            return self.frame_times[max(self.frame_index, 0)]
+        elapsed = (time.monotonic() - self.wall_start) * self.speed
+        duration = self.get_duration()
+        if self.loop and duration > 0:
+            elapsed = elapsed % duration
+        elif elapsed >= duration:
+            self.finished = True
+        return self.frame_times[0] + elapsed
+
+    def _advance_frame(self) -> int:
+        """ Moves to the frame that should be showing now. INTERNAL, the caller must hold self.lock. """
+        if self.speed <= 0:
+            if self.frame_index + 1 < len(self.frames):
+                self.frame_index += 1
+            elif self.loop:
+                self.frame_index = 0
+            # finished as soon as the last frame is handed out so a "while not is_finished()" loop sees every frame once
+            if self.frame_index == len(self.frames) - 1 and not self.loop:
+                self.finished = True
+        else:
+            self.frame_index = max(bisect.bisect_right(self.frame_times, self._playback_time()) - 1, 0)
+        return self.frame_index
+
+    # HAL - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def get_arm_cam_img_rgb(self) -> cv2.typing.MatLike:
+        with self.lock:
+            if len(self.frames) == 0:
+                return None
+            frame_index = self._advance_frame()
+            self.frames_served += 1
+            # at 1x several reads can land on the same frame, only decode it once
+            if frame_index != self.decoded_index:
+                self.decoded_frame = decode_frame(self.frames[frame_index])
+                if self.decoded_frame is not None:
+                    # every read until the next frame gets this same array, so nobody may draw on it
+                    self.decoded_frame.flags.writeable = False
+                self.decoded_index = frame_index
+                self.frames_decoded += 1
+            return self.decoded_frame
+
+    def joint_count(self) -> int:
+        if "joint_count" in self.meta:
+            return int(self.meta["joint_count"])
+        if len(self.joint_states) > 0:
+            return len(self.joint_states[0])
+        return 0
+
+    def get_joints(self) -> np.ndarray:
+        with self.lock:
+            if len(self.joint_states) == 0:
+                return np.zeros(self.joint_count())
+            # the last joint state read at or before the current point in the recording
+            joint_index = bisect.bisect_right(self.joint_times, self._playback_time()) - 1
+            return self.joint_states[max(joint_index, 0)].copy()
+
+    def get_joint(self, joint_index: int) -> float:
+        return float(self.get_joints()[joint_index])
+
+    def _issue_command(self, command: str, *args) -> bool:
+        with self.lock:
+            self.issued_commands.append((self._playback_time(), command, list(args)))
+        return True
+
+    def set_joint(self, joint_index: int, joint_angle: float) -> bool:
+        return self._issue_command("set_joint", joint_index, joint_angle)
+
+    def set_joints(self, joint_angles, mask = None) -> bool:
+        self._masked_joint_indices(joint_angles, mask)
+        return self._issue_command("set_joints", list(joint_angles), None if mask is None else list(mask))
+
+    def gripper_open(self) -> bool:
+        return self._issue_command("gripper_open")
+
+    def gripper_close(self) -> bool:
+        return self._issue_command("gripper_close")
+
+    def compute_camera_intrinsics(self) -> Optional[CameraIntrinsics]:
+        camera_intrinsics = self.meta.get("camera_intrinsics")
+        if camera_intrinsics is None:
+            return None
+        return CameraIntrinsics.from_dict(camera_intrinsics)
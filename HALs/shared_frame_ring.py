@@ -0,0 +1,184 @@
+import time
+import weakref
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+DEFAULT_SLOT_COUNT = 4
+# a 1080p RGB frame
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3
+
+# slot data starts on a cache line
+_DATA_ALIGNMENT = 64
+
+_RING_HEADER_DTYPE = np.dtype([
+    ("slot_count", "<i8"),
+    ("slot_bytes", "<i8"),
+    ("latest_slot", "<i8"),
+    ("latest_sequence", "<u8"),
+])
+_SLOT_HEADER_DTYPE = np.dtype([
+    ("sequence", "<u8"),
+    ("timestamp", "<f8"),
+    # how many views of this slot the reader still holds, the writer never reuses a pinned slot
+    ("pins", "<i8"),
+    ("height", "<i4"),
+    ("width", "<i4"),
+    ("channels", "<i4"),
+    ("padding", "<i4"),
+])
+
+class SharedFrameRing:
+    """
+    Camera frames passed between processes through shared memory slots, one writer process and one reader process.
+    The writer copies each frame into the oldest free slot. The reader gets a read-only numpy view straight into the slot,
+    no copy, and the slot is pinned until every reference to that view (and to arrays sliced from it) is gone,
+    so a frame the reader still holds is never overwritten. With every slot pinned new frames are dropped.
+    Slot headers are only touched under a multiprocessing lock shared by both sides, frame pixels are copied outside it.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, lock, owner: bool):
+        """ Use SharedFrameRing.create in the writer's parent and SharedFrameRing.attach on the other side. """
+        self.shm = shm
+        self.lock = lock
+        self.owner = owner
+        self.closed = False
+
+        self.ring_header = np.ndarray((), dtype=_RING_HEADER_DTYPE, buffer=shm.buf, offset=0)
+        self.slot_count = int(self.ring_header["slot_count"])
+        self.slot_bytes = int(self.ring_header["slot_bytes"])
+        self.slot_headers = np.ndarray((self.slot_count,), dtype=_SLOT_HEADER_DTYPE, buffer=shm.buf, offset=_RING_HEADER_DTYPE.itemsize)
+        self.data_offset = _data_offset(self.slot_count)
+
+        # writer side counters, only meaningful in the writing process
+        self.written_frames = 0
+        self.dropped_frames = 0
+
+    @classmethod
+    def create(cls, lock, slot_count: int = DEFAULT_SLOT_COUNT, slot_bytes: int = DEFAULT_SLOT_BYTES) -> "SharedFrameRing":
+        """
+        Args:
+            lock: A multiprocessing lock both processes get, ex: multiprocessing.get_context("spawn").Lock().
+            slot_count: Frames the ring holds, 3 or more so the writer has a free slot while the reader holds one.
+            slot_bytes: Size of the biggest frame the ring can take.
+        """
+        if slot_count < 3:
+            raise ValueError(f"a frame ring needs at least 3 slots, got {slot_count}")
+        shm = shared_memory.SharedMemory(create=True, size=_data_offset(slot_count) + slot_count * slot_bytes)
+        ring_header = np.ndarray((), dtype=_RING_HEADER_DTYPE, buffer=shm.buf, offset=0)
+        ring_header["slot_count"] = slot_count
+        ring_header["slot_bytes"] = slot_bytes
+        ring_header["latest_slot"] = -1
+        ring_header["latest_sequence"] = 0
+        del ring_header
+        np.ndarray((slot_count,), dtype=_SLOT_HEADER_DTYPE, buffer=shm.buf, offset=_RING_HEADER_DTYPE.itemsize).fill(0)
+        return cls(shm, lock, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, lock) -> "SharedFrameRing":
+        """ Opens a ring another process created, name is that ring's name. """
+        return cls(shared_memory.SharedMemory(name=name), lock, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        """ Detaches from the shared memory, the creating side also frees it. """
+        if self.closed:
+            return
+        self.closed = True
+        del self.ring_header
+        del self.slot_headers
+        try:
+            self.shm.close()
+        except BufferError:
+            # the reader still holds frames, the mapping goes away with them
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+    # writer - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def write(self, frame: cv2.typing.MatLike, timestamp: float = None) -> int:
+        """ Publishes a uint8 frame and returns its sequence number, 0 if it was dropped because every slot is in use. """
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            raise ValueError(f"frame {frame.shape} {frame.dtype} doesn't fit a {self.slot_bytes} byte uint8 slot")
+        with self.lock:
+            slot = self._free_slot()
+            if slot < 0:
+                self.dropped_frames += 1
+                return 0
+            # readers only ever take the latest slot, which this isn't, so the pixels can be copied without the lock
+            self.slot_headers[slot]["sequence"] = 0
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 0
+        np.copyto(self._slot_view(slot, height, width, channels), frame)
+        with self.lock:
+            sequence = int(self.ring_header["latest_sequence"]) + 1
+            header = self.slot_headers[slot]
+            header["sequence"] = sequence
+            header["timestamp"] = time.time() if timestamp is None else timestamp
+            header["height"] = height
+            header["width"] = width
+            header["channels"] = channels
+            self.ring_header["latest_slot"] = slot
+            self.ring_header["latest_sequence"] = sequence
+        self.written_frames += 1
+        return sequence
+
+    def _free_slot(self) -> int:
+        """ INTERNAL, the caller must hold self.lock. The oldest slot that isn't the latest frame or pinned, -1 if there is none. """
+        latest_slot = int(self.ring_header["latest_slot"])
+        best_slot = -1
+        best_sequence = 0
+        for slot in range(self.slot_count):
+            header = self.slot_headers[slot]
+            if slot == latest_slot or header["pins"] > 0:
+                continue
+            if best_slot < 0 or header["sequence"] < best_sequence:
+                best_slot = slot
+                best_sequence = header["sequence"]
+        return best_slot
+
+    # reader - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def latest_sequence(self) -> int:
+        with self.lock:
+            return int(self.ring_header["latest_sequence"])
+
+    def read_latest(self, last_sequence: int = 0) -> Tuple[int, Optional[cv2.typing.MatLike], float]:
+        """
+        Returns (sequence, frame, timestamp) of the newest frame, frame is None if there is none newer than last_sequence.
+        The frame is a read-only view into shared memory, copy it before drawing on it.
+        """
+        with self.lock:
+            sequence = int(self.ring_header["latest_sequence"])
+            slot = int(self.ring_header["latest_slot"])
+            if slot < 0 or sequence <= last_sequence:
+                return sequence, None, 0.0
+            header = self.slot_headers[slot]
+            header["pins"] += 1
+            height, width, channels = int(header["height"]), int(header["width"]), int(header["channels"])
+            timestamp = float(header["timestamp"])
+        frame = self._slot_view(slot, height, width, channels)
+        frame.flags.writeable = False
+        # unpinned once nothing references the view anymore, slices of it keep it alive through .base
+        weakref.finalize(frame, self._unpin, slot)
+        return sequence, frame, timestamp
+
+    def _unpin(self, slot: int) -> None:
+        if self.closed:
+            return
+        with self.lock:
+            self.slot_headers[slot]["pins"] -= 1
+
+    def _slot_view(self, slot: int, height: int, width: int, channels: int) -> np.ndarray:
+        shape = (height, width, channels) if channels > 0 else (height, width)
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=self.data_offset + slot * self.slot_bytes)
+
+def _data_offset(slot_count: int) -> int:
+    headers_end = _RING_HEADER_DTYPE.itemsize + slot_count * _SLOT_HEADER_DTYPE.itemsize
+    return (headers_end + _DATA_ALIGNMENT - 1) // _DATA_ALIGNMENT * _DATA_ALIGNMENT
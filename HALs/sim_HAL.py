@@ -1,26 +1,25 @@
-from coppeliasim_zmqremoteapi_client import RemoteAPIClient
 import cv2
 import threading
 import math
+import time
 import numpy as np
-import struct
+from typing import Any, Callable, Dict, Optional
 
 from HALs.HAL_base import HAL_base
+from HALs.sim_frame_decode import decode_vision_sensor_image
+from HALs.timed_lock import TimedLock
+from Vision.CameraIntrinsics import CameraIntrinsics
 
 # degrees to radians
 D_TO_R = math.pi / 180
 R_TO_D = 180 / math.pi
 
-# this function is super important for performance reasons
-# Warning Chat GPT is great
-def unpack_uint8_table(image_data):
-    # Assuming image_data is a byte array
-    return struct.unpack(f'{len(image_data)}B', image_data)
-
 class sim_HAL(HAL_base):
 
-    # create a lock object
+    # joint I/O and image transfer go over separate remote API connections, each with its own lock,
+    # so a slow getVisionSensorImg never makes joint commands queue up behind it
     lock = threading.Lock()
+    camera_lock = threading.Lock()
 
     motorCount = 4
     
@@ -28,23 +27,49 @@ class sim_HAL(HAL_base):
 
     client = None
     sim = None
+    camera_client = None
+    camera_sim = None
     mtr = None
     sensorHandle = None
     
-    def __init__(self, host: str):
+    is_started = False
+    stepping = False
+    step_count = 0
+    
+    def __init__(self, host: str, sim = None, stepping: bool = False, camera_sim = None):
+        """
+        Args:
+            host: Address of the machine running CoppeliaSim.
+            sim: Optional object to use in place of the remote API 'sim' object, ex: a fake for tests.
+            stepping: Start the simulation in stepping mode, it will only advance when step() is called.
+            camera_sim: Optional stand-in for the image transfer connection, defaults to sim when sim is given.
+        """
         super().__init__()
-        self.lock = threading.Lock()
+        self.lock = TimedLock("joint")
+        self.camera_lock = TimedLock("camera")
         self.host = host
+        self.sim = sim
+        self.camera_sim = camera_sim if camera_sim is not None else sim
+        self.stepping = stepping
         self.gripper_closed = False        
 
+    def _connect(self) -> None:
+        # imported here so sim_HAL can run against a stand-in sim object without the remote API installed
+        from coppeliasim_zmqremoteapi_client import RemoteAPIClient
+        # a client is one REQ socket that only allows one call in flight, so each channel gets its own
+        self.client = RemoteAPIClient(host=self.host)
+        self.sim = self.client.require('sim')
+        self.camera_client = RemoteAPIClient(host=self.host)
+        self.camera_sim = self.camera_client.require('sim')
+
     def start_arm(self) -> bool:
 
         print("Connecting to CoppeliaSim...")
-        if self.sim is None:
+        if not self.is_started:
             with self.lock:
                 # remote API init
-                self.client = RemoteAPIClient(host=self.host)
-                self.sim = self.client.require('sim')
+                if self.sim is None:
+                    self._connect()
                 
                 # motor ids
                 self.mtr = [i for i in range(self.motorCount)]
@@ -100,36 +125,110 @@ class sim_HAL(HAL_base):
                 resolution = self.sim.getVisionSensorResolution(self.sensorHandle)
                 print("Resolution: " + str(resolution))
                 
+                # in stepping mode the sim waits for step() between control ticks
+                self.sim.setStepping(self.stepping)
+                
                 # start sim
                 self.sim.startSimulation()
-                return True
+                self.is_started = True
+            # the sensor's resolution and view angle don't change while running, ask once instead of per frame
+            self.invalidate_camera_intrinsics()
+            print("Camera intrinsics: " + str(self.get_camera_intrinsics()))
+            print("Finished connecting to CoppeliaSim!")
+            return True
         else:
             return False
-        print("Finished connecting to CoppeliaSim!")
 
     def stop_arm(self) -> bool:
+        self.stop_gripper_worker()
         # global sim
         with self.lock:
             self.sim.stopSimulation()
+            self.is_started = False
             print("--------- Ended ARM_SIM ---------")
             
         return True
 
+    def get_lock_wait_stats(self) -> Dict[str, Dict[str, float]]:
+        return {"joint": self.lock.get_stats(), "camera": self.camera_lock.get_stats()}
+
+    def reset_lock_wait_stats(self) -> None:
+        self.lock.reset_stats()
+        self.camera_lock.reset_stats()
+
+    # stepping mode - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    
+    def set_stepping(self, enabled: bool) -> None:
+        """ When enabled the simulation only advances when step() is called, making runs independent of wall-clock timing. """
+        with self.lock:
+            self.sim.setStepping(enabled)
+        self.stepping = enabled
+
+    def step(self) -> None:
+        """ Advances the simulation by one time step, blocks until the step is done. Only valid in stepping mode. """
+        with self.lock:
+            self.sim.step()
+        self.step_count += 1
+
+    def get_simulation_time(self) -> float:
+        with self.lock:
+            return self.sim.getSimulationTime()
+
+    def get_simulation_time_step(self) -> float:
+        with self.lock:
+            return self.sim.getSimulationTimeStep()
+
+    def run_stepped(self, tick_fnc: Callable[[float], bool], max_steps: int) -> Dict[str, Any]:
+        """
+        Runs a fixed-dt control loop as fast as the simulator allows: tick_fnc is called, then the simulation is stepped once.
+
+        Args:
+            tick_fnc: Called with the simulation time in seconds before every step, return False to stop the loop.
+            max_steps: The loop stops after this many steps even if tick_fnc never returns False.
+
+        Returns:
+            A dict with the steps taken, wall and simulated seconds, sim-steps per second, and whether tick_fnc stopped the loop.
+        """
+        if not self.stepping:
+            self.set_stepping(True)
+
+        dt = self.get_simulation_time_step()
+        start_sim_time = self.get_simulation_time()
+        steps = 0
+        stopped_by_tick = False
+
+        wall_start = time.perf_counter()
+        while steps < max_steps:
+            # the sim time advances exactly dt per step, so there is no need to ask the sim for it every tick
+            if not tick_fnc(start_sim_time + steps * dt):
+                stopped_by_tick = True
+                break
+            self.step()
+            steps += 1
+        wall_seconds = time.perf_counter() - wall_start
+
+        return {
+            "steps": steps,
+            "dt": dt,
+            "sim_seconds": steps * dt,
+            "wall_seconds": wall_seconds,
+            "steps_per_second": steps / wall_seconds if wall_seconds > 0 else float("inf"),
+            "stopped_by_tick": stopped_by_tick,
+        }
+
     def joint_count(self) -> int:
         return self.motorCount
 
     def set_joint(self, joint_index, joint_angle) -> bool:
         
         # Check if the joint angle is within the bounds
-        if(joint_angle < self.get_joint_min(joint_index)):
-            joint_angle = self.get_joint_min(joint_index)
-        if(joint_angle > self.get_joint_max(joint_index)):
-            joint_angle = self.get_joint_max(joint_index)        
-        
+        joint_angle = self.clamp_joint_angle(joint_index, joint_angle)
+
         #move the joint
         if(joint_index < self.motorCount):
             with self.lock:
                 self.sim.setJointTargetPosition(self.mtr[int(joint_index)], float(joint_angle) * D_TO_R)
+            self.invalidate_joint_cache()
             return True
         return False
 
@@ -137,18 +236,32 @@ class sim_HAL(HAL_base):
         with self.lock:
             return self.sim.getJointPosition(self.mtr[int(joint_index)]) * R_TO_D
 
-    def get_arm_cam_img_rgb(self) -> cv2.typing.MatLike:
+    def get_joints(self) -> np.ndarray:
+        # the ZMQ remote API has no batch call, so the reads go back to back under a single lock acquisition
+        with self.lock:
+            joint_angles = [self.sim.getJointPosition(handle) for handle in self.mtr]
+        return np.array(joint_angles, dtype=float) * R_TO_D
+
+    def set_joints(self, joint_angles, mask = None) -> bool:
+        joint_indices = self._masked_joint_indices(joint_angles, mask)
+        if any(joint_index >= self.motorCount for joint_index in joint_indices):
+            return False
 
+        # clamp everything before taking the lock so the lock is only held for the RPCs
+        targets = [(self.mtr[joint_index], self.clamp_joint_angle(joint_index, joint_angles[joint_index]) * D_TO_R) for joint_index in joint_indices]
         with self.lock:
-            image, resolution = self.sim.getVisionSensorImg(self.sensorHandle)
-        image_data = unpack_uint8_table(image)
-        image_array_rgb = np.array(image_data, dtype=np.uint8)
-        image_array_rgb = np.reshape(image_array_rgb, (resolution[1], resolution[0], 3))
-        image_array_rgb_vertically_flipped = cv2.flip(image_array_rgb, 0)  # flip image vertically
-        # Convert the image from RGB to HSV color space
-        # hsv_image = cv2.cvtColor(image_array_rgb, cv2.COLOR_RGB2HSV)
-
-        return image_array_rgb_vertically_flipped
+            for handle, target_radians in targets:
+                self.sim.setJointTargetPosition(handle, target_radians)
+        self.invalidate_joint_cache()
+        return True
+
+    def get_arm_cam_img_rgb(self) -> cv2.typing.MatLike:
+
+        with self.camera_lock:
+            image, resolution = self.camera_sim.getVisionSensorImg(self.sensorHandle)
+        self._check_camera_resolution(resolution[0], resolution[1])
+        # zero copy, the returned frame is a read-only flipped view over the bytes from the sim
+        return decode_vision_sensor_image(image, resolution, flip_vertical=True)
     
     def calculate_focal_length(self, sim, sensor_handle):
         """
@@ -178,9 +291,17 @@ class sim_HAL(HAL_base):
         
         return focal_length
     
-    def get_camera_focal_length(self) -> float:
-        with self.lock:            
-            return self.calculate_focal_length(self.sim, self.sensorHandle)
+    def compute_camera_intrinsics(self) -> Optional[CameraIntrinsics]:
+        try:
+            with self.camera_lock:
+                resolution = self.camera_sim.getVisionSensorResolution(self.sensorHandle)
+                focal_length = self.calculate_focal_length(self.camera_sim, self.sensorHandle)
+        except Exception as err:
+            print(f"Exception computing sim camera intrinsics: {err=}, {type(err)=}")
+            return None
+        width, height = int(resolution[0]), int(resolution[1])
+        # the sim's vision sensor is an ideal pinhole camera with square pixels
+        return CameraIntrinsics(focal_length, focal_length, width / 2, height / 2, (width, height))
     
     def gripper_open(self) -> bool:
         if not self.gripper_closed:
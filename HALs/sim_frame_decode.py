@@ -0,0 +1,28 @@
+import numpy as np
+
+# CoppeliaSim vision sensors return a flat RGB byte string, with the first row being the bottom of the image.
+VISION_SENSOR_CHANNELS = 3
+
+def decode_vision_sensor_image(image_data, resolution, flip_vertical: bool = True) -> np.ndarray:
+    """
+    Wraps the raw bytes returned by sim.getVisionSensorImg as an (height, width, 3) uint8 RGB array without copying.
+
+    Args:
+        image_data: The bytes returned by getVisionSensorImg.
+        resolution: The [width, height] returned alongside the image.
+        flip_vertical: If True a vertically flipped view is returned so row 0 is the top of the image,
+            this replaces the cv2.flip copy.
+
+    Returns:
+        A read-only view over image_data, copy it before drawing on it.
+    """
+    width, height = int(resolution[0]), int(resolution[1])
+    expected_size = width * height * VISION_SENSOR_CHANNELS
+    if len(image_data) != expected_size:
+        raise ValueError(f"Vision sensor image is {len(image_data)} bytes, expected {expected_size} for {width}x{height}.")
+
+    image_array_rgb = np.frombuffer(image_data, dtype=np.uint8).reshape((height, width, VISION_SENSOR_CHANNELS))
+    if flip_vertical:
+        # negative stride view, no pixels are moved
+        return image_array_rgb[::-1]
+    return image_array_rgb
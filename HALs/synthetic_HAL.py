@@ -0,0 +1,258 @@
+import math
+import threading
+import time
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+from HALs.HAL_base import HAL_base
+from Vision.CameraIntrinsics import CameraIntrinsics
+
+# link lengths in cm, same measurements as Three_Degree_Arm in Controllers/FollowClaw.py
+BASE_HEIGHT = 13.1          # a1
+LOWER_LIMB_LENGTH = 11.4    # a3
+UPPER_LIMB_LENGTH = 5.8     # a5
+CAMERA_OFFSET = 11.11       # a6, wrist to camera
+
+# camera looks along the last link, close to the Pi camera's field of view
+DEFAULT_HORIZONTAL_FOV_DEGREES = 62.2
+
+# objects closer to the camera than this (cm) are not drawn
+NEAR_PLANE = 1.0
+
+# RGB colors that land inside ColorObjectIdentifier's hue ranges
+SCENE_COLORS = {
+    "Red": (230, 30, 30),
+    "Orange": (240, 130, 20),
+    "Yellow": (230, 220, 30),
+    "Green": (40, 200, 40),
+    "Cyan": (30, 200, 210),
+    "Blue": (30, 50, 230),
+    "Purple": (140, 40, 210),
+    "Magenta": (220, 40, 160),
+}
+
+# box corner signs, scaled by the half extents
+BOX_CORNERS = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=float)
+
+class SyntheticObject:
+    """ A sphere (size is the radius) or an axis aligned box (size is the half extents) in arm coordinates, cm. """
+
+    SPHERE = "sphere"
+    BOX = "box"
+
+    def __init__(self, kind: str, position, size, color: Tuple[int, int, int], name: str = ""):
+        self.kind = kind
+        self.position = np.array(position, dtype=float)
+        # always 1D so spheres and boxes index the same way
+        self.size = np.atleast_1d(np.array(size, dtype=float))
+        self.color = tuple(int(c) for c in color)
+        self.name = name
+
+def generate_scene(seed: int = 0, object_count: int = 6) -> List[SyntheticObject]:
+    """ Places object_count spheres and boxes of distinct colors in front of the arm, the same seed always gives the same scene. """
+    rng = np.random.default_rng(seed)
+    color_names = list(SCENE_COLORS.keys())
+    objects = []
+    for i in range(object_count):
+        color_name = color_names[i % len(color_names)]
+        # within reach, in the base's 0 to 90 degree sweep, resting on the table (z = 0)
+        distance = rng.uniform(25, 45)
+        angle = math.radians(rng.uniform(0, 90))
+        if rng.random() < 0.5:
+            radius = rng.uniform(2, 4)
+            position = (distance * math.cos(angle), distance * math.sin(angle), radius)
+            objects.append(SyntheticObject(SyntheticObject.SPHERE, position, radius, SCENE_COLORS[color_name], f"{color_name} sphere"))
+        else:
+            half_extents = rng.uniform(1.5, 3.5, size=3)
+            position = (distance * math.cos(angle), distance * math.sin(angle), half_extents[2])
+            objects.append(SyntheticObject(SyntheticObject.BOX, position, half_extents, SCENE_COLORS[color_name], f"{color_name} box"))
+    return objects
+
+class SyntheticHAL(HAL_base):
+    """
+    A HAL with no hardware or simulator: a kinematic model of the 4 joint arm and a camera on the end of it
+    that renders colored spheres and boxes with OpenCV. Used to load test the vision and controller loops at any resolution and frame rate.
+
+    Joints, in degrees:
+        0: base yaw, counter-clockwise seen from above, 0 faces +x
+        1: lower limb tilt forward from vertical
+        2: upper limb bend relative to the lower limb
+        3: camera bend relative to the upper limb
+    The camera pitch from vertical is joint 1 + 2 + 3, so 90 looks straight ahead.
+    Like sim_HAL, frames are flipped vertically (row 0 is the bottom of the image) so the controllers tuned on the sim work unchanged.
+    """
+
+    motorCount = 4
+
+    def __init__(self, resolution: Tuple[int, int] = (640, 480), fps: float = 30, seed: int = 0, object_count: int = 6,
+                 objects: List[SyntheticObject] = None, joint_speed: float = 90, horizontal_fov_degrees: float = DEFAULT_HORIZONTAL_FOV_DEGREES,
+                 flip_vertical: bool = True, background_color: Tuple[int, int, int] = (90, 90, 90)):
+        """
+        Args:
+            resolution: (width, height) of the rendered frames.
+            fps: get_arm_cam_img_rgb is paced to this rate like a real camera, 0 renders as fast as it is called.
+            seed: Seed for generate_scene, the same seed always gives the same scene.
+            object_count: Objects generate_scene places, ignored if objects is given.
+            objects: An explicit scene to use instead of a generated one.
+            joint_speed: Degrees per second the joints move toward their targets, 0 moves them instantly.
+        """
+        super().__init__()
+        self.lock = threading.Lock()
+        self.width, self.height = int(resolution[0]), int(resolution[1])
+        self.fps = fps
+        self.joint_speed = joint_speed
+        self.flip_vertical = flip_vertical
+        # filling with a color broadcast is slow (ms per frame), build the background once and copy it per frame
+        self.background = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.background[:] = np.array(background_color, dtype=np.uint8)
+        self.intrinsics = CameraIntrinsics.from_horizontal_fov(self.width, self.height, horizontal_fov_degrees)
+        self.objects = objects if objects is not None else generate_scene(seed, object_count)
+
+        # looking 40 degrees down at the middle of the scene, joint 2 inside the controllers' 0 to 75 limit
+        self.joint_angles = np.array([45.0, 20.0, 70.0, 40.0])
+        self.joint_targets = self.joint_angles.copy()
+        self.last_joint_update = time.monotonic()
+        self.next_frame_time = 0.0
+        self.gripper_closed = False
+        self.frames_rendered = 0
+
+    def start_arm(self) -> bool:
+        with self.lock:
+            self.last_joint_update = time.monotonic()
+            self.next_frame_time = 0.0
+        self.invalidate_camera_intrinsics()
+        print(f"Synthetic arm started: {len(self.objects)} objects, {self.width}x{self.height} at {self.fps} fps")
+        return True
+
+    def stop_arm(self) -> bool:
+        return True
+
+    def joint_count(self) -> int:
+        return self.motorCount
+
+    # joints - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _update_joints(self) -> None:
+        """ Moves the joints toward their targets for the time since the last update. INTERNAL, the caller must hold self.lock. """
+        now = time.monotonic()
+        if self.joint_speed <= 0:
+            self.joint_angles[:] = self.joint_targets
+        else:
+            max_move = self.joint_speed * (now - self.last_joint_update)
+            self.joint_angles += np.clip(self.joint_targets - self.joint_angles, -max_move, max_move)
+        self.last_joint_update = now
+
+    def set_joint(self, joint_index, joint_angle) -> bool:
+        if not 0 <= joint_index < self.motorCount:
+            return False
+        joint_angle = self.clamp_joint_angle(joint_index, joint_angle)
+        with self.lock:
+            self._update_joints()
+            self.joint_targets[joint_index] = joint_angle
+        self.invalidate_joint_cache()
+        return True
+
+    def get_joint(self, joint_index) -> float:
+        with self.lock:
+            self._update_joints()
+            return float(self.joint_angles[joint_index])
+
+    def get_joints(self) -> np.ndarray:
+        with self.lock:
+            self._update_joints()
+            return self.joint_angles.copy()
+
+    def set_joints(self, joint_angles, mask = None) -> bool:
+        joint_indices = self._masked_joint_indices(joint_angles, mask)
+        if any(joint_index >= self.motorCount for joint_index in joint_indices):
+            return False
+        with self.lock:
+            self._update_joints()
+            for joint_index in joint_indices:
+                self.joint_targets[joint_index] = self.clamp_joint_angle(joint_index, joint_angles[joint_index])
+        self.invalidate_joint_cache()
+        return True
+
+    def gripper_open(self) -> bool:
+        if not self.gripper_closed:
+            return False
+        self.gripper_closed = False
+        return True
+
+    def gripper_close(self) -> bool:
+        if self.gripper_closed:
+            return False
+        self.gripper_closed = True
+        return True
+
+    # camera - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def compute_camera_intrinsics(self) -> Optional[CameraIntrinsics]:
+        return self.intrinsics
+
+    def camera_pose(self, joint_angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """ Forward kinematics, returns the camera position and its forward, right and up unit vectors in arm coordinates. """
+        yaw = math.radians(joint_angles[0])
+        lower_pitch = math.radians(joint_angles[1])
+        upper_pitch = lower_pitch + math.radians(joint_angles[2])
+        camera_pitch = upper_pitch + math.radians(joint_angles[3])
+
+        # the arm moves in the vertical plane facing the base's yaw, r is the distance out from the base, z is up
+        r = LOWER_LIMB_LENGTH * math.sin(lower_pitch) + UPPER_LIMB_LENGTH * math.sin(upper_pitch) + CAMERA_OFFSET * math.sin(camera_pitch)
+        z = BASE_HEIGHT + LOWER_LIMB_LENGTH * math.cos(lower_pitch) + UPPER_LIMB_LENGTH * math.cos(upper_pitch) + CAMERA_OFFSET * math.cos(camera_pitch)
+
+        heading = np.array([math.cos(yaw), math.sin(yaw), 0.0])
+        position = heading * r + np.array([0.0, 0.0, z])
+        forward = heading * math.sin(camera_pitch) + np.array([0.0, 0.0, math.cos(camera_pitch)])
+        right = np.array([math.sin(yaw), -math.cos(yaw), 0.0])
+        up = np.cross(right, forward)
+        return position, forward, right, up
+
+    def render(self, joint_angles: np.ndarray) -> cv2.typing.MatLike:
+        """ Renders the scene from the camera at joint_angles, returns an RGB frame. """
+        frame = self.background.copy()
+
+        position, forward, right, up = self.camera_pose(joint_angles)
+        # rows of the world to camera rotation: x right, y down (image rows), z forward
+        rotation = np.stack((right, -up, forward))
+        fx, fy, cx, cy = self.intrinsics.fx, self.intrinsics.fy, self.intrinsics.cx, self.intrinsics.cy
+
+        # every object center in camera space in one matrix multiply, then draw far to near
+        centers = (np.array([obj.position for obj in self.objects]) - position) @ rotation.T if self.objects else np.zeros((0, 3))
+        for object_index in np.argsort(-centers[:, 2]):
+            obj = self.objects[object_index]
+            center = centers[object_index]
+            if obj.kind == SyntheticObject.SPHERE:
+                if center[2] <= NEAR_PLANE:
+                    continue
+                pixel_x = cx + fx * center[0] / center[2]
+                pixel_y = cy + fy * center[1] / center[2]
+                pixel_radius = fx * obj.size[0] / center[2]
+                cv2.circle(frame, (int(pixel_x), int(pixel_y)), max(int(pixel_radius), 1), obj.color, -1)
+            else:
+                corners = (obj.position + BOX_CORNERS * obj.size - position) @ rotation.T
+                if np.any(corners[:, 2] <= NEAR_PLANE):
+                    continue
+                pixels = np.stack((cx + fx * corners[:, 0] / corners[:, 2], cy + fy * corners[:, 1] / corners[:, 2]), axis=1)
+                # the silhouette of a box is the convex hull of its projected corners
+                hull = cv2.convexHull(pixels.astype(np.int32))
+                cv2.fillConvexPoly(frame, hull, obj.color)
+
+        if self.flip_vertical:
+            # contiguous, a negative stride view can't be drawn on by OpenCV
+            return cv2.flip(frame, 0)
+        return frame
+
+    def get_arm_cam_img_rgb(self) -> cv2.typing.MatLike:
+        if self.fps > 0:
+            # behave like a camera: a new frame every 1/fps seconds
+            now = time.monotonic()
+            if self.next_frame_time > now:
+                time.sleep(self.next_frame_time - now)
+                now = self.next_frame_time
+            self.next_frame_time = max(self.next_frame_time + 1.0 / self.fps, now)
+        joint_angles = self.get_joints()
+        frame = self.render(joint_angles)
+        self.frames_rendered += 1
+        return frame
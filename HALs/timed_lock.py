@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Dict
+
+class TimedLock:
+    """
+    A threading.Lock that records how long callers wait to acquire it and how long it is held.
+    Use it exactly like a Lock: "with lock:".
+    """
+
+    def __init__(self, name: str = "lock"):
+        self.name = name
+        self._lock = threading.Lock()
+        # guards the counters, never held while waiting on _lock
+        self._stats_lock = threading.Lock()
+        self._acquired_at = 0.0
+        self.reset_stats()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        wait_start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            acquired_at = time.perf_counter()
+            wait_seconds = acquired_at - wait_start
+            self._acquired_at = acquired_at
+            with self._stats_lock:
+                self.acquire_count += 1
+                self.total_wait_seconds += wait_seconds
+                if wait_seconds > self.max_wait_seconds:
+                    self.max_wait_seconds = wait_seconds
+        return acquired
+
+    def release(self) -> None:
+        held_seconds = time.perf_counter() - self._acquired_at
+        self._lock.release()
+        with self._stats_lock:
+            self.total_held_seconds += held_seconds
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> "TimedLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self.acquire_count = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.total_held_seconds = 0.0
+
+    def get_stats(self) -> Dict[str, float]:
+        """ Returns the acquire count and wait / hold times in milliseconds since the last reset. """
+        with self._stats_lock:
+            count = self.acquire_count
+            return {
+                "acquires": count,
+                "total_wait_ms": self.total_wait_seconds * 1000,
+                "mean_wait_ms": (self.total_wait_seconds / count * 1000) if count > 0 else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "total_held_ms": self.total_held_seconds * 1000,
+            }
@@ -1,7 +1,6 @@
 import colorsys
 import math
 
-import cv2
 import numpy as np
 import sympy as sym
 from kivy.core.window import Window
@@ -15,6 +14,7 @@ from Controllers import FollowClaw
 from Controllers.Controller import Controller
 from Controllers.FollowClaw import coordinate_input
 from HALs.HAL_base import HAL_base
+from HALs.frame_pyramid import PYRAMID_QUARTER
 from Modules.App.AppBase import AppBase
 from Vision.ColorObjectIdentifier import ColorObjectIdentifier
 from kivy.properties import StringProperty, Clock, NumericProperty, Property, ObjectProperty, BooleanProperty
@@ -70,7 +70,7 @@ class Test(TabbedPanel):
         self.controller = controller
         self.vision = vision
 
-        img = self.hal.get_arm_cam_img_hsv()
+        img = self.hal.capture_image()
         dframe, dmask = self.controller.get_frame_mask()
         w, h, _ = img.shape
         texture = Texture.create(size=(h, w))
@@ -127,7 +127,7 @@ class Test(TabbedPanel):
             if self.controller_start == False:
                 self.controller.start()
                 self.controller_start=True
-            img = cv2.resize(self.hal.get_arm_cam_img_hsv(), (0,0), fx=0.25, fy=0.25) 
+            img = self.hal.capture_image_level(PYRAMID_QUARTER)
             w, h, _ = img.shape
             texture = Texture.create(size=(h, w))
             texture2 = Texture.create(size=(h, w))
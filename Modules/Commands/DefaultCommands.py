@@ -1,4 +1,6 @@
 from Controllers.Controller import Controller
+from HALs.HAL_base import HAL_base
+from Vision.VisualObjectIdentifier import VisualObjectIdentifier
 from typing import Callable
 
 import Modules.Commands.Commands as Commands
@@ -42,3 +44,38 @@ def register_controler_commands(commands_instance: Commands, new_controller_gett
     commands_instance.add_command("get_visible_objects", get_visible_objects, "Returns a list of IDs of objects that are visible to the arm")
     commands_instance.add_command("get_visible_objects_detailed", get_visible_objects_detailed, "Returns a list of IDs of objects that are visible to the arm, along with extra information")
     commands_instance.add_command("set_look_at_target_label", set_look_at_target_label, "Makes the arm look at the largest object with the specified label, will return false if the arm cannot perceive any objects with that label")
+
+    
+def register_vision_commands(commands_instance: Commands, new_vision_getter: Callable[[None], VisualObjectIdentifier]) -> None:
+    def vision_stats(args: str) -> None:
+        metrics = new_vision_getter().get_tracking_metrics()
+        print(f"full frames: {metrics['full_frames']} ({metrics['full_pixels']} pixels), tracking ROIs: {metrics['roi_frames']} "
+              f"({metrics['roi_pixels']} pixels), target lost: {metrics['lost']}, {metrics['pixels_per_frame']:.0f} pixels per frame, "
+              f"{metrics['processed_fraction'] * 100:.1f}% of the pixels processing every whole frame would cost")
+
+    commands_instance.add_command("vision_stats", vision_stats, "Shows how many pixels the vision processed as whole frames and as tracking ROIs")
+
+def register_hal_commands(commands_instance: Commands, new_hal_getter: Callable[[None], HAL_base]) -> None:
+    def lock_stats(args: str) -> None:
+        all_lock_stats = new_hal_getter().get_lock_wait_stats()
+        if not all_lock_stats:
+            print("This HAL does not record lock stats")
+        for lock_name, stats in all_lock_stats.items():
+            print(f"{lock_name} lock: {stats['acquires']} acquires, mean wait {stats['mean_wait_ms']:.3f} ms, "
+                  f"max wait {stats['max_wait_ms']:.3f} ms, total wait {stats['total_wait_ms']:.1f} ms, held {stats['total_held_ms']:.1f} ms")
+
+    def gripper(args: str) -> None:
+        action = args.strip().lower()
+        if action == "open":
+            future = new_hal_getter().gripper_open_async()
+        elif action == "close":
+            future = new_hal_getter().gripper_close_async()
+        else:
+            print("Usage: gripper open|close")
+            return
+        # the console stays usable while the gripper moves
+        future.add_done_callback(lambda done: print(f"Gripper {action}: {'done' if done.exception() is None and done.result() else 'no change or failed'}"))
+
+    # Register HAL commands
+    commands_instance.add_command("lock_stats", lock_stats, "Shows how long the HAL's joint and camera channels waited on their locks")
+    commands_instance.add_command("gripper", gripper, "Opens or closes the gripper without waiting for it to finish: gripper open|close")
@@ -1,6 +1,9 @@
+import asyncio
 import threading
-from typing import Dict
-from fastapi import FastAPI, HTTPException, Request
+import time
+from typing import Dict, List, Optional
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse, HTMLResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
@@ -11,16 +14,27 @@ import numpy as np
 
 from Controllers.Controller import Controller
 from HALs.HAL_base import HAL_base
+from HALs.frame_pyramid import PYRAMID_FULL, PYRAMID_LEVEL_COUNT
+from HALs.http_remote import control_protocol
+from HALs.http_remote.control_protocol import ProtocolError
 from Modules.server.ServerBase import ServerBase
 from Vision.ColorObjectIdentifier import ColorObjectIdentifier
 from Config.ArmRuntime import ArmRuntime
 
+# telemetry rate limit for /ws/control subscribers, and how often an idle subscription checks for a new rate
+MAX_TELEMETRY_RATE_HZ = 200
+TELEMETRY_IDLE_SECONDS = 0.05
+
 class HTTPServer(ServerBase):
 
     class JointRequest(BaseModel):
         joint_index: int
         joint_angle: float
 
+    class JointsRequest(BaseModel):
+        joint_angles: List[float]
+        mask: Optional[List[bool]] = None
+
     def __init__(self, runtime: ArmRuntime, host_port: int):
         super().__init__()
         self.controller: Controller = runtime.selected_controller
@@ -39,13 +53,17 @@ class HTTPServer(ServerBase):
         self.app.get("/", response_class=HTMLResponse)(self.home_page)
         self.app.post("/set_joint")(self.set_joint)
         self.app.get("/get_joint")(self.get_joint)
+        self.app.post("/set_joints")(self.set_joints)
+        self.app.get("/get_joints")(self.get_joints)
         self.app.get("/joint_count")(self.joint_count)
         self.app.get("/get_arm_cam_img_rgb")(self.get_arm_cam_img_rgb)
         self.app.get("/get_arm_cam_stream")(self.get_arm_cam_stream)
         self.app.get("/get_camera_focal_length")(self.get_camera_focal_length)
+        self.app.get("/get_camera_intrinsics")(self.get_camera_intrinsics)
         self.app.post("/gripper_open")(self.gripper_open)
         self.app.post("/gripper_close")(self.gripper_close)
         self.app.get("/status_string")(self.get_status_string)
+        self.app.websocket("/ws/control")(self.ws_control)
     
     def home_page(self, request: Request):
         return self.templates.TemplateResponse("index.html", {"request": request})
@@ -57,11 +75,27 @@ class HTTPServer(ServerBase):
         return {"success": True}
     
     def get_joint(self, joint_index: int):
-        angle = self.selected_HAL.get_joint(joint_index)
+        try:
+            # served from the HAL's joint state cache when it is enabled
+            angle = self.selected_HAL.get_joint_cached(joint_index)
+        except IndexError:
+            angle = None
         if angle is None:
             raise HTTPException(status_code=400, detail="Invalid joint index")
         return {"joint_angle": angle}
     
+    def set_joints(self, request: JointsRequest):
+        try:
+            success = self.selected_HAL.set_joints(request.joint_angles, request.mask)
+        except ValueError as err:
+            raise HTTPException(status_code=400, detail=str(err))
+        if not success:
+            raise HTTPException(status_code=400, detail="Invalid joint index")
+        return {"success": True}
+    
+    def get_joints(self):
+        return {"joint_angles": [float(angle) for angle in self.selected_HAL.get_joints()]}
+    
     def joint_count(self):
         return {"joint_count": self.selected_HAL.joint_count()}
     
@@ -69,7 +103,7 @@ class HTTPServer(ServerBase):
         # img = np.zeros((480, 640, 3), dtype=np.uint8)
         # img = cv2.putText(img, 'Camera Feed', (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2, cv2.LINE_AA)
         
-        rgb_image = self.selected_HAL.get_arm_cam_img_rgb()
+        rgb_image = self.selected_HAL.capture_image()
         
         # Convert the HSV image to BGR for JPEG encoding
         bgr_image = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
@@ -82,12 +116,20 @@ class HTTPServer(ServerBase):
         img_base64 = self.get_camera_image()
         return {"image": img_base64}
     
-    def generate_mjpeg(self):
+    def generate_mjpeg(self, level: int = PYRAMID_FULL):
+        last_sequence = 0
         while self.keep_running:
             # img = np.zeros((480, 640, 3), dtype=np.uint8)
             # img = cv2.putText(img, 'Camera Stream', (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2, cv2.LINE_AA)
             
-            rgb_image = self.selected_HAL.get_arm_cam_img_rgb()
+            # with the frame grabber running this waits for a new frame instead of re-encoding the same one
+            last_sequence, pyramid = self.selected_HAL.wait_for_next_pyramid(last_sequence, timeout=1.0)
+            if pyramid is None:
+                # without a frame grabber the wait returns right away, don't spin on it
+                time.sleep(0.01)
+                continue
+            # shared with vision, a level someone already asked for this frame costs nothing
+            rgb_image = pyramid.get_level(level)
         
             # Convert the HSV image to BGR for JPEG encoding
             bgr_image = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
@@ -96,14 +138,21 @@ class HTTPServer(ServerBase):
             ret, jpeg_image = cv2.imencode('.jpg', bgr_image)
             
             frame = jpeg_image.tobytes()
-            yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+            # Content-Length lets clients slice the frame out without scanning it for the end marker
+            yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n' b'Content-Length: ' + str(len(frame)).encode() + b'\r\n\r\n' + frame + b'\r\n')
     
-    def get_arm_cam_stream(self):
-        return StreamingResponse(self.generate_mjpeg(), media_type="multipart/x-mixed-replace; boundary=frame")
+    def get_arm_cam_stream(self, level: int = PYRAMID_FULL):
+        if level < 0 or level >= PYRAMID_LEVEL_COUNT:
+            raise HTTPException(status_code=400, detail=f"level must be between 0 and {PYRAMID_LEVEL_COUNT - 1}")
+        return StreamingResponse(self.generate_mjpeg(level), media_type="multipart/x-mixed-replace; boundary=frame")
     
     def get_camera_focal_length(self):
         return {"focal_length": self.selected_HAL.get_camera_focal_length()}
     
+    def get_camera_intrinsics(self):
+        camera_intrinsics = self.selected_HAL.get_camera_intrinsics()
+        return {"camera_intrinsics": None if camera_intrinsics is None else camera_intrinsics.to_dict()}
+    
     def gripper_open(self):
         return {"success": self.selected_HAL.gripper_open()}
     
@@ -118,6 +167,100 @@ class HTTPServer(ServerBase):
             status_string += "Object Identifier: " + self.objectIdentifier.__class__.__name__ + "\n"
         return {"status_string": status_string}
     
+    # control WebSocket - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # batched joint targets in, joint state and detection telemetry out, binary messages from control_protocol
+    
+    async def ws_control(self, websocket: WebSocket):
+        await websocket.accept()
+        # the receive loop and the telemetry task both send
+        send_lock = asyncio.Lock()
+        telemetry = {"rate_hz": 0, "flags": 0}
+        telemetry_task = asyncio.create_task(self._ws_telemetry_loop(websocket, send_lock, telemetry))
+        try:
+            while self.keep_running:
+                # receive_bytes would raise on a text frame and drop the connection, answer it with an error instead
+                received = await websocket.receive()
+                if received["type"] == "websocket.disconnect":
+                    break
+                message = received.get("bytes")
+                if message is None:
+                    reply = control_protocol.encode_error(0, "control messages are binary, got a text frame")
+                else:
+                    # messages are handled one at a time, in order, so pipelined targets for a joint are applied in the order sent
+                    reply = await run_in_threadpool(self._handle_control_message, message, telemetry)
+                if reply is not None:
+                    async with send_lock:
+                        await websocket.send_bytes(reply)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            telemetry_task.cancel()
+    
+    def _handle_control_message(self, message: bytes, telemetry: Dict[str, int]) -> Optional[bytes]:
+        """Runs on the thread pool since the HAL calls block, returns the reply to send if there is one."""
+        seq = 0
+        try:
+            message_type = control_protocol.message_type(message)
+            if message_type == control_protocol.MSG_SET_JOINTS:
+                seq, targets = control_protocol.decode_set_joints(message)
+                if len(targets) == 0:
+                    return control_protocol.encode_ack(seq, True)
+                joint_angles = [0.0] * (max(targets.keys()) + 1)
+                mask = [False] * len(joint_angles)
+                for joint_index, joint_angle in targets.items():
+                    joint_angles[joint_index] = joint_angle
+                    mask[joint_index] = True
+                return control_protocol.encode_ack(seq, self.selected_HAL.set_joints(joint_angles, mask))
+            if message_type == control_protocol.MSG_GET_JOINTS:
+                seq = control_protocol.decode_get_joints(message)
+                # served from the HAL's joint state cache when it is enabled
+                joint_state = self.selected_HAL.get_joint_state()
+                return control_protocol.encode_joint_state(seq, time.time(), joint_state.angles)
+            if message_type == control_protocol.MSG_SUBSCRIBE:
+                rate_hz, flags = control_protocol.decode_subscribe(message)
+                telemetry["rate_hz"] = min(rate_hz, MAX_TELEMETRY_RATE_HZ)
+                telemetry["flags"] = flags
+                return None
+            return control_protocol.encode_error(seq, f"unknown message type {message_type}")
+        except ProtocolError as err:
+            return control_protocol.encode_error(seq, str(err))
+        except Exception as err:
+            print(f"Exception handling a control message: {err=}, {type(err)=}")
+            return control_protocol.encode_error(seq, str(err))
+    
+    async def _ws_telemetry_loop(self, websocket: WebSocket, send_lock: asyncio.Lock, telemetry: Dict[str, int]):
+        last_objects = None
+        next_send = time.monotonic()
+        try:
+            while self.keep_running:
+                rate_hz = telemetry["rate_hz"]
+                if rate_hz <= 0:
+                    await asyncio.sleep(TELEMETRY_IDLE_SECONDS)
+                    next_send = time.monotonic()
+                    continue
+                flags = telemetry["flags"]
+                messages = []
+                if flags & control_protocol.TELEMETRY_JOINTS:
+                    joint_state = await run_in_threadpool(self.selected_HAL.get_joint_state)
+                    messages.append(control_protocol.encode_joint_state(0, time.time(), joint_state.angles))
+                if flags & control_protocol.TELEMETRY_DETECTIONS and self.controller is not None:
+                    # controllers hand out a new list each frame, only send it when there is a new one
+                    objects = self.controller.get_visible_objects()
+                    if objects is not last_objects:
+                        last_objects = objects
+                        frame_width, frame_height = (objects[0].frame_width, objects[0].frame_height) if len(objects) > 0 else (0, 0)
+                        messages.append(control_protocol.encode_detections(time.time(), frame_width, frame_height, objects))
+                async with send_lock:
+                    for message in messages:
+                        await websocket.send_bytes(message)
+                next_send = max(next_send + 1.0 / rate_hz, time.monotonic() - 1.0 / rate_hz)
+                await asyncio.sleep(max(next_send - time.monotonic(), 0))
+        except (WebSocketDisconnect, RuntimeError):
+            # the client went away, the receive loop cleans up
+            pass
+        except Exception as err:
+            print(f"Exception sending control telemetry: {err=}, {type(err)=}")
+    
     def start_server(self, print_local_ip_address: bool = True) -> bool:
         
         self.keep_running = True
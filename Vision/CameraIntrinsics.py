@@ -0,0 +1,73 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+class CameraIntrinsics():
+    """ Pinhole camera intrinsics in pixels for one resolution. HALs compute these once and cache them. """
+
+    fx: float = 0
+    fy: float = 0
+
+    cx: float = 0
+    cy: float = 0
+
+    # (width, height) in pixels the other values are for
+    resolution: Tuple[int, int] = (0, 0)
+
+    # OpenCV order: k1, k2, p1, p2, k3
+    distortion: List[float] = [0.0, 0.0, 0.0, 0.0, 0.0]
+
+    def __init__(self, fx: float, fy: float, cx: float, cy: float, resolution: Tuple[int, int], distortion: List[float] = None) -> None:
+        self.fx = float(fx)
+        self.fy = float(fy)
+        self.cx = float(cx)
+        self.cy = float(cy)
+        self.resolution = (int(resolution[0]), int(resolution[1]))
+        self.distortion = [0.0, 0.0, 0.0, 0.0, 0.0] if distortion is None else [float(d) for d in distortion]
+
+    @staticmethod
+    def from_horizontal_fov(width: int, height: int, horizontal_fov_degrees: float) -> "CameraIntrinsics":
+        """ Intrinsics for an undistorted camera with square pixels and the principal point in the center. """
+        focal_length = width / (2 * math.tan(math.radians(horizontal_fov_degrees) / 2))
+        return CameraIntrinsics(focal_length, focal_length, width / 2, height / 2, (width, height))
+
+    @staticmethod
+    def from_dict(values: dict) -> "CameraIntrinsics":
+        return CameraIntrinsics(values["fx"], values["fy"], values["cx"], values["cy"], values["resolution"], values.get("distortion"))
+
+    def to_dict(self) -> dict:
+        return {
+            "fx": self.fx,
+            "fy": self.fy,
+            "cx": self.cx,
+            "cy": self.cy,
+            "resolution": list(self.resolution),
+            "distortion": list(self.distortion),
+        }
+
+    def matches_resolution(self, width: int, height: int) -> bool:
+        return self.resolution[0] == width and self.resolution[1] == height
+
+    def focal_length_for_width(self, frame_width: int) -> float:
+        """ fx for a frame scaled to frame_width, ex: vision running on a downscaled frame. """
+        if self.resolution[0] == 0:
+            return self.fx
+        return self.fx * frame_width / self.resolution[0]
+
+    def scaled_to(self, width: int, height: int) -> "CameraIntrinsics":
+        """ The same camera resized to width x height. """
+        scale_x = width / self.resolution[0]
+        scale_y = height / self.resolution[1]
+        return CameraIntrinsics(self.fx * scale_x, self.fy * scale_y, self.cx * scale_x, self.cy * scale_y, (width, height), self.distortion)
+
+    def camera_matrix(self) -> np.ndarray:
+        """ The 3x3 K matrix OpenCV expects. """
+        return np.array([
+            [self.fx, 0, self.cx],
+            [0, self.fy, self.cy],
+            [0, 0, 1],
+        ], dtype=float)
+
+    def __repr__(self) -> str:
+        return f"CameraIntrinsics(fx={self.fx:.2f}, fy={self.fy:.2f}, cx={self.cx:.1f}, cy={self.cy:.1f}, resolution={self.resolution})"
@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Tuple
+
+# label 0 is every pixel outside all the color ranges
+NO_LABEL = 0
+# up to this many components each one is looked at in its bounding box, beyond it one whole frame pass is cheaper
+BBOX_MEAN_MAX_COMPONENTS = 64
+
+class ColorLabeler:
+    """
+    Turns an HSV frame into a label image in one pass: per channel lookup tables map every pixel to the index of the
+    color range it falls in (label 1 is the first range, 0 is none). Pixels in more than one range get the first one.
+    Then find_components splits the label image into connected objects with a single connectedComponentsWithStats call,
+    instead of thresholding, closing and finding contours once per color.
+    """
+
+    def __init__(self, color_ranges: Dict[str, Tuple[tuple, tuple]]):
+        """
+        Args:
+            color_ranges: {name: [(h, s, v) lower, (h, s, v) upper]} with inclusive bounds, same as ColorObjectIdentifier.COLOR_RANGES.
+        """
+        if len(color_ranges) > 255:
+            raise ValueError(f"{len(color_ranges)} color ranges don't fit in an 8 bit label image")
+        self.label_names: List[str] = ["None"] + list(color_ranges.keys())
+
+        # ranges sharing saturation and value bounds share one hue table, usually that is all of them
+        tables: Dict[tuple, np.ndarray] = {}
+        channel_values = np.arange(256)
+        for label, (lower, upper) in enumerate(color_ranges.values(), start=1):
+            hue_table = tables.setdefault((lower[1], upper[1], lower[2], upper[2]), np.zeros(256, dtype=np.uint8))
+            hue_table[(channel_values >= lower[0]) & (channel_values <= upper[0]) & (hue_table == NO_LABEL)] = label
+        self.lookup_tables = []
+        for (sat_low, sat_high, val_low, val_high), hue_table in tables.items():
+            sat_table = np.where((channel_values >= sat_low) & (channel_values <= sat_high), 255, 0).astype(np.uint8)
+            val_table = np.where((channel_values >= val_low) & (channel_values <= val_high), 255, 0).astype(np.uint8)
+            self.lookup_tables.append((hue_table, sat_table, val_table))
+
+        self.close_kernel = np.ones((3, 3), np.uint8)
+
+    def label_image(self, image_hsv: cv2.typing.MatLike) -> np.ndarray:
+        """ A uint8 image the size of image_hsv holding each pixel's color range label, 0 outside every range. """
+        hue, sat, val = cv2.split(image_hsv)
+        labels = None
+        for hue_table, sat_table, val_table in self.lookup_tables:
+            in_bounds = cv2.bitwise_and(cv2.LUT(sat, sat_table), cv2.LUT(val, val_table))
+            group_labels = cv2.bitwise_and(cv2.LUT(hue, hue_table), in_bounds)
+            if labels is None:
+                labels = group_labels
+            else:
+                # another group's range listed earlier (lower label) wins the overlap
+                np.copyto(labels, group_labels, where=(group_labels != NO_LABEL) & ((labels == NO_LABEL) | (group_labels < labels)))
+        return labels
+
+    def find_components(self, labels: np.ndarray) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Closes small gaps in the label image and finds its 8-connected objects, touching objects of different colors stay apart.
+        Returns (count, components, stats, component_labels): components is the int32 image of component indices (0 is background),
+        stats is connectedComponentsWithStats' [left, top, width, height, area] per component and component_labels each one's color label.
+        """
+        # on one color this is that color's binary close, same as the per color path
+        labels = cv2.morphologyEx(labels, cv2.MORPH_CLOSE, self.close_kernel)
+        # where two colors touch, drop the lower label's edge pixels so connectivity can't cross from one color to the other
+        touches_higher_label = cv2.compare(cv2.dilate(labels, self.close_kernel), labels, cv2.CMP_GT)
+        labels = cv2.bitwise_and(labels, cv2.bitwise_not(touches_higher_label))
+
+        count, components, stats, _ = cv2.connectedComponentsWithStats(labels, connectivity=8, ltype=cv2.CV_32S)
+        component_labels = np.zeros(count, dtype=np.uint8)
+        if count > BBOX_MEAN_MAX_COMPONENTS:
+            # a component never spans two colors, so scattering every pixel's label to its component leaves the right one
+            component_labels[components.ravel()] = labels.ravel()
+            component_labels[0] = NO_LABEL
+            return count, components, stats, component_labels
+        for index in range(1, count):
+            # components are numbered in raster order, so the first row of the bbox holds the component's first pixel
+            left, top, width = stats[index, cv2.CC_STAT_LEFT], stats[index, cv2.CC_STAT_TOP], stats[index, cv2.CC_STAT_WIDTH]
+            first_pixel = left + int(np.argmax(components[top, left:left + width] == index))
+            component_labels[index] = labels[top, first_pixel]
+        return count, components, stats, component_labels
+
+    @staticmethod
+    def component_means(image: cv2.typing.MatLike, components: np.ndarray, stats: np.ndarray, indices: List[int] = None) -> np.ndarray:
+        """
+        Every component's mean pixel of image (ex: the HSV frame) as a (count, channels) float array, row 0 is the background's (zeros).
+        Given indices, only those rows are needed: the other rows may be left zero.
+        No full frame mask is made per component: a few (indices) components are each averaged over their bounding box, many (noise)
+        are averaged together with one bincount per channel over the labeled pixels, so the cost never grows with
+        pixel count times component count.
+        """
+        count = stats.shape[0]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        means = np.zeros((count, channels))
+        if indices is None:
+            indices = range(1, count)
+        if len(indices) <= BBOX_MEAN_MAX_COMPONENTS:
+            boxes = stats[:, :4].tolist()
+            for index in indices:
+                x, y, w, h = boxes[index]
+                means[index] = cv2.mean(image[y:y + h, x:x + w], mask=(components[y:y + h, x:x + w] == index).view(np.uint8))[:channels]
+            return means
+        flat_components = components.ravel()
+        labeled = np.flatnonzero(flat_components)
+        pixel_components = flat_components[labeled]
+        pixels = image.reshape(flat_components.shape[0], channels)[labeled].astype(np.float64)
+        for channel in range(channels):
+            means[:, channel] = np.bincount(pixel_components, weights=pixels[:, channel], minlength=count)
+        return means / np.maximum(stats[:, cv2.CC_STAT_AREA], 1)[:, None]
@@ -2,7 +2,8 @@ import cv2
 import numpy as np
 from typing import List
 
-from Vision.VisionObject import VisionObject
+from Vision.ColorLabeler import ColorLabeler
+from Vision.VisionObject import VisionFrame, VisionObject
 from Vision.VisualObjectIdentifier import VisualObjectIdentifier
 
 FIXED_OBJECT_WIDTH = 3.93701  # 10 cm in inches (default size of spheres in copilia sim)
@@ -36,6 +37,10 @@ COLOR_MAP = {
     "Unknown": (128, 128, 128)  # Default for any unknown color
 }
 
+def range_object_label(range_name: str) -> str:
+    """ The object label for a COLOR_RANGES entry, ex: "Red2" -> "Red object". """
+    return f"{range_name.rstrip('0123456789')} object"
+
 def visualize_contours(image, objects):
     # Copy the original image to avoid modifying it directly
     output_image = image.copy()
@@ -66,8 +71,23 @@ def visualize_contours(image, objects):
     return output_image
 
 class ColorObjectIdentifier(VisualObjectIdentifier):
-    def __init__(self):
-        pass
+    def __init__(self, single_pass: bool = False, min_area: float = 0, max_objects: int = 0, max_per_label: int = 0):
+        """
+        Args:
+            single_pass: Label every color at once with lookup tables and one connected components pass (see ColorLabeler),
+                instead of thresholding, closing and finding contours once per entry of COLOR_RANGES.
+            min_area: Drop objects smaller than this many pixels (noise speckles) before any per object work.
+            max_objects: Keep only this many objects, largest first, 0 for no limit.
+            max_per_label: Keep only this many objects of each color, largest first, 0 for no limit.
+                The color is the range the object was found in, the label can still change with its mean color.
+        """
+        self.single_pass = single_pass
+        self.color_labeler = ColorLabeler(COLOR_RANGES) if single_pass else None
+        self.min_area = min_area
+        self.max_objects = max_objects
+        self.max_per_label = max_per_label
+        # object label of each ColorLabeler label, Red and Red2 share one so they share one per label limit
+        self.range_object_labels = np.array(["None object"] + [range_object_label(name) for name in COLOR_RANGES])
     
     def identify_shape(self, contour) -> str:
         # Approximate the contour to reduce vertices, useful for shape recognition
@@ -94,14 +114,15 @@ class ColorObjectIdentifier(VisualObjectIdentifier):
             return "Circle"
 
     def identify_color(self, image_hsv, contour) -> str:
-        # Create a mask for the object
-        mask = np.zeros(image_hsv.shape[:2], dtype="uint8")
-        cv2.drawContours(mask, [contour], -1, 255, -1)
+        # Create a mask for the object, only as big as its bounding box
+        x, y, w, h = cv2.boundingRect(contour)
+        mask = np.zeros((h, w), dtype="uint8")
+        cv2.drawContours(mask, [contour], -1, 255, -1, offset=(-x, -y))
         
         # Compute the mean color of the masked region
-        mean_color_hsv = cv2.mean(image_hsv, mask=mask)[:3]
-        hue, sat, val = mean_color_hsv
+        return self.color_from_hsv(*cv2.mean(image_hsv[y:y + h, x:x + w], mask=mask)[:3])
 
+    def color_from_hsv(self, hue: float, sat: float, val: float) -> str:
         # Refined color boundaries in HSV space with more colors
         if sat < 30:
             # Very low saturation indicates shades of gray/black/white
@@ -170,40 +191,43 @@ class ColorObjectIdentifier(VisualObjectIdentifier):
         
         image_hsv = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2HSV)
         
-        image_height: int = image_hsv.shape[0]
-        image_width: int = image_hsv.shape[1]
+        if self.single_pass:
+            return self.extract_objects_single_pass(image_rgb, image_hsv)
         
         contours_by_color = self.separate_objects_by_color(image_hsv)
+        
+        focal_length = self.focal_length_for_frame(image_hsv.shape[1])
 
-        objects = []
-        for color, (contours, mask) in contours_by_color.items():
+        candidates = []
+        for range_name, (contours, _) in contours_by_color.items():
+            label = range_object_label(range_name)
             for contour in contours:
-                # Process each contour for the detected color
-                # cv2.drawContours(image, [contour], -1, (255, 255, 255), 2)  # Example: Draw in white for visibility
-                # print(f"Detected {color} object with contour area: {cv2.contourArea(contour)}")
-                
-                shape = self.identify_shape(contour)
-                color = self.identify_color(image_hsv, contour)
-                    
-                #find the largest contour and create its bounding box
-                (center_x, center_y), radius = cv2.minEnclosingCircle(contour)
-                center = (int(center_x), int(center_y))
-                radius = int(radius)
-                # Calculate the bounding box for each object
-                x, y, w, h = cv2.boundingRect(contour)
-                    
-                distance_from_camera_inches = self.calculate_distance_to_object(1, FIXED_OBJECT_WIDTH, w)
-                    
-                object_name: str = f"{color} object"
-                new_object = VisionObject(object_name, image_height, image_width, x, y, w, h, radius, image_rgb, mask)
-                new_object.set_metadata("radius", radius)
-                new_object.set_metadata("shape", shape)
-                new_object.set_metadata("color", color)
-                new_object.set_metadata("center", center)
-                new_object.set_metadata("contour", contour)
-                new_object.set_metadata("distance_inches", distance_from_camera_inches)
-                
-                objects.append(new_object)
+                candidates.append((contour, label))
+
+        if self.has_object_limits():
+            # cheap enough for every speckle, the per object work below is not
+            areas = np.array([cv2.contourArea(contour) for contour, _ in candidates])
+            kept = self.select_objects(areas, [label for _, label in candidates])
+        else:
+            kept = range(len(candidates))
+
+        # the objects share one mask of every color instead of holding their color's
+        mask = None
+        for _, color_mask in contours_by_color.values():
+            mask = color_mask.copy() if mask is None else cv2.bitwise_or(mask, color_mask, dst=mask)
+        frame = VisionFrame(image_rgb, mask)
+
+        objects = []
+        for index in kept:
+            contour, _ = candidates[index]
+            # Process each contour for the detected color
+            # cv2.drawContours(image, [contour], -1, (255, 255, 255), 2)  # Example: Draw in white for visibility
+            # print(f"Detected {color} object with contour area: {cv2.contourArea(contour)}")
+            
+            color = self.identify_color(image_hsv, contour)
+            # Calculate the bounding box for each object
+            x, y, w, h = cv2.boundingRect(contour)
+            objects.append(self.make_object(frame, contour, color, x, y, w, h, focal_length))
                 
         # visualized_objects_img = visualize_contours(image_hsv, objects)
         # cv2.imshow('Region', cv2.flip(visualized_objects_img, 0))        
@@ -211,6 +235,92 @@ class ColorObjectIdentifier(VisualObjectIdentifier):
         
         return objects        
 
+    def extract_objects_single_pass(self, image_rgb: cv2.typing.MatLike, image_hsv: cv2.typing.MatLike) -> List[VisionObject]:
+        """ extract_objects with one label image for every color, each object's work only touches its bounding box. """
+        labels = self.color_labeler.label_image(image_hsv)
+        count, components, stats, component_labels = self.color_labeler.find_components(labels)
+        
+        if self.has_object_limits():
+            # the component areas come free with the stats, filter before any contour or mean is computed
+            kept = [index + 1 for index in self.select_objects(stats[1:, cv2.CC_STAT_AREA], self.range_object_labels[component_labels[1:]])]
+        else:
+            kept = list(range(1, count))
+
+        focal_length = self.focal_length_for_frame(image_hsv.shape[1])
+        # one mask of every labeled pixel, shared by all the objects instead of one mask per color
+        frame = VisionFrame(image_rgb, cv2.compare(labels, 0, cv2.CMP_GT))
+        # the kept objects' mean colors at once
+        mean_colors_hsv = self.color_labeler.component_means(image_hsv, components, stats, kept)
+
+        objects = []
+        # plain ints, indexing numpy per object adds up with hundreds of objects
+        boxes = stats[:, :4].tolist()
+        for index in kept:
+            x, y, w, h = boxes[index]
+            # 0/1 mask of just this component, the bool array reinterpreted in place
+            object_mask = (components[y:y + h, x:x + w] == index).view(np.uint8)
+            contours, _ = cv2.findContours(object_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x, y))
+            if len(contours) == 0:
+                continue
+            contour = max(contours, key=cv2.contourArea)
+            color = self.color_from_hsv(*mean_colors_hsv[index])
+            objects.append(self.make_object(frame, contour, color, x, y, w, h, focal_length))
+        return objects
+
+    def has_object_limits(self) -> bool:
+        return self.min_area > 0 or self.max_objects > 0 or self.max_per_label > 0
+
+    def select_objects(self, areas: np.ndarray, labels) -> List[int]:
+        """
+        Indices of the candidate objects that pass min_area, max_per_label and max_objects, given each one's area and label.
+        With a count limit the indices come largest first, otherwise in their original order.
+        """
+        candidates = np.flatnonzero(np.asarray(areas) >= self.min_area)
+        if self.max_objects <= 0 and self.max_per_label <= 0:
+            return candidates.tolist()
+        # stable, so equal areas keep their original order
+        candidates = candidates[np.argsort(-np.asarray(areas)[candidates], kind="stable")]
+        if self.max_per_label <= 0:
+            return candidates[:self.max_objects].tolist()
+
+        kept = []
+        label_counts = {}
+        for index in candidates.tolist():
+            label = labels[index]
+            if label_counts.get(label, 0) >= self.max_per_label:
+                continue
+            label_counts[label] = label_counts.get(label, 0) + 1
+            kept.append(index)
+            if len(kept) == self.max_objects:
+                break
+        return kept
+
+    def focal_length_for_frame(self, image_width: int) -> float:
+        # the intrinsics may be for a different resolution than the frame we were given, ex: a downscaled frame
+        if self.camera_intrinsics is None:
+            return 1
+        if self.roi_source_frame_width is not None:
+            # a tracking ROI is a crop, not a smaller frame
+            image_width = self.roi_source_frame_width
+        return self.camera_intrinsics.focal_length_for_width(image_width)
+
+    def make_object(self, frame: VisionFrame, contour, color: str, x: int, y: int, w: int, h: int, focal_length: float) -> VisionObject:
+        shape = self.identify_shape(contour)
+            
+        #find the largest contour and create its bounding box
+        _, radius = cv2.minEnclosingCircle(contour)
+        radius = int(radius)
+            
+        distance_from_camera_inches = self.calculate_distance_to_object(focal_length, FIXED_OBJECT_WIDTH, w)
+            
+        object_name: str = f"{color} object"
+        # center and contour aren't kept, the object works them out from its box and the frame's mask when asked
+        new_object = VisionObject(object_name, frame, x, y, w, h, radius)
+        new_object.set_metadata("shape", shape)
+        new_object.set_metadata("color", color)
+        new_object.set_metadata("distance_inches", distance_from_camera_inches)
+        return new_object
+
     def process_frame(self, image_rgb: cv2.typing.MatLike) -> List[VisionObject]:
         return self.extract_objects(image_rgb)
     
@@ -2,7 +2,7 @@ import cv2
 import numpy as np
 from typing import List
 
-from Vision.VisionObject import VisionObject
+from Vision.VisionObject import VisionFrame, VisionObject
 from Vision.VisualObjectIdentifier import VisualObjectIdentifier
 
 class ColorObjectIdentifier(VisualObjectIdentifier):
@@ -26,9 +26,6 @@ class ColorObjectIdentifier(VisualObjectIdentifier):
         
         image_hsv = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2HSV)
         
-        image_height: int = image_hsv.shape[0]
-        image_width: int = image_hsv.shape[1]
-        
         #simulation
         mask = cv2.inRange(image_hsv, self.color_lower_bound, self.color_upper_bound)
 
@@ -47,9 +44,7 @@ class ColorObjectIdentifier(VisualObjectIdentifier):
             # Calculate the bounding box for each object
             x, y, w, h = cv2.boundingRect(contour)
                 
-            new_object = VisionObject("blue_object", image_height, image_width, x, y, w, h, radius, image_rgb, mask)
-            new_object.set_metadata("radius", radius)
-            new_object.set_metadata("mask", mask)
+            new_object = VisionObject("blue_object", VisionFrame(image_rgb, mask), x, y, w, h, radius)
             return [new_object]                
         else:
             return []
@@ -1,54 +1,153 @@
+import sys
+
 import cv2
+import numpy as np
+
+class VisionFrame():
+    """
+    The frame an identifier processed and its detection mask, one per frame and shared by every VisionObject found in it,
+    so a list of detections keeps one frame and one mask alive instead of holding them per object.
+    The mask can be smaller than the frame (ex: a tracking ROI), mask_offset_x/y is where its top left corner is in the frame.
+    """
+    __slots__ = ("image_rgb", "mask", "width", "height", "mask_offset_x", "mask_offset_y")
+
+    def __init__(self, image_rgb: cv2.typing.MatLike, mask: cv2.typing.MatLike = None, mask_offset_x: int = 0, mask_offset_y: int = 0) -> None:
+        self.image_rgb = image_rgb
+        self.mask = mask
+        self.height, self.width = image_rgb.shape[:2]
+        self.mask_offset_x = mask_offset_x
+        self.mask_offset_y = mask_offset_y
+
+    def translated(self, offset_x: int, offset_y: int, image_rgb: cv2.typing.MatLike) -> "VisionFrame":
+        """ The handle for image_rgb, the frame this one's image was cropped from at offset. The mask stays this one's. """
+        return VisionFrame(image_rgb, self.mask, self.mask_offset_x + offset_x, self.mask_offset_y + offset_y)
 
 class VisionObject():
-    frame_height: int = 0
-    frame_width: int = 0
-    
-    label : str = "unknown"
-    
-    top_left_x : int = 0
-    top_left_y : int = 0
-    
-    width : int = 0
-    height : int = 0
-    
-    source_frame_rgb: cv2.typing.MatLike = None
-    
-    mask: cv2.typing.MatLike = None
-    
-    def __init__(self, label : str, frame_height: int, frame_width: int, top_left_x : int, top_left_y :int, width: int, height: int, radius: float, source_frame_rgb: cv2.typing.MatLike = None, mask: cv2.typing.MatLike = None) -> None:
-        self.frame_height = frame_height
-        self.frame_width = frame_width
-        self.label = label
+    """
+    One detection in a few hundred bytes: fixed fields for the box and the metadata every identifier sets, the frame and mask
+    through the shared VisionFrame, and center, area, contour and mask crop worked out when asked for instead of stored.
+    """
+    # metadata kept in fields, any other key goes in extra_metadata, a dict made on first use
+    FIELD_METADATA = ("radius", "shape", "color", "distance_inches")
+    # metadata worked out from the box and the frame's mask
+    DERIVED_METADATA = ("center", "area", "contour", "mask")
+
+    __slots__ = ("label", "top_left_x", "top_left_y", "width", "height", "radius", "shape", "color", "distance_inches",
+                 "frame", "extra_metadata", "_contour")
+
+    def __init__(self, label : str, frame: VisionFrame, top_left_x : int, top_left_y :int, width: int, height: int, radius: float = 0) -> None:
+        # identifiers make the same few labels over and over, share one string for each
+        self.label = sys.intern(label)
         self.top_left_x = top_left_x
         self.top_left_y = top_left_y
         self.width = width
         self.height = height
         self.radius = radius
-        
-        self.source_frame_rgb = source_frame_rgb
-        self.metadata = {}
-        self.mask = mask        
-        
+        self.shape: str = None
+        self.color: str = None
+        self.distance_inches: float = None
+
+        self.frame = frame
+        self.extra_metadata: dict = None
+        # found from the mask crop the first time it is asked for
+        self._contour = None
+
+    @property
+    def frame_width(self) -> int:
+        return self.frame.width
+
+    @property
+    def frame_height(self) -> int:
+        return self.frame.height
+
+    @property
+    def source_frame_rgb(self) -> cv2.typing.MatLike:
+        return self.frame.image_rgb
+
+    @property
+    def mask(self) -> cv2.typing.MatLike:
+        """ The whole detection mask of the frame, shared with every other object found in it. """
+        return self.frame.mask
+
     def get_center_x(self):
-        return self.top_left_x + self.width // 2    
-    
+        return self.top_left_x + self.width // 2
+
     def get_center_y(self):
         return self.top_left_y + self.height // 2
-        
+
+    @property
+    def center(self) -> tuple:
+        return (self.get_center_x(), self.get_center_y())
+
+    @property
+    def mask_crop(self) -> cv2.typing.MatLike:
+        """ A view of the frame's mask over this object's bounding box (no copy), None if the identifier made no mask. """
+        if self.frame.mask is None:
+            return None
+        x = max(0, self.top_left_x - self.frame.mask_offset_x)
+        y = max(0, self.top_left_y - self.frame.mask_offset_y)
+        return self.frame.mask[y:self.top_left_y - self.frame.mask_offset_y + self.height, x:self.top_left_x - self.frame.mask_offset_x + self.width]
+
+    @property
+    def contour(self):
+        """ The largest outline in the mask crop, in frame coordinates, None without a single channel 8 bit mask. """
+        if self._contour is None:
+            crop = self.mask_crop
+            if crop is None or crop.size == 0 or crop.ndim != 2 or crop.dtype != np.uint8:
+                return None
+            offset = (max(self.top_left_x, self.frame.mask_offset_x), max(self.top_left_y, self.frame.mask_offset_y))
+            contours, _ = cv2.findContours(crop, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+            if len(contours) == 0:
+                return None
+            self._contour = max(contours, key=cv2.contourArea)
+        return self._contour
+
+    @property
+    def area(self) -> float:
+        """ Area inside the contour, the bounding box's area without one. """
+        contour = self.contour
+        if contour is None:
+            return self.width * self.height
+        return cv2.contourArea(contour)
+
     def get_metadata(self, key: str):
         """ Retrieves metadata by key."""
-        if key not in self.metadata:
-            return None
-        return self.metadata[key]
-    
+        if key in VisionObject.FIELD_METADATA:
+            return getattr(self, key)
+        if self.extra_metadata is not None and key in self.extra_metadata:
+            return self.extra_metadata[key]
+        if key in VisionObject.DERIVED_METADATA:
+            return getattr(self, key)
+        return None
+
     def set_metadata(self, key: str, value) -> None:
         """ Sets metadata by key."""
-        self.metadata[key] = value
-        
-    def get_all_key_value_pairs(self): 
-        """ Retrieves all key-value pairs as a dictionary. 
-        
-        :return: Dictionary of all key-value pairs. 
-        """ 
-        return self.metadata
+        if key in VisionObject.FIELD_METADATA:
+            setattr(self, key, value)
+        elif key == "contour":
+            self._contour = value
+        else:
+            if self.extra_metadata is None:
+                self.extra_metadata = {}
+            self.extra_metadata[key] = value
+
+    def get_all_key_value_pairs(self):
+        """ Retrieves all key-value pairs as a dictionary.
+
+        Leaves out the contour and mask, they are arrays and get_metadata works them out on request.
+
+        :return: Dictionary of all key-value pairs.
+        """
+        pairs = {key: getattr(self, key) for key in VisionObject.FIELD_METADATA if getattr(self, key) is not None}
+        pairs["center"] = self.center
+        if self.extra_metadata is not None:
+            pairs.update(self.extra_metadata)
+        return pairs
+
+    def translate(self, offset_x: int, offset_y: int, frame: VisionFrame) -> None:
+        """ Moves an object found in a crop of a frame into that frame's coordinates, offset is the crop's top left corner and frame the crop's VisionFrame.translated. """
+        self.top_left_x += offset_x
+        self.top_left_y += offset_y
+        self.frame = frame
+        if self._contour is not None:
+            self._contour = self._contour + (offset_x, offset_y)
@@ -1,13 +1,178 @@
 import cv2
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from Vision.VisionObject import VisionObject
+from Vision.CameraIntrinsics import CameraIntrinsics
+
+# tracking mode defaults: full frame every N frames, ROI is the target's bbox grown by this fraction of its size on each side
+DEFAULT_REACQUIRE_INTERVAL = 10
+DEFAULT_TRACKING_MARGIN = 0.5
+# the ROI grows by at least this many pixels on each side, so a small target can still move between frames
+MIN_TRACKING_MARGIN_PIXELS = 16
 
 #cv2.typing.MatLike, List[VisionObject]
 # processes a frame and returns a list of Visually identified objects
 class VisualObjectIdentifier:
+    
+    # set by the runtime once the HAL has started, None if the HAL can't provide intrinsics
+    camera_intrinsics: CameraIntrinsics = None
+    
+    def set_camera_intrinsics(self, camera_intrinsics: CameraIntrinsics) -> None:
+        """ Gives the identifier the camera's intrinsics for distance calculations. """
+        self.camera_intrinsics = camera_intrinsics
+    
     def process_frame(self, frame_rgb: cv2.typing.MatLike) -> List[VisionObject]: ...
     """ Processes a frame and returns a list of visually identified objects in screen space. """
     
     def get_all_potential_labels(self) -> List[str]: ...
-    """ Retrieves all potential labels that can be identified by this object identifier. """
\ No newline at end of file
+    """ Retrieves all potential labels that can be identified by this object identifier. """
+    
+    # tracking mode - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    # opt-in, while locked onto a target only an area around its last bounding box is processed
+    
+    tracking_enabled: bool = False
+    tracking_reacquire_interval: int = DEFAULT_REACQUIRE_INTERVAL
+    tracking_margin: float = DEFAULT_TRACKING_MARGIN
+    # lower case label being tracked and its last bounding box (x, y, w, h) in full frame pixels, None until it is found
+    tracking_label: Optional[str] = None
+    tracking_box: Optional[Tuple[int, int, int, int]] = None
+    frames_since_full_frame: int = 0
+    tracking_metrics: Dict[str, int] = None
+    # while process_frame runs on an ROI, the width of the frame it was cut from: focal lengths scale with the frame, not the crop
+    roi_source_frame_width: Optional[int] = None
+    # the last whole frame pass's objects, and what detect last saw in the whole frame (see get_visible_objects)
+    last_full_frame_objects: List[VisionObject] = []
+    visible_objects: List[VisionObject] = []
+    
+    def enable_tracking(self, reacquire_interval: int = DEFAULT_REACQUIRE_INTERVAL, margin: float = DEFAULT_TRACKING_MARGIN) -> None:
+        """
+        Makes detect only process the area around the target's last bounding box.
+        Args:
+            reacquire_interval: Every this many frames the whole frame is processed anyway, to notice new objects.
+            margin: The area is the bounding box grown by margin times its width and height on each side.
+        """
+        self.tracking_enabled = True
+        self.tracking_reacquire_interval = max(1, int(reacquire_interval))
+        self.tracking_margin = margin
+        self.tracking_box = None
+        self.reset_tracking_metrics()
+    
+    def disable_tracking(self) -> None:
+        self.tracking_enabled = False
+        self.tracking_box = None
+    
+    def detect(self, frame_rgb: cv2.typing.MatLike, target_label: str = None) -> List[VisionObject]:
+        """
+        process_frame, or with tracking enabled and a target_label, process_frame on the area around where target_label was last seen.
+        The whole frame is processed when the target hasn't been found yet, was lost in the area or reached its edge (same frame,
+        so nothing is missed), or every reacquire_interval frames. Objects cut by the area's edge aren't returned.
+        Objects always come back in full frame coordinates.
+        """
+        if self.tracking_metrics is None:
+            self.reset_tracking_metrics()
+        if not self.tracking_enabled or target_label is None:
+            return self._detect_full_frame(frame_rgb)
+        
+        target_label = target_label.lower()
+        if target_label != self.tracking_label:
+            self.tracking_label = target_label
+            self.tracking_box = None
+        
+        frame_height, frame_width = frame_rgb.shape[:2]
+        if self.tracking_box is not None and self.frames_since_full_frame < self.tracking_reacquire_interval:
+            x0, y0, x1, y1 = self._tracking_roi(frame_width, frame_height)
+            self.roi_source_frame_width = frame_width
+            try:
+                roi_objects = self.process_frame(frame_rgb[y0:y1, x0:x1])
+            finally:
+                self.roi_source_frame_width = None
+            self.tracking_metrics["roi_frames"] += 1
+            self.tracking_metrics["roi_pixels"] += (x1 - x0) * (y1 - y0)
+            if len(roi_objects) > 0:
+                # every object of one process_frame call shares one frame handle, move it once
+                full_frame = roi_objects[0].frame.translated(x0, y0, frame_rgb)
+                for obj in roi_objects:
+                    obj.translate(x0, y0, full_frame)
+            # an object cut by an edge of the area that isn't the frame's edge is only the part of it inside, drop it
+            roi_objects = [obj for obj in roi_objects if not self._is_cut_by_roi(obj, x0, y0, x1, y1, frame_width, frame_height)]
+            if self._update_tracking_box(roi_objects):
+                self.frames_since_full_frame += 1
+                # the rest of the frame wasn't looked at, what the last whole frame pass saw there is still the best guess:
+                # keep what wasn't wholly inside the area (the ROI pass would have seen it) and isn't one of its objects seen again
+                self.visible_objects = roi_objects + [obj for obj in self.last_full_frame_objects
+                                                      if not self._is_inside(obj, x0, y0, x1, y1)
+                                                      and not any(obj.label == roi_obj.label and self._boxes_overlap(obj, roi_obj)
+                                                                  for roi_obj in roi_objects)]
+                return roi_objects
+            # the target left the area or reached its edge, look everywhere on this same frame
+            self.tracking_metrics["lost"] += 1
+        
+        objects = self._detect_full_frame(frame_rgb)
+        self._update_tracking_box(objects)
+        return objects
+    
+    def get_visible_objects(self) -> List[VisionObject]:
+        """
+        Everything in view as of the last detect call. Same as what detect returned, except after an ROI pass it adds the
+        last whole frame's objects that weren't wholly inside the ROI and don't overlap one the ROI pass found with the same
+        label, they weren't looked for (or were cut by the ROI's edge) rather than gone.
+        A new list every call of detect, so don't modify it.
+        """
+        return self.visible_objects
+    
+    def get_tracking_metrics(self) -> Dict[str, float]:
+        """ Frames and pixels processed in each mode since tracking was enabled, and the processed share of every full frame pixel. """
+        if self.tracking_metrics is None:
+            self.reset_tracking_metrics()
+        metrics: Dict[str, float] = dict(self.tracking_metrics)
+        frames = metrics["full_frames"] + metrics["roi_frames"]
+        processed = metrics["full_pixels"] + metrics["roi_pixels"]
+        # what processing every frame whole would have cost, ROI frames counted at the full frames' average size
+        full_frame_size = metrics["full_pixels"] / metrics["full_frames"] if metrics["full_frames"] > 0 else 0
+        metrics["pixels_per_frame"] = processed / frames if frames > 0 else 0.0
+        metrics["processed_fraction"] = processed / (full_frame_size * frames) if full_frame_size > 0 else 1.0
+        return metrics
+    
+    def reset_tracking_metrics(self) -> None:
+        self.tracking_metrics = {"full_frames": 0, "full_pixels": 0, "roi_frames": 0, "roi_pixels": 0, "lost": 0}
+    
+    def _detect_full_frame(self, frame_rgb: cv2.typing.MatLike) -> List[VisionObject]:
+        self.frames_since_full_frame = 0
+        self.tracking_metrics["full_frames"] += 1
+        self.tracking_metrics["full_pixels"] += frame_rgb.shape[0] * frame_rgb.shape[1]
+        objects = self.process_frame(frame_rgb)
+        self.last_full_frame_objects = objects
+        self.visible_objects = objects
+        return objects
+    
+    def _update_tracking_box(self, objects: List[VisionObject]) -> bool:
+        """ Keeps the largest object with the tracked label as the next area's center, returns False if there is none. """
+        target = None
+        for obj in objects:
+            if obj.label.lower() == self.tracking_label and (target is None or obj.width * obj.height > target.width * target.height):
+                target = obj
+        self.tracking_box = None if target is None else (target.top_left_x, target.top_left_y, target.width, target.height)
+        return target is not None
+    
+    @staticmethod
+    def _is_inside(obj: VisionObject, x0: int, y0: int, x1: int, y1: int) -> bool:
+        """ True if the whole bounding box is in the area. """
+        return x0 <= obj.top_left_x and y0 <= obj.top_left_y and obj.top_left_x + obj.width <= x1 and obj.top_left_y + obj.height <= y1
+    
+    @staticmethod
+    def _boxes_overlap(a: VisionObject, b: VisionObject) -> bool:
+        return (a.top_left_x < b.top_left_x + b.width and b.top_left_x < a.top_left_x + a.width
+                and a.top_left_y < b.top_left_y + b.height and b.top_left_y < a.top_left_y + a.height)
+    
+    @staticmethod
+    def _is_cut_by_roi(obj: VisionObject, x0: int, y0: int, x1: int, y1: int, frame_width: int, frame_height: int) -> bool:
+        """ True if the bounding box reaches an edge of the area that is inside the frame, the object may go on past it. """
+        return ((x0 > 0 and obj.top_left_x <= x0) or (y0 > 0 and obj.top_left_y <= y0)
+                or (x1 < frame_width and obj.top_left_x + obj.width >= x1) or (y1 < frame_height and obj.top_left_y + obj.height >= y1))
+    
+    def _tracking_roi(self, frame_width: int, frame_height: int) -> Tuple[int, int, int, int]:
+        """ (x0, y0, x1, y1) of the tracking box grown by the margin, clipped to the frame. """
+        x, y, w, h = self.tracking_box
+        margin_x = max(int(w * self.tracking_margin), MIN_TRACKING_MARGIN_PIXELS)
+        margin_y = max(int(h * self.tracking_margin), MIN_TRACKING_MARGIN_PIXELS)
+        return max(0, x - margin_x), max(0, y - margin_y), min(frame_width, x + w + margin_x), min(frame_height, y + h + margin_y)
@@ -3,7 +3,7 @@ from typing import List
 import cv2
 
 from Vision.VisualObjectIdentifier import VisualObjectIdentifier
-from Vision.VisionObject import VisionObject
+from Vision.VisionObject import VisionFrame, VisionObject
 
 #cv2.typing.MatLike, List[VisionObject]
 # processes a frame and returns a list of Visually identified objects
@@ -17,6 +17,8 @@ class YoloV4TinyObjectIdentifier(VisualObjectIdentifier):
         self.classes_path = classes_path
         self.font = cv2.FONT_HERSHEY_TRIPLEX
         self.draw_image = True
+        # the newest frame with every detection drawn on it (BGR, flipped), None until draw_image has drawn one
+        self.last_image_with_boxes = None
         
         self.class_names = self.load_class_names(self.classes_path)
         self.yoloNet = cv2.dnn.readNet(self.weights_path, self.cfg_path)
@@ -37,9 +39,6 @@ class YoloV4TinyObjectIdentifier(VisualObjectIdentifier):
         flipped_source_frame_rgb = cv2.flip(image_rgb, 0)
         bgr_image = cv2.cvtColor(flipped_source_frame_rgb, cv2.COLOR_RGB2BGR)
         
-        image_height: int = bgr_image.shape[0]
-        image_width: int = bgr_image.shape[1]
-        
         image_with_boxes = None
         if self.draw_image:
             image_with_boxes_bgr = bgr_image.copy()           
@@ -47,6 +46,8 @@ class YoloV4TinyObjectIdentifier(VisualObjectIdentifier):
         
         classes, scores, boxes = self.model.detect(bgr_image,0.4,0.3)
         
+        # boxes only, no mask to find contours in
+        frame = VisionFrame(image_rgb)
         objects = []
         
         # print("Identified objects: " + str(len(classes)) + " " + str(len(scores)) + " " + str(len(boxes)) + "   <---------------------")
@@ -60,11 +61,15 @@ class YoloV4TinyObjectIdentifier(VisualObjectIdentifier):
                 cv2.rectangle(image_with_boxes_bgr, box,(0,0,255), 2)
                 cv2.putText(image_with_boxes_bgr,"{}:{}".format(self.class_names[classid],format(score,'.2f')), (box[0], box[1]-14), self.font, 0.6, (0,255,0), 3)
                 
-            new_object = VisionObject(class_label, image_height, image_width, top_left_x, top_left_y, obj_width, obj_height, largest_size, image_rgb, image_with_boxes_bgr)
+            new_object = VisionObject(class_label, frame, top_left_x, top_left_y, obj_width, obj_height, largest_size)
             new_object.set_metadata("score", score)
             new_object.set_metadata("classid", classid)
-            new_object.set_metadata("box", box)      
+            new_object.set_metadata("box", box)
             objects.append(new_object)        
+        
+        if self.draw_image:
+            # kept on the identifier, not the objects: it is no mask and would end up in their metadata
+            self.last_image_with_boxes = image_with_boxes_bgr
             
         return objects 
     
@@ -28,6 +28,18 @@ if __name__ == "__main__":
 
     # Start arm, could mean connecting to the simulator or the real arm
     armRuntime.selected_HAL.start_arm()    
+    
+    # The HAL computes its camera intrinsics once at start, hand them to the vision code
+    if armRuntime.selected_object_identifier is not None:
+        armRuntime.selected_object_identifier.set_camera_intrinsics(armRuntime.selected_HAL.get_camera_intrinsics())
+    
+    # Share one camera reader between the controller, server and app
+    if config["use_frame_grabber"]:
+        armRuntime.selected_HAL.start_frame_grabber(config["frame_grabber_max_fps"])
+        
+    # Serve repeated joint reads from memory
+    if config["use_joint_cache"]:
+        armRuntime.selected_HAL.enable_joint_cache(config["joint_cache_max_age"], config["joint_cache_refresh_hz"])
 
     print("Controler Startup")
     # Start the Controler
@@ -88,6 +100,10 @@ if __name__ == "__main__":
     if armRuntime.selected_controller is not None:
         armRuntime.selected_controller.stop()
         
+    # stop reading the camera and joints before the HAL goes away
+    armRuntime.selected_HAL.stop_frame_grabber()
+    armRuntime.selected_HAL.disable_joint_cache()
+    
     # stop the HAL interface, could mean disconnecting from the simulator or the real arm
     armRuntime.selected_HAL.stop_arm()
     
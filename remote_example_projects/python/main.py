@@ -5,10 +5,14 @@ from PyQt6.QtWidgets import (
     QSlider, QHBoxLayout
 )
 from PyQt6.QtGui import QPixmap, QImage
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 import cv2
 
 from remote_arm_interface import RemoteArmInterface
+from ws_control_client import WebSocketControlClient
+
+# how often the server pushes joint state and detections over the control WebSocket
+TELEMETRY_HZ = 30
 
 
 class MainWindow(QWidget):
@@ -16,9 +20,30 @@ class MainWindow(QWidget):
         super().__init__()
         self.setWindowTitle("Robotic Arm Control")
         self.arm = RemoteArmInterface()
+        self.control = self.connect_control_socket()
         self.init_ui()
         self.arm.stream_camera(self.update_camera_view)
         self.status_label.setText(self.arm.get_status_string())
+        if self.control is not None:
+            # telemetry arrives on the socket's thread, read the latest from the UI thread
+            self.telemetry_timer = QTimer(self)
+            self.telemetry_timer.timeout.connect(self.update_telemetry)
+            self.telemetry_timer.start(1000 // TELEMETRY_HZ)
+
+    def connect_control_socket(self):
+        """Joint moves and reads go over the /ws/control WebSocket when the server has it, HTTP otherwise."""
+        try:
+            control = WebSocketControlClient(self.arm.base_url)
+            control.connect()
+            control.subscribe(TELEMETRY_HZ, joints=True, detections=True)
+            return control
+        except Exception as err:
+            print(f"Control WebSocket unavailable, using HTTP: {err}")
+            return None
+
+    def joints(self):
+        """Where joint reads and writes go, both have get_joints, set_joint and set_joints."""
+        return self.control if self.control is not None and self.control.is_connected() else self.arm
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -64,14 +89,17 @@ class MainWindow(QWidget):
         move = self.get_slider_value()
         if direction in ["left", "right"]:
             index = 0
-            angle = self.arm.get_joint(index)
-            self.arm.set_joint(index, angle + move if direction == "right" else angle - move)
+            angle = self.joints().get_joints()[index]
+            self.joints().set_joint(index, angle + move if direction == "right" else angle - move)
         elif direction in ["up", "down"]:
             delta = move / 2
             idxs = [1, 2]
+            # read and write both joints in one request each
+            angles = self.joints().get_joints()
+            mask = [idx in idxs for idx in range(len(angles))]
             for idx in idxs:
-                angle = self.arm.get_joint(idx)
-                self.arm.set_joint(idx, angle + delta if direction == "up" else angle - delta)
+                angles[idx] = angles[idx] + delta if direction == "up" else angles[idx] - delta
+            self.joints().set_joints(angles, mask)
         self.response_label.setText(f"Moved {direction} by {move}")
 
     def open_gripper(self):
@@ -82,6 +110,17 @@ class MainWindow(QWidget):
         success = self.arm.gripper_close()
         self.response_label.setText("Gripper closed" if success else "Failed to close gripper")
 
+    def update_telemetry(self):
+        joint_state = self.control.get_latest_joint_state()
+        detections = self.control.get_latest_detections()
+        text = ""
+        if joint_state is not None:
+            text += "Joints: " + ", ".join(f"{angle:.1f}" for angle in joint_state[1])
+        if detections is not None:
+            text += "\nSees: " + ", ".join(detection.label for detection in detections[3])
+        if text:
+            self.status_label.setText(text)
+
     def update_camera_view(self, frame):
         rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         h, w, ch = rgb_image.shape
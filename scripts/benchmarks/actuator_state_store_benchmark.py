@@ -0,0 +1,75 @@
+# Compares how long an actuation blocks on persisting state: rewriting a pickle file per call (the old gripper code)
+# against ActuatorStateStore.set, and counts the fsyncs each way. Then reopens the journal to check the last pose replays.
+# Run from the project root:
+#   python scripts/benchmarks/actuator_state_store_benchmark.py
+#   python scripts/benchmarks/actuator_state_store_benchmark.py --updates 2000 --flush_interval 0.1
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.actuator_state_store import ActuatorStateStore
+
+def poses(updates: int):
+    # base, two servos and the gripper moving like a controller at 30 Hz
+    for i in range(updates):
+        yield {"base_stepper_degrees": (i % 90) * 0.45, "servo_4": 45 + i % 30, "servo_5": 60 - i % 20, "gripper": (i // 50) % 2}
+
+def print_times(name: str, call_seconds, fsyncs: int) -> None:
+    call_seconds.sort()
+    print(f"{name}: p50 {call_seconds[len(call_seconds) // 2] * 1e6:8.1f} us, p99 {call_seconds[int(len(call_seconds) * 0.99)] * 1e6:8.1f} us, "
+          f"{fsyncs} fsyncs")
+
+def run_pickle(directory: str, updates: int) -> None:
+    call_seconds = []
+    fsyncs = 0
+    for pose in poses(updates):
+        t0 = time.perf_counter()
+        for key, value in pose.items():
+            # the old code rewrote one pickle file per actuator on every write, fsync it so the comparison is fair
+            with open(os.path.join(directory, key + ".temp"), "wb") as f:
+                pickle.dump(value, f)
+                f.flush()
+                os.fsync(f.fileno())
+                fsyncs += 1
+        call_seconds.append(time.perf_counter() - t0)
+    print_times("pickle per call     ", call_seconds, fsyncs)
+
+def run_store(directory: str, updates: int, flush_interval: float, rate_hz: float) -> None:
+    path = os.path.join(directory, "actuator_state.journal")
+    store = ActuatorStateStore(path, flush_interval=flush_interval)
+    store.start()
+    call_seconds = []
+    start = time.perf_counter()
+    last_pose = None
+    for tick, pose in enumerate(poses(updates)):
+        t0 = time.perf_counter()
+        for key, value in pose.items():
+            store.set(key, value)
+        call_seconds.append(time.perf_counter() - t0)
+        last_pose = pose
+        time.sleep(max(start + (tick + 1) / rate_hz - time.perf_counter(), 0))
+    fsyncs = store.fsync_count
+    store.close()
+    print_times("ActuatorStateStore  ", call_seconds, fsyncs)
+
+    reopened = ActuatorStateStore(path)
+    for key, value in last_pose.items():
+        assert reopened.get(key) == value, f"{key} replayed {reopened.get(key)} != {value}"
+    print(f"journal replays the last pose, {reopened.journal_lines} lines after compaction")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-call pickle files against the journaled ActuatorStateStore.")
+    parser.add_argument("--updates", type=int, default=300, help="Poses to persist.")
+    parser.add_argument("--rate", type=float, default=30, help="Controller rate in Hz for the store run.")
+    parser.add_argument("--flush_interval", type=float, default=0.5, help="ActuatorStateStore flush_interval in seconds.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        run_pickle(directory, args.updates)
+        run_store(directory, args.updates, args.flush_interval, args.rate)
@@ -0,0 +1,63 @@
+# Runs ColorObjectIdentifier on the same SyntheticHAL frames with the per color path (inRange, close and findContours once
+# per COLOR_RANGES entry) and the single pass path (lookup table label image and one connectedComponentsWithStats), at
+# 320x240, 640x480 and 1280x720, and prints frames per second and how many objects each path found. --min_area and
+# --max_objects apply the identifier's object limits, which matter most on noisy frames.
+# Run from the project root:
+#   python scripts/benchmarks/color_identifier_benchmark.py
+#   python scripts/benchmarks/color_identifier_benchmark.py --objects 12 --frames 100 --noise 8
+#   python scripts/benchmarks/color_identifier_benchmark.py --noise 8 --min_area 20 --max_objects 32
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.synthetic_HAL import SyntheticHAL
+from Vision.ColorObjectIdentifier import ColorObjectIdentifier
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720)]
+# distinct arm poses the frames are rendered from, so the objects move around the frame
+POSE_COUNT = 10
+
+def render_frames(width: int, height: int, seed: int, object_count: int, noise: float) -> list:
+    hal = SyntheticHAL((width, height), fps=0, seed=seed, object_count=object_count)
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(POSE_COUNT):
+        hal.set_joints([20 + i * 6, 20, 70, 40])
+        frame = hal.get_arm_cam_img_rgb()
+        if noise > 0:
+            # sensor noise, makes the speckles a real camera gives
+            frame = np.clip(frame + rng.normal(0, noise, frame.shape), 0, 255).astype(np.uint8)
+        frames.append(frame)
+    return frames
+
+def time_identifier(identifier: ColorObjectIdentifier, frames: list, frame_count: int):
+    object_counts = []
+    start = time.perf_counter()
+    for i in range(frame_count):
+        object_counts.append(len(identifier.process_frame(frames[i % len(frames)])))
+    seconds = time.perf_counter() - start
+    return frame_count / seconds, sum(object_counts) / len(object_counts)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--objects", type=int, default=6)
+    parser.add_argument("--noise", type=float, default=0, help="standard deviation of gaussian noise added to each frame")
+    parser.add_argument("--min_area", type=float, default=0, help="drop objects smaller than this many pixels")
+    parser.add_argument("--max_objects", type=int, default=0, help="keep only the largest this many objects, 0 for all")
+    args = parser.parse_args()
+
+    for width, height in RESOLUTIONS:
+        frames = render_frames(width, height, args.seed, args.objects, args.noise)
+        per_color_fps, per_color_objects = time_identifier(ColorObjectIdentifier(False, args.min_area, args.max_objects), frames, args.frames)
+        single_pass_fps, single_pass_objects = time_identifier(ColorObjectIdentifier(True, args.min_area, args.max_objects), frames, args.frames)
+        print(f"{width:>5}x{height:<5} per color: {per_color_fps:7.1f} fps ({per_color_objects:6.1f} objects)   "
+              f"single pass: {single_pass_fps:7.1f} fps ({single_pass_objects:6.1f} objects)   "
+              f"speedup: {single_pass_fps / per_color_fps:4.1f}x")
@@ -0,0 +1,115 @@
+# Splits a recorded-in-memory MJPEG stream into JPEGs with the old stream_camera loop (bytes += chunk, then find from the
+# start of the buffer on every chunk) and with MJPEGParser, with and without Content-Length part headers, at several resolutions.
+# Then feeds LatestFrameDecoder faster than a slow consumer takes frames and reports how stale the delivered frames are.
+# Run from the project root:
+#   python scripts/benchmarks/mjpeg_parser_benchmark.py
+#   python scripts/benchmarks/mjpeg_parser_benchmark.py --chunk_size 1024 --frames 30
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.http_remote.mjpeg_stream import MJPEGParser, LatestFrameDecoder
+from HALs.synthetic_HAL import SyntheticHAL
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720), (1920, 1080)]
+
+def make_stream(width: int, height: int, frames: int, with_content_length: bool):
+    hal = SyntheticHAL((width, height), fps=0, seed=1)
+    jpegs = []
+    stream = bytearray()
+    for _ in range(frames):
+        jpeg = cv2.imencode('.jpg', cv2.cvtColor(hal.get_arm_cam_img_rgb(), cv2.COLOR_RGB2BGR))[1].tobytes()
+        jpegs.append(jpeg)
+        headers = b'--frame\r\nContent-Type: image/jpeg\r\n'
+        if with_content_length:
+            headers += b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n'
+        stream += headers + b'\r\n' + jpeg + b'\r\n'
+    return jpegs, bytes(stream)
+
+def old_parser(stream: bytes, chunk_size: int):
+    """ The loop stream_camera used before MJPEGParser. """
+    jpegs = []
+    bytes_data = b''
+    for i in range(0, len(stream), chunk_size):
+        bytes_data += stream[i:i + chunk_size]
+        a = bytes_data.find(b'\xff\xd8')
+        b = bytes_data.find(b'\xff\xd9')
+        if a != -1 and b != -1:
+            jpegs.append(bytes_data[a:b + 2])
+            bytes_data = bytes_data[b + 2:]
+    return jpegs
+
+def new_parser(stream: bytes, chunk_size: int):
+    parser = MJPEGParser()
+    jpegs = []
+    for i in range(0, len(stream), chunk_size):
+        jpegs += parser.feed(stream[i:i + chunk_size])
+    return jpegs
+
+def time_parser(parse_fnc, stream: bytes, chunk_size: int, expected) -> float:
+    start = time.perf_counter()
+    jpegs = parse_fnc(stream, chunk_size)
+    seconds = time.perf_counter() - start
+    assert jpegs == expected, f"{parse_fnc.__name__} found {len(jpegs)} frames, expected {len(expected)}"
+    return seconds
+
+def benchmark_parsers(frames: int, chunk_size: int) -> None:
+    for width, height in RESOLUTIONS:
+        jpegs, stream = make_stream(width, height, frames, True)
+        _, stream_without_length = make_stream(width, height, frames, False)
+        old_seconds = time_parser(old_parser, stream_without_length, chunk_size, jpegs)
+        scan_seconds = time_parser(new_parser, stream_without_length, chunk_size, jpegs)
+        length_seconds = time_parser(new_parser, stream, chunk_size, jpegs)
+        frame_kb = len(stream) / frames / 1024
+        print(f"{width:>5}x{height:<5} {frame_kb:6.1f} KB/frame   old: {old_seconds / frames * 1000:8.3f} ms/frame   "
+              f"MJPEGParser scanning: {scan_seconds / frames * 1000:7.3f} ms/frame   with Content-Length: {length_seconds / frames * 1000:7.3f} ms/frame")
+
+def benchmark_decoder(frames: int, arrival_fps: float, consumer_seconds: float) -> None:
+    # each frame's top left block is a gray level that says which frame it is, flat 8x8 blocks survive JPEG
+    frame = cv2.cvtColor(SyntheticHAL((1280, 720), fps=0, seed=1).get_arm_cam_img_rgb(), cv2.COLOR_RGB2BGR)
+    frames = min(frames, 60)
+    jpegs = []
+    for i in range(frames):
+        frame[:16, :16] = i * 4
+        jpegs.append(cv2.imencode('.jpg', frame)[1].tobytes())
+
+    submitted_times = [0.0] * frames
+    delivered_staleness = []
+
+    def on_frame(img):
+        index = int(round(img[:16, :16].mean() / 4))
+        delivered_staleness.append(time.perf_counter() - submitted_times[index])
+        # a consumer slower than the stream, ex: vision on a Pi
+        time.sleep(consumer_seconds)
+
+    decoder = LatestFrameDecoder(on_frame)
+    decoder.start()
+    start = time.perf_counter()
+    for i, jpeg in enumerate(jpegs):
+        submitted_times[i] = time.perf_counter()
+        decoder.submit(jpeg)
+        time.sleep(max(start + (i + 1) / arrival_fps - time.perf_counter(), 0))
+    time.sleep(consumer_seconds * 2)
+    decoder.stop()
+
+    delivered_staleness.sort()
+    print(f"LatestFrameDecoder: {decoder.frames_received} received at {arrival_fps:.0f} fps, {decoder.frames_decoded} delivered, "
+          f"{decoder.frames_dropped} dropped, staleness p50 {delivered_staleness[len(delivered_staleness) // 2] * 1000:.1f} ms, "
+          f"max {delivered_staleness[-1] * 1000:.1f} ms with a {consumer_seconds * 1000:.0f} ms consumer")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the MJPEG stream parser and the latest-frame-wins decoder.")
+    parser.add_argument("--frames", type=int, default=20, help="Frames per resolution.")
+    parser.add_argument("--chunk_size", type=int, default=1024, help="Bytes per network read, the old loop used 1024.")
+    parser.add_argument("--arrival_fps", type=float, default=30, help="Frame rate the decoder is fed at.")
+    parser.add_argument("--consumer_ms", type=float, default=100, help="How long the slow consumer takes per frame.")
+    args = parser.parse_args()
+
+    benchmark_parsers(args.frames, args.chunk_size)
+    benchmark_decoder(args.frames * 3, args.arrival_fps, args.consumer_ms / 1000)
@@ -0,0 +1,68 @@
+# Runs the vision loop against a SyntheticHAL rendering as fast as it can, once with the HAL in this process (a frame grabber
+# thread renders while the main thread runs ColorObjectIdentifier, both under one GIL) and once behind ProcessHAL (the HAL
+# renders in a child process and frames arrive through shared memory). Reports vision frames per second, how many frames
+# the camera side produced meanwhile, and the round-trip time of a joint command in each case.
+# Run from the project root:
+#   python scripts/benchmarks/process_hal_benchmark.py
+#   python scripts/benchmarks/process_hal_benchmark.py --width 1280 --height 720 --seconds 10
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.HAL_base import HAL_base
+from HALs.process_HAL import ProcessHAL
+from HALs.synthetic_HAL import SyntheticHAL
+from Vision.ColorObjectIdentifier import ColorObjectIdentifier
+
+JOINT_COMMANDS = 2000
+
+def run_vision(hal: HAL_base, seconds: float) -> int:
+    vision = ColorObjectIdentifier()
+    last_sequence = 0
+    frames = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        last_sequence, frame = hal.wait_for_next_frame(last_sequence, 1.0)
+        if frame is None:
+            continue
+        vision.process_frame(frame)
+        frames += 1
+    return frames
+
+def time_joint_commands(hal: HAL_base) -> float:
+    start = time.perf_counter()
+    for i in range(JOINT_COMMANDS):
+        hal.set_joint(0, 30 + i % 30)
+    return (time.perf_counter() - start) / JOINT_COMMANDS * 1e6
+
+def benchmark(name: str, hal: HAL_base, seconds: float) -> None:
+    hal.start_arm()
+    hal.start_frame_grabber()
+    # let the first frames arrive before timing
+    run_vision(hal, 0.5)
+    produced_before = hal.frame_grabber.latest_sequence
+    vision_frames = run_vision(hal, seconds)
+    produced = hal.frame_grabber.latest_sequence - produced_before
+    joint_us = time_joint_commands(hal)
+    hal.stop_frame_grabber()
+    hal.stop_arm()
+    print(f"{name:<12} vision: {vision_frames / seconds:7.1f} fps   camera frames: {produced / seconds:7.1f} fps   "
+          f"set_joint round trip: {joint_us:7.1f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--objects", type=int, default=6)
+    args = parser.parse_args()
+
+    hal_args = ((args.width, args.height), 0, args.seed, args.objects)
+    print(f"SyntheticHAL {args.width}x{args.height} rendering as fast as it can, {args.seconds:.0f} s per run")
+    benchmark("in process", SyntheticHAL(*hal_args), args.seconds)
+    benchmark("ProcessHAL", ProcessHAL("HALs.synthetic_HAL", "SyntheticHAL", hal_args), args.seconds)
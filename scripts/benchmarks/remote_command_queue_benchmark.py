@@ -0,0 +1,87 @@
+# Drives three joints from a 30 Hz controller the way RemoteHAL used to (one blocking set_joint request per joint) and
+# through RemoteCommandQueue, and reports how long each tick blocks the controller, how many updates were coalesced and the
+# end to end command latency. By default requests go to a fake arm that answers after --rtt_ms, pass --url to use a running server.
+# Run from the project root:
+#   python scripts/benchmarks/remote_command_queue_benchmark.py
+#   python scripts/benchmarks/remote_command_queue_benchmark.py --rtt_ms 40 --rate 60
+#   python scripts/benchmarks/remote_command_queue_benchmark.py --url http://127.0.0.1:8000
+import argparse
+import math
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.http_remote.command_queue import RemoteCommandQueue
+from HALs.http_remote.remote_arm_interface import RemoteArmInterface
+
+JOINTS = [0, 1, 2]
+
+class FakeRemoteArm:
+    """ Answers every request after rtt seconds and remembers the last angle each joint was set to. """
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.angles = {}
+        self.requests = 0
+
+    def set_joint(self, joint_index: int, joint_angle: float) -> bool:
+        time.sleep(self.rtt)
+        self.requests += 1
+        self.angles[joint_index] = joint_angle
+        return True
+
+    def set_joints(self, joint_angles, mask=None) -> bool:
+        time.sleep(self.rtt)
+        self.requests += 1
+        for joint_index, joint_angle in enumerate(joint_angles):
+            if mask is None or mask[joint_index]:
+                self.angles[joint_index] = joint_angle
+        return True
+
+def targets_for_tick(tick: int, rate_hz: float):
+    t = tick / rate_hz
+    return {joint_index: 90 + 30 * math.sin(t * (joint_index + 1)) for joint_index in JOINTS}
+
+def run_controller(name: str, set_fnc, rate_hz: float, seconds: float):
+    block_seconds = []
+    ticks = int(rate_hz * seconds)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        t0 = time.perf_counter()
+        for joint_index, joint_angle in targets_for_tick(tick, rate_hz).items():
+            set_fnc(joint_index, joint_angle)
+        block_seconds.append(time.perf_counter() - t0)
+        time.sleep(max(start + (tick + 1) / rate_hz - time.perf_counter(), 0))
+    wall_seconds = time.perf_counter() - start
+    block_seconds.sort()
+    print(f"{name}: {ticks / wall_seconds:5.1f} ticks/s of {rate_hz:.0f}, controller blocked p50 {block_seconds[len(block_seconds) // 2] * 1000:7.3f} ms, "
+          f"max {block_seconds[-1] * 1000:7.3f} ms per tick")
+    return targets_for_tick(ticks - 1, rate_hz)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RemoteHAL's blocking set_joint against RemoteCommandQueue.")
+    parser.add_argument("--url", help="Base url of a running arm server, by default a fake arm is used.")
+    parser.add_argument("--rtt_ms", type=float, default=15, help="Round-trip time of the fake arm.")
+    parser.add_argument("--rate", type=float, default=30, help="Controller rate in Hz.")
+    parser.add_argument("--seconds", type=float, default=3, help="How long to run each mode.")
+    args = parser.parse_args()
+
+    arm = RemoteArmInterface(args.url) if args.url else FakeRemoteArm(args.rtt_ms / 1000)
+
+    run_controller("blocking set_joint  ", arm.set_joint, args.rate, args.seconds)
+
+    queue = RemoteCommandQueue(arm.set_joints)
+    queue.start()
+    last_targets = run_controller("RemoteCommandQueue  ", queue.set_joint, args.rate, args.seconds)
+    queue.stop()
+    metrics = queue.get_metrics()
+    print(f"queue: {metrics['queued']} updates, {metrics['coalesced']} coalesced, {metrics['sent_batches']} requests, {metrics['failed']} failed, "
+          f"latency p50 {metrics['latency_p50_ms']:.1f} ms, p99 {metrics['latency_p99_ms']:.1f} ms")
+    if isinstance(arm, FakeRemoteArm):
+        assert all(abs(arm.angles[joint_index] - angle) < 1e-9 for joint_index, angle in last_targets.items()), "the last targets weren't applied"
+        print("the arm ended on the last targets")
+    else:
+        arm.close()
@@ -0,0 +1,87 @@
+# Measures RemoteHAL's HTTP round-trips: the old transport (bare requests.get/post, a new connection per call) against
+# RemoteArmInterface's pooled keep-alive session, doing a controller's read joints / write joints tick as fast as possible.
+# By default it starts the arm's FastAPI server locally around a SyntheticHAL, pass --url to test a running server instead.
+# Run from the project root:
+#   python scripts/benchmarks/remote_transport_benchmark.py
+#   python scripts/benchmarks/remote_transport_benchmark.py --url http://192.168.1.20:8000 --calls 500
+import argparse
+import os
+import sys
+import time
+import types
+
+import requests
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.http_remote.remote_arm_interface import RemoteArmInterface
+
+class BareRequestsTransport:
+    """ The calls RemoteArmInterface made before it had a session, one connection per call and no timeout. """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def get_joints(self):
+        return requests.get(f"{self.base_url}/get_joints").json().get("joint_angles", [])
+
+    def set_joints(self, joint_angles, mask=None):
+        response = requests.post(f"{self.base_url}/set_joints", json={"joint_angles": joint_angles, "mask": mask})
+        return response.ok and response.json().get("success", False)
+
+def start_local_server(port: int) -> str:
+    # imported here so --url works without fastapi installed
+    from HALs.synthetic_HAL import SyntheticHAL
+    from Modules.server.http_server import HTTPServer
+
+    hal = SyntheticHAL((320, 240), fps=0, joint_speed=0)
+    hal.start_arm()
+    runtime = types.SimpleNamespace(selected_controller=None, selected_HAL=hal, selected_object_identifier=None, selected_logger=None)
+    server = HTTPServer(runtime, port)
+    server.start_server(print_local_ip_address=False)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/joint_count", timeout=0.5)
+            return base_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError(f"the local server didn't start on port {port}")
+
+def run_transport(name: str, transport, calls: int) -> None:
+    joint_angles = [float(angle) for angle in transport.get_joints()]
+    mask = [True, True] + [False] * (len(joint_angles) - 2)
+    call_seconds = []
+    start = time.perf_counter()
+    for i in range(calls // 2):
+        # one controller tick, read every joint then move two of them
+        t0 = time.perf_counter()
+        current = transport.get_joints()
+        t1 = time.perf_counter()
+        joint_angles[0] = 45 + (i % 20)
+        joint_angles[1] = 30 + (i % 10)
+        transport.set_joints(joint_angles, mask)
+        t2 = time.perf_counter()
+        call_seconds += [t1 - t0, t2 - t1]
+    wall_seconds = time.perf_counter() - start
+
+    call_seconds.sort()
+    p50 = call_seconds[len(call_seconds) // 2] * 1000
+    p99 = call_seconds[min(int(len(call_seconds) * 0.99), len(call_seconds) - 1)] * 1000
+    print(f"{name}: {len(call_seconds) / wall_seconds:8.1f} calls/s   p50 {p50:7.3f} ms   p99 {p99:7.3f} ms   ({len(current)} joints)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark RemoteHAL's HTTP transport, per call connections vs a pooled session.")
+    parser.add_argument("--url", help="Base url of a running arm server, by default a local one is started.")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the local server.")
+    parser.add_argument("--calls", type=int, default=1000, help="Requests per transport.")
+    args = parser.parse_args()
+
+    base_url = args.url if args.url else start_local_server(args.port)
+    run_transport("bare requests.get/post ", BareRequestsTransport(base_url), args.calls)
+    remote = RemoteArmInterface(base_url)
+    run_transport("RemoteArmInterface     ", remote, args.calls)
+    remote.close()
@@ -0,0 +1,114 @@
+# Plays a HAL recording back through ColorObjectIdentifier and the FollowLargestObjectControler math as fast as possible
+# and reports frames per second and the time spent in each stage. Runs on any machine, no arm or CoppeliaSim needed.
+# Make a recording with: python main.py --record arm_recording.armrec
+# Run from the project root:
+#   python scripts/benchmarks/replay_benchmark.py arm_recording.armrec
+#   python scripts/benchmarks/replay_benchmark.py --make_test_recording test.armrec     (writes a recording of moving colored circles first)
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.hal_recording import HALRecorder
+from HALs.replay_HAL import ReplayHAL
+from Vision.ColorObjectIdentifier import ColorObjectIdentifier
+from Controllers.FollowLargestObjectControler import FollowLargestObjectControler
+
+def make_test_recording(path: str, frame_count: int, width: int, height: int, fps: float) -> None:
+    """ Writes a recording of colored circles moving over a gray background, with joint states, without any HAL. """
+    recorder = HALRecorder(path, max_queued_frames=frame_count)
+    recorder.start()
+    recorder.record_meta({"hal": "make_test_recording", "joint_count": 4, "camera_intrinsics": None})
+    colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0)]
+    for i in range(frame_count):
+        frame = np.full((height, width, 3), 90, dtype=np.uint8)
+        for c, color in enumerate(colors):
+            angle = i * 0.05 + c * math.pi / 2
+            center = (int(width / 2 + math.cos(angle) * width / 4), int(height / 2 + math.sin(angle) * height / 4))
+            cv2.circle(frame, center, 20 + 5 * c, color, -1)
+        recorder.record_frame(frame)
+        recorder.record_joints([i % 270, 90.0, 30.0, 0.0])
+        time.sleep(1.0 / fps)
+    recorder.stop()
+    print(f"wrote {frame_count} frames to \"{path}\"")
+
+async def run_benchmark(hal: ReplayHAL, target_label: str) -> None:
+    vision = ColorObjectIdentifier()
+    controller = FollowLargestObjectControler(hal, vision, target_label)
+
+    capture_seconds = 0.0
+    vision_seconds = 0.0
+    control_seconds = 0.0
+    frames = 0
+    frames_with_target = 0
+
+    start = time.perf_counter()
+    while not hal.is_finished():
+        t0 = time.perf_counter()
+        frame = hal.capture_image()
+        t1 = time.perf_counter()
+        detected_objects = vision.process_frame(frame)
+        t2 = time.perf_counter()
+
+        # the same work FollowLargestObjectControler does per frame and per tick, without the preview windows
+        target_object = controller.select_largest_target_object(detected_objects)
+        if target_object is not None:
+            frames_with_target += 1
+            await controller.move_towards_object(target_object)
+            controller.read_joint_angles()
+            controller.calculate_base_theta()
+            controller.calculate_servo_2_theta()
+            controller.theta_base = max(controller.theta_base, 0)
+            controller.servo_2 = max(controller.servo_2, 0)
+            controller.write_joint_angles()
+        t3 = time.perf_counter()
+
+        capture_seconds += t1 - t0
+        vision_seconds += t2 - t1
+        control_seconds += t3 - t2
+        frames += 1
+    total_seconds = time.perf_counter() - start
+
+    if frames == 0:
+        print("the recording has no frames")
+        return
+    print(f"{frames} frames in {total_seconds:.3f} s: {frames / total_seconds:.1f} fps "
+          f"(recording is {hal.get_duration():.2f} s long)")
+    print(f"  decode : {capture_seconds / frames * 1000:8.3f} ms/frame")
+    print(f"  vision : {vision_seconds / frames * 1000:8.3f} ms/frame")
+    print(f"  control: {control_seconds / frames * 1000:8.3f} ms/frame")
+    print(f"target \"{controller.get_target_label()}\" seen in {frames_with_target} frames, "
+          f"{len(hal.issued_commands)} commands issued ({len(hal.recorded_commands)} in the recording)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vision and control stack on a HAL recording.")
+    parser.add_argument("recording", nargs="?", help="Recording made with --record or RecordingHAL.")
+    parser.add_argument("--make_test_recording", metavar="FILE", help="Write a synthetic recording to FILE and benchmark it.")
+    parser.add_argument("--frames", type=int, default=300, help="Frames in the synthetic recording.")
+    parser.add_argument("--width", type=int, default=640, help="Synthetic recording width.")
+    parser.add_argument("--height", type=int, default=480, help="Synthetic recording height.")
+    parser.add_argument("--speed", type=float, default=0, help="Replay speed, 1 is real time, 0 is as fast as possible.")
+    parser.add_argument("--target", default="red object", help="Label the controller follows.")
+    args = parser.parse_args()
+
+    path = args.recording
+    if args.make_test_recording:
+        make_test_recording(args.make_test_recording, args.frames, args.width, args.height, 30)
+        path = args.make_test_recording
+    if path is None:
+        parser.error("pass a recording or --make_test_recording FILE")
+
+    hal = ReplayHAL(path, args.speed)
+    hal.start_arm()
+    try:
+        asyncio.run(run_benchmark(hal, args.target))
+    finally:
+        hal.stop_arm()
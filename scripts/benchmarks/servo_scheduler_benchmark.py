@@ -0,0 +1,121 @@
+# Counts the I2C transactions a 30 Hz controller costs on the PCA9685 servo board: writing servo.angle per command
+# (the old physical_HAL) against ServoScheduler's one burst per tick. Uses a mocked ServoKit, no Pi or servo board needed.
+# Run from the project root:
+#   python scripts/benchmarks/servo_scheduler_benchmark.py
+#   python scripts/benchmarks/servo_scheduler_benchmark.py --smooth_time 1 --seconds 5
+import argparse
+import math
+import os
+import struct
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.logan_hal.servo_scheduler import ServoScheduler, PCA9685_LED0_ON_L, PCA9685_CHANNEL_REGISTER_BYTES
+
+class MockI2CDevice:
+    """ Stands in for adafruit_bus_device's I2CDevice, counts transactions and keeps the PCA9685 registers they write. """
+
+    def __init__(self):
+        self.transactions = 0
+        self.registers = bytearray(256)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def write(self, buffer):
+        self.transactions += 1
+        # register address then data, the address auto-increments
+        start = buffer[0]
+        self.registers[start:start + len(buffer) - 1] = buffer[1:]
+
+class MockPCA:
+    def __init__(self):
+        self.frequency = 50
+        self.i2c_device = MockI2CDevice()
+
+class MockServo:
+    """ Each angle write is one I2C transaction, like adafruit_motor.servo writing the channel's duty cycle. """
+
+    def __init__(self, pca: MockPCA):
+        self.pca = pca
+        self._angle = 0.0
+
+    @property
+    def angle(self):
+        self.pca.i2c_device.transactions += 1
+        return self._angle
+
+    @angle.setter
+    def angle(self, value):
+        self.pca.i2c_device.transactions += 1
+        self._angle = value
+
+class MockServoKit:
+    def __init__(self, channels: int = 16):
+        self._pca = MockPCA()
+        self.servo = [MockServo(self._pca) for _ in range(channels)]
+
+def controller_targets(tick: int, rate_hz: float):
+    # two servos following a moving object with the occasional big jump, like a re-acquired target
+    t = tick / rate_hz
+    jump = 60 if int(t) % 2 == 1 else 0
+    return 90 + 30 * math.sin(t * 2), 40 + 20 * math.cos(t * 3) + jump
+
+def run_direct(channels, rate_hz: float, seconds: float) -> None:
+    kit = MockServoKit()
+    ticks = int(seconds * rate_hz)
+    max_jump = 0.0
+    last = [kit.servo[channel]._angle for channel in channels]
+    for tick in range(ticks):
+        targets = controller_targets(tick, rate_hz)
+        for channel, target in zip(channels, targets):
+            kit.servo[channel].angle = target
+        # the old get_joints read every servo back over I2C
+        current = [kit.servo[channel].angle for channel in channels]
+        max_jump = max(max_jump, max(abs(a - b) for a, b in zip(current, last)))
+        last = current
+    print(f"servo.angle per command: {kit._pca.i2c_device.transactions} I2C transactions for {ticks} controller ticks, "
+          f"largest single move {max_jump:.1f} deg")
+
+def run_scheduler(channels, rate_hz: float, seconds: float, smooth_time: float) -> None:
+    kit = MockServoKit()
+    speed = 180 / smooth_time if smooth_time > 0 else 0
+    scheduler = ServoScheduler(kit, channels, [0.0] * len(channels), speed, pulse_min=500, pulse_max=2500)
+    scheduler.start()
+
+    ticks = int(seconds * rate_hz)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        scheduler.set_targets(dict(zip(channels, controller_targets(tick, rate_hz))))
+        [scheduler.get_angle(channel) for channel in channels]
+        time.sleep(max(start + (tick + 1) / rate_hz - time.perf_counter(), 0))
+    scheduler.wait_until_settled(smooth_time + 1)
+    scheduler.stop()
+
+    # read the duty cycle the last burst left in the mock registers and check it matches the final angle
+    for channel in channels:
+        register = PCA9685_LED0_ON_L + PCA9685_CHANNEL_REGISTER_BYTES * channel
+        _, off = struct.unpack_from("<HH", kit._pca.i2c_device.registers, register)
+        expected = (scheduler._duty_cycle(scheduler.get_angle(channel)) + 1) >> 4
+        assert off == expected, f"channel {channel} register {off} != {expected}"
+
+    print(f"ServoScheduler:          {kit._pca.i2c_device.transactions} I2C transactions for {ticks} controller ticks "
+          f"({scheduler.tick_count} scheduler ticks at {scheduler.rate_hz} Hz), largest single move {speed / scheduler.rate_hz:.1f} deg")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count PCA9685 I2C transactions for direct servo writes vs ServoScheduler.")
+    parser.add_argument("--rate", type=float, default=30, help="Controller rate in Hz.")
+    parser.add_argument("--seconds", type=float, default=3, help="How long to run.")
+    parser.add_argument("--smooth_time", type=float, default=3, help="physical_HAL.smooth_time, seconds for a full sweep.")
+    args = parser.parse_args()
+
+    # physical_HAL's servos are on channels 4 and 5
+    channels = [4, 5]
+    run_direct(channels, args.rate, args.seconds)
+    run_scheduler(channels, args.rate, args.seconds, args.smooth_time)
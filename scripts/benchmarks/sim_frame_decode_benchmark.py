@@ -0,0 +1,48 @@
+# Compares the old struct.unpack based vision sensor decode with the zero-copy view used by sim_HAL.
+# Run from the project root: python scripts/benchmarks/sim_frame_decode_benchmark.py
+import os
+import struct
+import sys
+import timeit
+
+import cv2
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.sim_frame_decode import decode_vision_sensor_image
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720), (1920, 1080)]
+
+def decode_legacy(image_data, resolution):
+    """ The decode path sim_HAL used before, kept here as the baseline. """
+    image_data = struct.unpack(f'{len(image_data)}B', image_data)
+    image_array_rgb = np.array(image_data, dtype=np.uint8)
+    image_array_rgb = np.reshape(image_array_rgb, (resolution[1], resolution[0], 3))
+    return cv2.flip(image_array_rgb, 0)
+
+def decode_zero_copy(image_data, resolution):
+    return decode_vision_sensor_image(image_data, resolution, flip_vertical=True)
+
+def time_per_call_ms(fnc, number: int) -> float:
+    return min(timeit.repeat(fnc, number=number, repeat=3)) / number * 1000
+
+def run_benchmark():
+    print(f"{'resolution':>12} | {'legacy ms':>10} | {'zero-copy ms':>12} | {'speedup':>8} | {'zero-copy + cvtColor ms':>23}")
+    for width, height in RESOLUTIONS:
+        resolution = [width, height]
+        image_data = np.random.default_rng(0).integers(0, 256, width * height * 3, dtype=np.uint8).tobytes()
+
+        # both paths must produce the same image
+        assert np.array_equal(decode_legacy(image_data, resolution), decode_zero_copy(image_data, resolution))
+
+        legacy_ms = time_per_call_ms(lambda: decode_legacy(image_data, resolution), 5)
+        zero_copy_ms = time_per_call_ms(lambda: decode_zero_copy(image_data, resolution), 1000)
+        # what a typical consumer pays once it touches the pixels (the vision code converts to HSV first)
+        consume_ms = time_per_call_ms(lambda: cv2.cvtColor(decode_zero_copy(image_data, resolution), cv2.COLOR_RGB2HSV), 50)
+
+        print(f"{f'{width}x{height}':>12} | {legacy_ms:>10.3f} | {zero_copy_ms:>12.4f} | {legacy_ms / zero_copy_ms:>7.0f}x | {consume_ms:>23.3f}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,118 @@
+# Runs a proportional joint controller against sim_HAL in stepping mode as fast as possible and reports
+# how many sim steps it took to converge and how many sim steps per second we got.
+# Run from the project root:
+#   python scripts/benchmarks/sim_stepping_benchmark.py              (needs CoppeliaSim running the arm scene)
+#   python scripts/benchmarks/sim_stepping_benchmark.py --fake       (uses FakeSim, no CoppeliaSim needed)
+import argparse
+import math
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.sim_HAL import sim_HAL
+
+class FakeSim:
+    """
+    Stands in for the ZMQ remote API 'sim' object with just enough behaviour for sim_HAL:
+    joints move toward their targets at a fixed speed every step, the vision sensor returns a black frame.
+    """
+
+    def __init__(self, dt: float = 0.05, joint_speed_radians: float = math.radians(90), resolution=(640, 480)):
+        self.dt = dt
+        self.joint_speed_radians = joint_speed_radians
+        self.resolution = list(resolution)
+        self.handles = {}
+        self.joint_positions = {}
+        self.joint_targets = {}
+        self.simulation_time = 0.0
+        self.stepping = False
+        self.running = False
+
+    def getObjectHandle(self, path: str) -> int:
+        if path not in self.handles:
+            handle = len(self.handles) + 1
+            self.handles[path] = handle
+            self.joint_positions[handle] = 0.0
+            self.joint_targets[handle] = 0.0
+        return self.handles[path]
+
+    def getObject(self, path: str) -> int:
+        return self.getObjectHandle(path)
+
+    def getVisionSensorResolution(self, handle: int):
+        return self.resolution
+
+    def getVisionSensorImg(self, handle: int):
+        return bytes(self.resolution[0] * self.resolution[1] * 3), self.resolution
+
+    def setStepping(self, enabled: bool) -> None:
+        self.stepping = enabled
+
+    def startSimulation(self) -> None:
+        self.running = True
+
+    def stopSimulation(self) -> None:
+        self.running = False
+
+    def getSimulationTime(self) -> float:
+        return self.simulation_time
+
+    def getSimulationTimeStep(self) -> float:
+        return self.dt
+
+    def setJointTargetPosition(self, handle: int, target: float) -> None:
+        self.joint_targets[handle] = target
+
+    def getJointPosition(self, handle: int) -> float:
+        return self.joint_positions[handle]
+
+    def step(self, wait: bool = True) -> None:
+        max_move = self.joint_speed_radians * self.dt
+        for handle, target in self.joint_targets.items():
+            error = target - self.joint_positions[handle]
+            self.joint_positions[handle] += max(-max_move, min(max_move, error))
+        self.simulation_time += self.dt
+
+def run_benchmark(hal: sim_HAL, target_degrees: float, tolerance_degrees: float, gain: float, max_steps: int) -> None:
+    hal.set_joint_limits(0, 0, 360)
+    converged_at = []
+
+    def tick(sim_time: float) -> bool:
+        # same shape as the controllers: read every joint, nudge the base toward the target, write back
+        joint_angles = hal.get_joints()
+        error = target_degrees - joint_angles[0]
+        if abs(error) < tolerance_degrees:
+            converged_at.append(sim_time)
+            return False
+        joint_angles[0] += gain * error
+        hal.set_joints(joint_angles, [True] + [False] * (len(joint_angles) - 1))
+        return True
+
+    stats = hal.run_stepped(tick, max_steps)
+
+    if converged_at:
+        print(f"converged to {target_degrees} degrees in {stats['steps']} steps ({converged_at[0]:.3f} sim seconds)")
+    else:
+        print(f"did not converge within {max_steps} steps")
+    real_time_factor = stats['sim_seconds'] / stats['wall_seconds'] if stats['wall_seconds'] > 0 else float("inf")
+    print(f"dt: {stats['dt']:.4f} s, wall time: {stats['wall_seconds']:.3f} s, "
+          f"{stats['steps_per_second']:.1f} sim steps per second ({real_time_factor:.1f}x real time)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark controller convergence with sim_HAL in stepping mode.")
+    parser.add_argument("--fake", action="store_true", help="Use FakeSim instead of connecting to CoppeliaSim.")
+    parser.add_argument("--host", default="localhost", help="CoppeliaSim host.")
+    parser.add_argument("--target", type=float, default=90.0, help="Base joint target in degrees.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Convergence tolerance in degrees.")
+    parser.add_argument("--gain", type=float, default=0.2, help="Proportional gain per tick.")
+    parser.add_argument("--max_steps", type=int, default=5000, help="Give up after this many steps.")
+    args = parser.parse_args()
+
+    hal = sim_HAL(args.host, sim=FakeSim() if args.fake else None, stepping=True)
+    hal.start_arm()
+    try:
+        run_benchmark(hal, args.target, args.tolerance, args.gain, args.max_steps)
+    finally:
+        hal.stop_arm()
@@ -0,0 +1,71 @@
+# Drives stepperMicrostep.Stepper on gpiozero's mock pins the way a 30 Hz controller does (a new target every tick)
+# and reports how long setPosition blocks the caller, how closely the motor follows, and the step rate the profile reached.
+# Needs gpiozero installed but no Pi. Run from the project root:
+#   python scripts/benchmarks/stepper_motion_benchmark.py
+#   python scripts/benchmarks/stepper_motion_benchmark.py --max_speed 2000 --acceleration 4000
+import argparse
+import math
+import os
+import sys
+import time
+
+from gpiozero.pins.mock import MockFactory
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.logan_hal.stepperMicrostep import Stepper, DEFAULT_MAX_SPEED, DEFAULT_ACCELERATION
+
+def run_benchmark(max_speed: float, acceleration: float, rate_hz: float, seconds: float, amplitude_degrees: float, period_seconds: float) -> None:
+    pin_factory = MockFactory()
+    stepper = Stepper(15, 14, max_speed, acceleration, pin_factory=pin_factory)
+    step_pin = pin_factory.pin(14)
+    step_pin.clear_states()
+
+    call_seconds = []
+    tracking_errors = []
+    start = time.perf_counter()
+    tick = 0
+    while time.perf_counter() - start < seconds:
+        # a sine sweep like a controller following a moving object
+        target = amplitude_degrees * math.sin(2 * math.pi * tick / rate_hz / period_seconds)
+        t0 = time.perf_counter()
+        stepper.setPosition(target)
+        call_seconds.append(time.perf_counter() - t0)
+        tracking_errors.append(abs(stepper.get_target_degrees() - stepper.get_current_rotation()))
+        tick += 1
+        next_tick = start + tick / rate_hz
+        time.sleep(max(next_tick - time.perf_counter(), 0))
+
+    stepper.setPosition(0)
+    stepper.wait_until_stopped(10)
+
+    # mock pin timestamps are seconds since the previous change, the rising edges of the step pin are the steps
+    rising_edge_times = []
+    elapsed = 0.0
+    for previous, state in zip(step_pin.states, step_pin.states[1:]):
+        elapsed += state.timestamp
+        if state.state and not previous.state:
+            rising_edge_times.append(elapsed)
+    intervals = [b - a for a, b in zip(rising_edge_times, rising_edge_times[1:]) if b > a]
+    call_seconds.sort()
+    tracking_errors.sort()
+
+    print(f"{tick} setPosition calls at {rate_hz} Hz: p50 {call_seconds[len(call_seconds) // 2] * 1e6:.1f} us, max {call_seconds[-1] * 1e6:.1f} us")
+    print(f"tracking error: p50 {tracking_errors[len(tracking_errors) // 2]:.2f} deg, max {tracking_errors[-1]:.2f} deg")
+    if intervals:
+        print(f"{len(rising_edge_times)} steps, peak rate {1 / min(intervals):.0f} steps/s (max_speed {max_speed:.0f}), "
+              f"final position {stepper.get_current_rotation():.3f} deg")
+    stepper.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark stepperMicrostep.Stepper against a 30 Hz retargeting controller on mock pins.")
+    parser.add_argument("--max_speed", type=float, default=DEFAULT_MAX_SPEED, help="Steps per second.")
+    parser.add_argument("--acceleration", type=float, default=DEFAULT_ACCELERATION, help="Steps per second per second.")
+    parser.add_argument("--rate", type=float, default=30, help="Controller rate in Hz.")
+    parser.add_argument("--seconds", type=float, default=5, help="How long to run.")
+    parser.add_argument("--amplitude", type=float, default=20, help="Sine sweep amplitude in degrees.")
+    parser.add_argument("--period", type=float, default=4, help="Sine sweep period in seconds.")
+    args = parser.parse_args()
+
+    run_benchmark(args.max_speed, args.acceleration, args.rate, args.seconds, args.amplitude, args.period)
@@ -0,0 +1,78 @@
+# Renders SyntheticHAL frames at several resolutions and compares the render time with ColorObjectIdentifier's time on the
+# same frames, to check rendering never becomes the bottleneck of a load test. Then runs the FollowLargestObjectControler
+# math closed loop against the synthetic arm and reports the loop rate.
+# Run from the project root:
+#   python scripts/benchmarks/synthetic_hal_benchmark.py
+#   python scripts/benchmarks/synthetic_hal_benchmark.py --seed 3 --objects 12 --frames 100
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.synthetic_HAL import SyntheticHAL
+from Vision.ColorObjectIdentifier import ColorObjectIdentifier
+from Controllers.FollowLargestObjectControler import FollowLargestObjectControler
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720), (1920, 1080)]
+
+def benchmark_render(width: int, height: int, seed: int, object_count: int, frames: int) -> None:
+    hal = SyntheticHAL((width, height), fps=0, seed=seed, object_count=object_count)
+    vision = ColorObjectIdentifier()
+
+    render_seconds = 0.0
+    vision_seconds = 0.0
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        frame = hal.get_arm_cam_img_rgb()
+        t1 = time.perf_counter()
+        vision.process_frame(frame)
+        t2 = time.perf_counter()
+        render_seconds += t1 - t0
+        vision_seconds += t2 - t1
+
+    render_ms = render_seconds / frames * 1000
+    vision_ms = vision_seconds / frames * 1000
+    print(f"{width:>5}x{height:<5} render: {render_ms:8.3f} ms ({1000 / render_ms:7.1f} fps)   "
+          f"vision: {vision_ms:8.3f} ms   render is {render_ms / vision_ms * 100:5.1f}% of vision")
+
+async def benchmark_closed_loop(seed: int, object_count: int, frames: int, target_label: str) -> None:
+    # joint_speed 0 so each command takes effect on the next frame and the run doesn't depend on wall-clock timing
+    hal = SyntheticHAL((640, 480), fps=0, seed=seed, object_count=object_count, joint_speed=0)
+    hal.start_arm()
+    vision = ColorObjectIdentifier()
+    controller = FollowLargestObjectControler(hal, vision, target_label)
+
+    frames_with_target = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        target_object = controller.select_largest_target_object(vision.process_frame(hal.capture_image()))
+        if target_object is None:
+            continue
+        frames_with_target += 1
+        await controller.move_towards_object(target_object)
+        controller.read_joint_angles()
+        controller.calculate_base_theta()
+        controller.calculate_servo_2_theta()
+        controller.theta_base = max(controller.theta_base, 0)
+        controller.servo_2 = max(controller.servo_2, 0)
+        controller.write_joint_angles()
+    wall_seconds = time.perf_counter() - start
+
+    print(f"closed loop at 640x480: {frames / wall_seconds:.1f} loops per second, target \"{target_label}\" seen in {frames_with_target}/{frames} frames, "
+          f"final error x: {controller.error_x_distance} px, y: {controller.error_y_distance} px")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SyntheticHAL rendering against the vision and control loops.")
+    parser.add_argument("--seed", type=int, default=1, help="Scene seed.")
+    parser.add_argument("--objects", type=int, default=6, help="Objects in the scene.")
+    parser.add_argument("--frames", type=int, default=200, help="Frames per resolution.")
+    parser.add_argument("--target", default="yellow object", help="Label the controller follows in the closed loop run.")
+    args = parser.parse_args()
+
+    for width, height in RESOLUTIONS:
+        benchmark_render(width, height, args.seed, args.objects, args.frames)
+    asyncio.run(benchmark_closed_loop(args.seed, args.objects, args.frames, args.target))
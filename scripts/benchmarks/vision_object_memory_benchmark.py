@@ -0,0 +1,62 @@
+# Keeps ColorObjectIdentifier's detections for a run of SyntheticHAL frames alive, the way last_frame_objects does, and
+# measures with tracemalloc how much memory they hold: bytes per detection on top of the shared per frame arrays, and how
+# many full frame sized arrays each frame's detections keep alive between them.
+# Run from the project root:
+#   python scripts/benchmarks/vision_object_memory_benchmark.py
+#   python scripts/benchmarks/vision_object_memory_benchmark.py --objects 20 --single_pass
+import argparse
+import os
+import sys
+import tracemalloc
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.synthetic_HAL import SyntheticHAL
+from Vision.ColorObjectIdentifier import ColorObjectIdentifier
+
+def render_frames(width: int, height: int, seed: int, object_count: int, frame_count: int) -> list:
+    hal = SyntheticHAL((width, height), fps=0, seed=seed, object_count=object_count)
+    frames = []
+    for i in range(frame_count):
+        hal.set_joints([20 + i * 3, 20, 70, 40])
+        frames.append(hal.get_arm_cam_img_rgb())
+    return frames
+
+def frame_arrays(objects: list) -> dict:
+    """ The distinct frame and mask arrays a frame's detections reference, by id. """
+    arrays = {}
+    for obj in objects:
+        for array in (obj.source_frame_rgb, obj.mask):
+            if array is not None:
+                arrays[id(array)] = array
+    return arrays
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--objects", type=int, default=12)
+    parser.add_argument("--single_pass", action='store_true', help="use the single pass color identifier")
+    args = parser.parse_args()
+
+    frames = render_frames(args.width, args.height, args.seed, args.objects, args.frames)
+    identifier = ColorObjectIdentifier(args.single_pass)
+    # first call outside the trace, so lookup tables and the like aren't counted
+    identifier.process_frame(frames[0])
+
+    tracemalloc.start()
+    kept = [identifier.process_frame(frame) for frame in frames]
+    traced_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    detections = sum(len(objects) for objects in kept)
+    arrays_per_frame = [frame_arrays(objects) for objects in kept if len(objects) > 0]
+    # the rendered frames were allocated before tracing, only arrays made during process_frame were traced
+    traced_array_bytes = sum(array.nbytes for arrays in arrays_per_frame for array in arrays.values()
+                             if not any(array is frame for frame in frames))
+    print(f"{args.width}x{args.height}, {args.frames} frames, {detections} detections")
+    print(f"full frame arrays kept alive per frame: {sum(len(arrays) for arrays in arrays_per_frame) / max(1, len(arrays_per_frame)):.1f}")
+    print(f"bytes per detection on top of those arrays: {(traced_bytes - traced_array_bytes) / max(1, detections):.0f}")
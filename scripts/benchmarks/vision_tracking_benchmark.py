@@ -0,0 +1,107 @@
+# Sweeps the SyntheticHAL's base joint so the scene slides across the frame, and runs ColorObjectIdentifier.detect on every
+# frame with tracking off and on, targeting the largest object of the first frame. Prints frames per second, pixels processed
+# per frame, how often the target was lost, how far the tracked target's box was from the whole frame result, and whether
+# get_visible_objects had the same labels and boxes as the whole frame pass. Then checks that on a still frame they match exactly.
+# Run from the project root:
+#   python scripts/benchmarks/vision_tracking_benchmark.py
+#   python scripts/benchmarks/vision_tracking_benchmark.py --width 1280 --height 720 --interval 20 --single_pass
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from HALs.synthetic_HAL import SyntheticHAL
+from Vision.ColorObjectIdentifier import ColorObjectIdentifier
+
+def render_sweep(width: int, height: int, seed: int, object_count: int, frame_count: int, degrees_per_frame: float) -> list:
+    hal = SyntheticHAL((width, height), fps=0, seed=seed, object_count=object_count)
+    frames = []
+    for i in range(frame_count):
+        hal.set_joints([30 + i * degrees_per_frame, 20, 70, 40])
+        frames.append(hal.get_arm_cam_img_rgb())
+    return frames
+
+def largest_box(objects: list, label: str):
+    boxes = [(obj.width * obj.height, (obj.top_left_x, obj.top_left_y, obj.width, obj.height)) for obj in objects if obj.label.lower() == label]
+    return max(boxes)[1] if boxes else None
+
+def visible_boxes(objects: list) -> list:
+    return sorted((obj.label, (obj.top_left_x, obj.top_left_y, obj.width, obj.height)) for obj in objects)
+
+def run(identifier: ColorObjectIdentifier, frames: list, label: str):
+    boxes = []
+    visible = []
+    elapsed = 0.0
+    for frame in frames:
+        start = time.perf_counter()
+        objects = identifier.detect(frame, label)
+        elapsed += time.perf_counter() - start
+        boxes.append(largest_box(objects, label))
+        visible.append(visible_boxes(identifier.get_visible_objects()))
+    return len(frames) / elapsed, boxes, visible
+
+def visible_difference(full_visible: list, tracked_visible: list):
+    """ None if the labels differ, else the largest difference in pixels between boxes, paired in sorted order. """
+    if [label for label, _ in full_visible] != [label for label, _ in tracked_visible]:
+        return None
+    return max((max(abs(a - b) for a, b in zip(full_box, tracked_box))
+                for (_, full_box), (_, tracked_box) in zip(full_visible, tracked_visible)), default=0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--objects", type=int, default=6)
+    parser.add_argument("--speed", type=float, default=0.2, help="degrees the base turns per frame")
+    parser.add_argument("--interval", type=int, default=10, help="process the whole frame every this many frames")
+    parser.add_argument("--single_pass", action='store_true', help="use the single pass color identifier")
+    args = parser.parse_args()
+
+    frames = render_sweep(args.width, args.height, args.seed, args.objects, args.frames, args.speed)
+    first_objects = ColorObjectIdentifier(args.single_pass).process_frame(frames[0])
+    if not first_objects:
+        print("Nothing is visible in the first frame, try another --seed")
+        sys.exit(1)
+    label = max(first_objects, key=lambda obj: obj.width * obj.height).label.lower()
+    print(f"{args.width}x{args.height}, {args.frames} frames, tracking the {label}")
+
+    full_identifier = ColorObjectIdentifier(args.single_pass)
+    full_fps, full_boxes, full_visible = run(full_identifier, frames, label)
+    full_metrics = full_identifier.get_tracking_metrics()
+
+    tracking_identifier = ColorObjectIdentifier(args.single_pass)
+    tracking_identifier.enable_tracking(args.interval)
+    tracking_fps, tracking_boxes, tracking_visible = run(tracking_identifier, frames, label)
+    tracking_metrics = tracking_identifier.get_tracking_metrics()
+
+    # the tracked box should be where the whole frame pass put it, except where the ROI cut the target's neighbours
+    errors = [max(abs(a - b) for a, b in zip(full_box, tracked_box))
+              for full_box, tracked_box in zip(full_boxes, tracking_boxes) if full_box is not None and tracked_box is not None]
+    missed = sum(1 for full_box, tracked_box in zip(full_boxes, tracking_boxes) if full_box is not None and tracked_box is None)
+    # off the ROI, visible objects are the last whole frame's, the scene moving since then shifts their boxes a little
+    visible_differences = [visible_difference(full, tracked) for full, tracked in zip(full_visible, tracking_visible)]
+    label_mismatches = sum(1 for difference in visible_differences if difference is None)
+    visible_box_error = max((difference for difference in visible_differences if difference is not None), default=0)
+
+    print(f"whole frames   {full_fps:7.1f} fps   {full_metrics['pixels_per_frame']:9.0f} pixels per frame")
+    print(f"tracking       {tracking_fps:7.1f} fps   {tracking_metrics['pixels_per_frame']:9.0f} pixels per frame "
+          f"({tracking_metrics['processed_fraction'] * 100:.1f}%)   {tracking_metrics['roi_frames']} ROI frames, "
+          f"{tracking_metrics['full_frames']} whole frames, target lost {tracking_metrics['lost']} times")
+    print(f"target box difference: max {max(errors) if errors else 0} px, target missed on {missed} frames")
+    print(f"visible objects: labels differ on {label_mismatches} frames, box difference max {visible_box_error} px")
+
+    # the synthetic scene changes a little every frame even standing still, repeat one frame so nothing moves
+    still_frames = [frames[0]] * (args.interval + 1)
+    _, _, still_full_visible = run(ColorObjectIdentifier(args.single_pass), still_frames, label)
+    still_identifier = ColorObjectIdentifier(args.single_pass)
+    still_identifier.enable_tracking(args.interval)
+    _, _, still_tracking_visible = run(still_identifier, still_frames, label)
+    if still_full_visible != still_tracking_visible:
+        print("FAILED - on a still frame the visible objects should match the whole frame pass exactly")
+        sys.exit(1)
+    print(f"still frame: visible objects match the whole frame pass on all {len(still_frames)} frames")
@@ -1,63 +1,169 @@
+import glob
+import json
+import re
+import sys
+import threading
+import time
+
 import cv2
-    
-def open_camera(default_camera_port = 0):
-    capture = cv2.VideoCapture(default_camera_port)
-    capture_works = True
-    if not capture.isOpened():
-        capture_works = False
-    else:
-        is_reading, img = capture.read()
-        if not is_reading:
-            capture_works = False
-    
-    if capture_works:
+
+# the camera that last worked and its resolution, so the next startup opens it without probing
+DEFAULT_CAMERA_CACHE_FILE = "camera_cache.json"
+# how long one device gets to open and hand back a frame before probing gives up on it
+PROBE_TIMEOUT_SECONDS = 3.0
+# indices probed where /dev/video* can't be listed
+FALLBACK_PROBE_COUNT = 6
+
+def open_camera(default_camera_port = 0, cache_file: str = DEFAULT_CAMERA_CACHE_FILE):
+    """
+    Opens the camera that worked last time (from cache_file), then default_camera_port, then the first working device
+    found by probing every device at once. The camera that opened is written back to cache_file. Returns None if none work.
+    """
+    cached = load_cached_camera(cache_file)
+    if cached is not None:
+        capture = _open_working_capture(cached["device"], cached.get("width", 0), cached.get("height", 0))
+        if capture is not None:
+            return capture
+        print("cached camera " + str(cached["device"]) + " is not working anymore.")
+
+    capture = _open_working_capture(default_camera_port)
+    if capture is not None:
+        save_cached_camera(cache_file, default_camera_port, capture)
         return capture
-    
+
     print("camera port " + str(default_camera_port) + " is not working, attempting to find working port.")
 
     working_ports = get_working_ports()
     if len(working_ports) <= 0:
         print("no working camera ports have been identified, please attach a USB camera to continue.")
         return None
-    
-    print("Found " + str(len(working_ports)) + " working camera ports: [" + str(working_ports) + "] selecting port: " + working_ports[0])
 
-    capture = cv2.VideoCapture(working_ports[0])
+    print("Found " + str(len(working_ports)) + " working camera ports: [" + str(working_ports) + "] selecting port: " + str(working_ports[0]))
+
+    capture = _open_working_capture(working_ports[0])
+    if capture is not None:
+        save_cached_camera(cache_file, working_ports[0], capture)
     return capture
 
 def get_working_ports():
     available_ports,working_ports,non_working_ports = list_ports()
     return working_ports
-    
-def list_ports():
+
+def camera_devices():
+    """ Every /dev/video* node in index order, or the first few indices where there are none to list (ex: Windows, macOS). """
+    if sys.platform.startswith("linux"):
+        devices = glob.glob("/dev/video*")
+        if len(devices) > 0:
+            return sorted(devices, key=_device_number)
+    return list(range(FALLBACK_PROBE_COUNT))
+
+def list_ports(devices = None, timeout: float = PROBE_TIMEOUT_SECONDS):
     """
     Test the ports and returns a tuple with the available ports and the ones that are working.
+    Every device is probed on its own thread at the same time, a device that hasn't answered within timeout seconds
+    counts as not working (its thread is left to finish on its own).
     """
+    if devices is None:
+        devices = camera_devices()
+    results = {}
+    threads = []
+    for device in devices:
+        thread = threading.Thread(target=lambda device=device: results.__setitem__(device, probe_camera(device)), daemon=True)
+        thread.start()
+        threads.append(thread)
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
     non_working_ports = []
-    dev_port = 0
     working_ports = []
     available_ports = []
-    while len(non_working_ports) < 6: # if there are more than 5 non working ports stop the testing. 
-        camera = cv2.VideoCapture(dev_port)
-        if not camera.isOpened():
-            non_working_ports.append(dev_port)
-            print("Port %s is not working." %dev_port)
+    for device in devices:
+        result = results.get(device)
+        if result is None:
+            non_working_ports.append(device)
+            print("Port %s did not answer within %s seconds." %(device,timeout))
+            continue
+        is_open, is_reading, w, h = result
+        if not is_open:
+            non_working_ports.append(device)
+            print("Port %s is not working." %device)
+        elif is_reading:
+            print("Port %s is working and reads images (%s x %s)" %(device,h,w))
+            working_ports.append(device)
         else:
-            is_reading, img = camera.read()
-            w = camera.get(3)
-            h = camera.get(4)
-            if is_reading:
-                print("Port %s is working and reads images (%s x %s)" %(dev_port,h,w))
-                working_ports.append(dev_port)
-            else:
-                print("Port %s for camera ( %s x %s) is present but does not reads." %(dev_port,h,w))
-                available_ports.append(dev_port)
-        dev_port +=1
+            print("Port %s for camera ( %s x %s) is present but does not reads." %(device,h,w))
+            available_ports.append(device)
     return available_ports,working_ports,non_working_ports
 
+def probe_camera(device):
+    """ Returns (opens, reads a frame, width, height) for one device. """
+    camera = _video_capture(device)
+    try:
+        if not camera.isOpened():
+            return False, False, 0, 0
+        is_reading, img = camera.read()
+        return True, is_reading, camera.get(cv2.CAP_PROP_FRAME_WIDTH), camera.get(cv2.CAP_PROP_FRAME_HEIGHT)
+    finally:
+        camera.release()
+
+# camera cache - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def load_cached_camera(cache_file: str):
+    """ {"device": ..., "width": ..., "height": ...} of the camera that worked last time, None if there is none. """
+    try:
+        with open(cache_file, 'r') as openfile:
+            cached = json.load(openfile)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or "device" not in cached:
+        return None
+    return cached
+
+def save_cached_camera(cache_file: str, device, capture) -> None:
+    cached = {
+        "device": device,
+        "width": int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+    }
+    try:
+        with open(cache_file, 'w') as outfile:
+            json.dump(cached, outfile, indent=4)
+    except OSError as err:
+        print(f"Exception saving the camera cache: {err=}, {type(err)=}")
+
+# helpers - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def _video_capture(device):
+    if isinstance(device, str) and device.startswith("/dev/video"):
+        # straight to V4L2, skips the backends that don't take device paths
+        return cv2.VideoCapture(device, cv2.CAP_V4L2)
+    return cv2.VideoCapture(device)
+
+def _open_working_capture(device, width: int = 0, height: int = 0):
+    """ Opens device at width x height (0 keeps its default), returns the capture if it hands back a frame, None otherwise. """
+    capture = _video_capture(device)
+    if not capture.isOpened():
+        capture.release()
+        return None
+    if width > 0 and height > 0:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    is_reading, img = capture.read()
+    if not is_reading:
+        capture.release()
+        return None
+    return capture
+
+def _device_number(device: str) -> int:
+    match = re.search(r"(\d+)$", device)
+    return int(match.group(1)) if match else sys.maxsize
+
 if __name__ == "__main__":
+    start = time.perf_counter()
     available_ports,working_ports,non_working_ports = list_ports()
     print("Available ports: ", available_ports)
     print("Working ports: ", working_ports)
     print("Non working ports: ", non_working_ports)
-    print("Total ports: ", len(available_ports)+len(working_ports)+len(non_working_ports))
\ No newline at end of file
+    print("Total ports: ", len(available_ports)+len(working_ports)+len(non_working_ports))
+    print("Probing took %.2f seconds" %(time.perf_counter() - start))